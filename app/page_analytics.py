@@ -5,6 +5,7 @@ import seaborn as sns
 from datetime import datetime
 from io import BytesIO
 from matplotlib.backends.backend_pdf import PdfPages
+from src.export_sink import csv_download
 from custom_style import apply_custom_style  # Import du style
 
 # Appliquer le style
@@ -415,23 +416,24 @@ def render_filters_and_download():
         col_dl1, col_dl2, col_dl3 = st.columns(3)
         
         with col_dl1:
-            csv = df_filtered.to_csv(index=False).encode('utf-8')
+            filtered_file = f"filtered_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             st.download_button(
                 label="📄 CSV filtré",
-                data=csv,
-                file_name=f"filtered_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                data=csv_download(df_filtered),
+                file_name=filtered_file,
                 mime="text/csv",
+                on_click="ignore",
                 use_container_width=True,
                 key="download_filtered_csv"
             )
         
         with col_dl2:
-            csv_full = df.to_csv(index=False).encode('utf-8')
             st.download_button(
                 label="📄 CSV complet",
-                data=csv_full,
+                data=csv_download(df),
                 file_name=f"full_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv",
+                on_click="ignore",
                 use_container_width=True,
                 key="download_full_csv"
             )
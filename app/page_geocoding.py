@@ -1,9 +1,16 @@
 import streamlit as st
 import pandas as pd
 import math
-from datetime import datetime
-from src.utils import export_job_history_to_pdf, export_enriched_results
-from src.ingestion import read_file
+import os
+from src.utils import export_job_history_to_pdf, export_enriched_results, EXPORT_MIME_TYPES
+from src.ingestion import read_file_chunked, build_full_address
+from src.metrics import write_textfile
+from src.dtypes import optimize_input_dtypes, optimize_result_dtypes
+from src.export_sink import ExportSink, SINK_FORMATS, file_download
+from src.strategies import load_strategies
+from src.config import JOB_PROFILING
+from src.profiling import profile_job, summary_frames
+from src.scheduler import new_job_id
 from src.geocoding import (
     parallel_geocode_row,
     create_job_entry,
@@ -61,7 +68,7 @@ def render_file_upload_section():
         
         # Réinitialiser uniquement si nouveau fichier
         if current_filename != previous_filename:
-            df = read_file(uploaded_file, sep=None)
+            df, raw_bytes = read_file_chunked(uploaded_file, transform=optimize_input_dtypes)
             if not df.empty:
                 st.session_state.df = df
                 st.session_state.enriched_df = None
@@ -69,6 +76,11 @@ def render_file_upload_section():
                 st.session_state.last_selected_enriched_df = None
                 st.session_state.previous_filename = current_filename
                 st.success(f"✅ Fichier **{current_filename}** chargé avec succès !")
+                optimized_bytes = df.memory_usage(deep=True, index=False).sum()
+                st.caption(
+                    f"💾 Mémoire : {raw_bytes / 1024**2:.1f} Mo → "
+                    f"{optimized_bytes / 1024**2:.1f} Mo"
+                )
                 st.dataframe(df.head(10), use_container_width=True)
             else:
                 st.error("❌ Erreur de lecture du fichier.")
@@ -111,17 +123,10 @@ def render_mapping_section():
         
         if st.button("✅ Valider le mapping", use_container_width=True):
             if mapped_fields:
-                full_address_parts = []
-                if "name" in mapped_fields:
-                    full_address_parts.append(df[mapped_fields["name"]].astype(str))
-                for key in ['street', 'postal_code', 'city', 'governorate', 'country', 'complement']:
-                    if key in mapped_fields:
-                        full_address_parts.append(df[mapped_fields[key]].astype(str))
+                full_address = build_full_address(df, mapped_fields)
                 
-                if full_address_parts:
-                    df["full_address"] = full_address_parts[0]
-                    for part in full_address_parts[1:]:
-                        df["full_address"] += ", " + part
+                if full_address is not None:
+                    df["full_address"] = full_address
                     
                     st.session_state.df = df
                     st.success("✅ Colonne 'full_address' générée !")
@@ -170,31 +175,53 @@ def render_geocoding_section():
         st.markdown("### 🔧 Mode de Géocodage")
         geocoding_mode = st.radio(
             "Sélectionnez l'API :",
-            options=[
-                "HERE uniquement",
-                "Google uniquement",
-                "OSM uniquement",
-                "Multi-API (HERE → Google → OSM)"
-            ],
+            # Modes intégrés puis stratégies du fichier STRATEGIES_FILE
+            options=[strategy["label"] for strategy in load_strategies().values()],
             index=0,
             key="geocoding_mode_main",
             horizontal=True
         )
         st.session_state.geocoding_mode = geocoding_mode
         
+        sink_format = st.selectbox(
+            "💾 Export au fil de l'eau (chaque batch terminé est ajouté au fichier)",
+            options=list(SINK_FORMATS),
+            index=0,
+            key="sink_format"
+        )
+        
+        profile = st.checkbox(
+            "🔬 Profiler ce job",
+            value=JOB_PROFILING,
+            key="profile_job",
+            help="Temps par fonction (tous les threads) et allocations mémoire, enregistrés sous l'identifiant du job"
+        )
+        
         # Bouton de lancement
         if st.button("🚀 Lancer le Géocodage", type="primary", use_container_width=True):
-            launch_geocoding(selected_df, nb_batches, batch_size, geocoding_mode)
+            launch_geocoding(selected_df, nb_batches, batch_size, geocoding_mode, sink_format, profile)
+
+
+def launch_geocoding(selected_df, nb_batches, batch_size, geocoding_mode, sink_format="csv", profile=False):
+    """Lance le processus de géocodage (profilé si `profile`, voir src/profiling.py)."""
+    job_id = new_job_id("JOB")
+    with profile_job(job_id, enabled=profile) as profile_summary:
+        job = run_geocoding_job(job_id, selected_df, nb_batches, batch_size, geocoding_mode, sink_format)
+    if profile_summary:
+        job["profile"] = profile_summary
+        st.info(f"🔬 Profil enregistré dans `{profile_summary['path']}` "
+                f"(point chaud : `{profile_summary['hotspot']}`)")
 
 
-def launch_geocoding(selected_df, nb_batches, batch_size, geocoding_mode):
-    """Lance le processus de géocodage."""
+def run_geocoding_job(job_id, selected_df, nb_batches, batch_size, geocoding_mode, sink_format="csv"):
+    """Géocode les batches du job et l'ajoute à l'historique."""
     mapped_fields = st.session_state.mapping_config.get("fields", {})
     batch_results = []
     
-    job_id = f"JOB_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     actual_rows = min(nb_batches * batch_size, len(selected_df))
     job = create_job_entry(job_id, total_rows=actual_rows)
+    sink = ExportSink(f"data/output/jobs/{job_id}.{sink_format}", export_format=sink_format)
+    job["export_path"] = sink.path
     
     # Conteneur pour les résultats en temps réel
     result_container = st.container()
@@ -206,53 +233,56 @@ def launch_geocoding(selected_df, nb_batches, batch_size, geocoding_mode):
         status_placeholder = st.empty()
         
         # Déterminer le mode API
-        api_mode_map = {
-            "HERE uniquement": "here",
-            "Google uniquement": "google",
-            "OSM uniquement": "osm",
-            "Multi-API (HERE → Google → OSM)": "multi"
-        }
+        api_mode_map = {strategy["label"]: name for name, strategy in load_strategies().items()}
         api_mode = api_mode_map.get(geocoding_mode, "here")
         
-        for i in range(nb_batches):
-            start = i * batch_size
-            end = min((i + 1) * batch_size, len(selected_df))
-            batch_df = selected_df.iloc[start:end].copy()
+        try:
+            for i in range(nb_batches):
+                start = i * batch_size
+                end = min((i + 1) * batch_size, len(selected_df))
+                batch_df = selected_df.iloc[start:end].copy()
             
-            status_placeholder.info(f"📦 Traitement du batch {i+1}/{nb_batches} ({len(batch_df)} lignes)...")
+                status_placeholder.info(f"📦 Traitement du batch {i+1}/{nb_batches} ({len(batch_df)} lignes)...")
             
-            # Progress bar pour ce batch
-            batch_progress_bar = st.progress(0)
-            completed = [0]
-            total = len(batch_df)
+                # Progress bar pour ce batch
+                batch_progress_bar = st.progress(0)
+                completed = [0]
+                total = len(batch_df)
             
-            def update_progress():
-                completed[0] += 1
-                batch_progress_bar.progress(completed[0] / total)
+                def update_progress():
+                    completed[0] += 1
+                    batch_progress_bar.progress(completed[0] / total)
             
-            # Géocodage
-            renamed_df = batch_df.rename(columns={v: k for k, v in mapped_fields.items()})
-            enriched_batch = parallel_geocode_row(
-                renamed_df,
-                address_column="full_address",
-                max_workers=10,
-                progress_callback=update_progress,
-                api_mode=api_mode
-            )
+                # Géocodage
+                renamed_df = batch_df.rename(columns={v: k for k, v in mapped_fields.items()})
+                enriched_batch = parallel_geocode_row(
+                    renamed_df,
+                    address_column="full_address",
+                    max_workers=10,
+                    progress_callback=update_progress,
+                    api_mode=api_mode,
+                    job_id=job_id,
+                    job_rows=actual_rows
+                )
             
-            batch_results.append(enriched_batch)
+                batch_results.append(enriched_batch)
+                sink.write_batch(enriched_batch)
             
-            # Mise à jour de la progression globale
-            overall_progress.progress((i + 1) / nb_batches)
+                # Mise à jour de la progression globale
+                overall_progress.progress((i + 1) / nb_batches)
             
-            # Stats rapides
-            success_count = (enriched_batch["status"] == "OK").sum()
-            rate = round(success_count / len(enriched_batch) * 100, 1)
-            status_placeholder.success(f"✅ Batch {i+1} terminé : {success_count}/{len(enriched_batch)} succès ({rate}%)")
-        
+                # Stats rapides
+                success_count = (enriched_batch["status"] == "OK").sum()
+                rate = round(success_count / len(enriched_batch) * 100, 1)
+                status_placeholder.success(f"✅ Batch {i+1} terminé : {success_count}/{len(enriched_batch)} succès ({rate}%)")
+                write_textfile()
+        finally:
+            # Pied de page Parquet écrit même si un batch échoue
+            sink.close()
+
         # Finalisation
         st.session_state.batch_results = batch_results
-        selected_enriched_df = pd.concat(batch_results, ignore_index=True)
+        selected_enriched_df = optimize_result_dtypes(pd.concat(batch_results, ignore_index=True))
         st.session_state.last_selected_enriched_df = selected_enriched_df
         
         job = finalize_job(job, selected_enriched_df)
@@ -261,17 +291,32 @@ def launch_geocoding(selected_df, nb_batches, batch_size, geocoding_mode):
         # Mise à jour du enriched_df
         if st.session_state.enriched_df is None:
             st.session_state.enriched_df = st.session_state.df.copy()
-        
-        for _, row in selected_enriched_df.iterrows():
-            row_index = row.get("row_index")
-            if row_index is not None:
-                for col in selected_enriched_df.columns:
-                    if col != "row_index":
-                        if col not in st.session_state.enriched_df.columns:
-                            st.session_state.enriched_df[col] = None
-                        st.session_state.enriched_df.at[row_index, col] = row[col]
+        merge_enriched_results(st.session_state.enriched_df, selected_enriched_df)
         
         st.success(f"🎉 Géocodage terminé ! {len(selected_enriched_df)} lignes traitées.")
+    return job
+
+
+def merge_enriched_results(enriched_df, selected_enriched_df):
+    """
+    Reporte les résultats d'un job dans le DataFrame enrichi complet.
+
+    Args:
+        enriched_df: DataFrame enrichi (modifié en place, colonnes ajoutées si besoin)
+        selected_enriched_df: Résultats du job, indexés par la colonne row_index
+
+    Returns:
+        DataFrame: enriched_df
+    """
+    for _, row in selected_enriched_df.iterrows():
+        row_index = row.get("row_index")
+        if row_index is not None:
+            for col in selected_enriched_df.columns:
+                if col != "row_index":
+                    if col not in enriched_df.columns:
+                        enriched_df[col] = None
+                    enriched_df.at[row_index, col] = row[col]
+    return enriched_df
 
 
 def render_results_section():
@@ -388,7 +433,8 @@ def render_retry_section():
                 
                 # Nettoyage
                 geo_cols = ['latitude', 'longitude', 'formatted_address', 'status', 
-                           'error_message', 'api_used', 'precision_level', 'timestamp']
+                           'error_message', 'api_used', 'precision_level', 'timestamp',
+                           'deadline_exceeded', 'row_seconds']
                 for col in geo_cols:
                     if col in failed_df.columns:
                         failed_df.drop(columns=[col], inplace=True)
@@ -419,10 +465,10 @@ def render_retry_section():
                 st.dataframe(retried_df, use_container_width=True)
                 
                 # Mise à jour
-                st.session_state.last_selected_enriched_df = pd.concat(
+                st.session_state.last_selected_enriched_df = optimize_result_dtypes(pd.concat(
                     [enriched_df[enriched_df["status"] == "OK"], retried_df],
                     ignore_index=True
-                )
+                ))
 
 
 def render_export_section():
@@ -431,13 +477,34 @@ def render_export_section():
         return
     
     with st.expander("📥 Exporter les Résultats", expanded=False):
+        last_job = st.session_state.job_history[-1] if st.session_state.job_history else None
+        export_path = last_job.get("export_path") if last_job else None
+        if export_path and os.path.exists(export_path):
+            st.markdown(f"##### 📦 Fichier du job `{last_job['job_id']}` (écrit pendant le géocodage)")
+            st.download_button(
+                label=f"💾 Télécharger {os.path.basename(export_path)}",
+                data=file_download(export_path),
+                file_name=os.path.basename(export_path),
+                mime="application/octet-stream",
+                on_click="ignore",
+                use_container_width=True,
+                key="download_job_export"
+            )
+            st.markdown("##### 🛠️ Export personnalisé")
+        
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            export_format = st.selectbox("Format", ["csv", "json", "txt"], key="export_format")
+            export_format = st.selectbox("Format", ["csv", "json", "txt", "parquet", "feather"], key="export_format")
         
         with col2:
-            sep = st.text_input("Séparateur", value=",", key="export_sep")
+            if export_format in ("parquet", "feather"):
+                compression_options = ["zstd", "snappy", "gzip"] if export_format == "parquet" else ["zstd", "lz4"]
+                compression = st.selectbox("Compression", compression_options, key="export_compression")
+                sep = ","
+            else:
+                sep = st.text_input("Séparateur", value=",", key="export_sep")
+                compression = None
         
         with col3:
             if export_format == "json":
@@ -451,7 +518,8 @@ def render_export_section():
                 df_export, 
                 export_format=export_format, 
                 sep=sep, 
-                line_delimited_json=line_delimited
+                line_delimited_json=line_delimited,
+                compression=compression
             )
             
             with open(file_path, "rb") as file:
@@ -459,8 +527,7 @@ def render_export_section():
                     label=f"💾 Télécharger {export_format.upper()}",
                     data=file,
                     file_name=file_path.split("/")[-1],
-                    mime="text/plain" if export_format == "txt" else 
-                         "application/json" if export_format == "json" else "text/csv",
+                    mime=EXPORT_MIME_TYPES[export_format],
                     use_container_width=True
                 )
 
@@ -478,6 +545,12 @@ def render_history_section():
                 "Lignes": job["total_rows"],
                 "Succès": job["success"],
                 "Échecs": job["failed"],
+                "Hors ligne": job.get("answered_locally", 0),
+                "Replanifiées": job.get("requeued_rows", 0),
+                "Quota restant": job.get("quota_remaining", "-"),
+                "Attente file (s)": job.get("queue_wait_avg", "-"),
+                "p99 ligne (s)": job.get("row_p99_seconds", "-"),
+                "Profil": job["profile"]["hotspot"] if job.get("profile") else "-",
                 "Taux": f"{round(job['success']/job['total_rows']*100, 1)}%",
                 "Statut": job["status"]
             }
@@ -511,9 +584,24 @@ def render_history_section():
                 if "precision_counts" in job and job["precision_counts"]:
                     st.write("🎯 Précisions:", job["precision_counts"])
                 
+                if job.get("profile"):
+                    render_profile_summary(job["profile"])
+                
                 st.dataframe(job["details_df"].head(5), use_container_width=True)
 
 
+def render_profile_summary(summary):
+    """Résumé du profil d'un job : fonctions par temps cumulé et sites d'allocation."""
+    st.markdown(f"🔬 **Profil** : {summary['seconds']} s, {summary['samples']} échantillons, "
+                f"pic mémoire suivi {summary['peak_memory_mb']} Mo — `{summary['path']}`")
+    functions, allocations = summary_frames(summary)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.dataframe(functions, use_container_width=True, hide_index=True)
+    with col2:
+        st.dataframe(allocations, use_container_width=True, hide_index=True)
+
+
 def run_geocoding_page():
     """Point d'entrée principal de la page."""
     initialize_session_state()
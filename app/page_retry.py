@@ -1,6 +1,13 @@
 import streamlit as st
 import pandas as pd
-from src.geocoding_retry import retry_geocode_row
+from src.geocoding_retry import keep_previous_result, retry_geocode_row
+from src.centroids import update_centroids
+from src.config import CENTROID_CACHE_ENABLED, JOB_PROFILING, RETRY_FAN_OUT, RETRY_FAN_OUT_WIDTH, SUSPICION_THRESHOLD
+from src.profiling import profile_job, summary_frames
+from src.scheduler import new_job_id
+from src.plausibility import compute_suspicion_scores, select_suspect_rows
+from src.metrics import write_textfile
+from src.export_sink import csv_download
 from datetime import datetime
 from custom_style import apply_custom_style  # Import du style
 
@@ -17,6 +24,12 @@ def initialize_retry_state():
         st.session_state.retry_results = None
     if 'retry_updated_df' not in st.session_state:
         st.session_state.retry_updated_df = None
+    if 'retry_report' not in st.session_state:
+        st.session_state.retry_report = None
+    if 'retry_profile' not in st.session_state:
+        st.session_state.retry_profile = None
+    if 'retry_scores' not in st.session_state:
+        st.session_state.retry_scores = None
 
 
 def render_file_upload():
@@ -112,6 +125,17 @@ def render_filters():
         st.error("❌ Le fichier est vide ou invalide.")
         return None
     
+    # Score de suspicion (contrôles de plausibilité vectorisés), calculé une
+    # fois par fichier chargé et non à chaque rerun
+    cached = st.session_state.retry_scores
+    if cached is None or cached[0] is not df:
+        cached = (df, compute_suspicion_scores(df))
+        st.session_state.retry_scores = cached
+    scores = cached[1]
+    df = df.drop(columns=["suspicion_score", "suspicion_reasons"], errors="ignore").join(
+        scores[["suspicion_score", "suspicion_reasons"]]
+    )
+    
     with st.expander("🎯 Critères de Sélection", expanded=True):
         col1, col2 = st.columns(2)
         
@@ -140,6 +164,27 @@ def render_filters():
                 label_visibility="collapsed"
             )
         
+        st.markdown("##### 🧪 Plausibilité")
+        col3, col4 = st.columns(2)
+        with col3:
+            use_suspicion = st.checkbox(
+                "Cibler par score de suspicion",
+                value=True,
+                key="use_suspicion_score",
+                help="Ajoute les lignes OK suspectes (hors Tunisie, loin de leur ville, gouvernorat incohérent) "
+                     "et écarte les précisions faibles mais plausibles"
+            )
+        with col4:
+            suspicion_threshold = st.slider(
+                "Seuil de suspicion",
+                min_value=0.0,
+                max_value=1.0,
+                value=SUSPICION_THRESHOLD,
+                step=0.05,
+                key="suspicion_threshold",
+                disabled=not use_suspicion
+            )
+        
         # Identifiant unique
         st.markdown("##### 🆔 Colonne identifiant")
         id_col = st.selectbox(
@@ -152,7 +197,15 @@ def render_filters():
         # Appliquer les filtres
         df_filtered_status = df[df["status"].isin(status_filter)] if status_filter and "status" in df.columns else pd.DataFrame()
         df_filtered_precision = df[df["precision_level"].isin(precision_filter)] if precision_filter and "precision_level" in df.columns else pd.DataFrame()
-        df_combined = pd.concat([df_filtered_status, df_filtered_precision], ignore_index=True)
+        df_suspect = pd.DataFrame()
+        skipped_plausible = 0
+        if use_suspicion:
+            df_suspect = select_suspect_rows(df, suspicion_threshold, scores)
+            if not df_filtered_precision.empty:
+                plausible = ~df_filtered_precision.index.isin(df_suspect.index)
+                skipped_plausible = int(plausible.sum())
+                df_filtered_precision = df_filtered_precision[~plausible]
+        df_combined = pd.concat([df_filtered_status, df_filtered_precision, df_suspect], ignore_index=True)
         
         # Déduplication
         dedup_key = "full_address"
@@ -164,11 +217,17 @@ def render_filters():
         
         # Afficher le nombre de lignes sélectionnées
         st.success(f"🔎 **{len(df_combined):,} lignes** sélectionnées pour relance")
+        if use_suspicion:
+            st.caption(
+                f"🧪 {len(df_suspect):,} lignes suspectes (score ≥ {suspicion_threshold:.2f}) — "
+                f"{skipped_plausible:,} lignes de précision faible mais plausibles écartées"
+            )
         
         # Aperçu des lignes
         if not df_combined.empty and len(df_combined) > 0:
             with st.expander("👀 Aperçu des lignes sélectionnées", expanded=False):
-                display_cols = ["full_address", "status", "precision_level", "api_used"]
+                display_cols = ["full_address", "status", "precision_level", "api_used",
+                                "suspicion_score", "suspicion_reasons"]
                 available_cols = [col for col in display_cols if col in df_combined.columns]
                 st.dataframe(df_combined[available_cols].head(20), use_container_width=True)
         
@@ -190,38 +249,61 @@ def render_retry_config():
                 help="Niveau de précision à atteindre au minimum",
                 label_visibility="collapsed"
             )
+            fan_out = st.checkbox(
+                "⚡ Variantes en parallèle",
+                value=RETRY_FAN_OUT,
+                key="retry_fan_out",
+                help=f"Interroge jusqu'à {RETRY_FAN_OUT_WIDTH} variantes d'une même API en même temps "
+                     f"(au plus {RETRY_FAN_OUT_WIDTH - 1} appels en trop par API et par ligne)"
+            )
+            profile = st.checkbox(
+                "🔬 Profiler cette relance",
+                value=JOB_PROFILING,
+                key="retry_profile_job",
+                help="Temps par fonction (tous les threads) et allocations mémoire, enregistrés sous l'identifiant de la relance"
+            )
         
         with col2:
             st.markdown("##### 🧠 Stratégie")
             st.info("""
             **Relance intelligente activée**
             
-            ✅ Toutes les APIs testées
+            ✅ Appels en cache puis moins chers en premier
             ✅ Variantes d'adresse générées
-            ✅ Meilleur résultat retourné
-            ✅ APIs déjà testées évitées
+            ✅ Arrêt dès la précision cible atteinte
+            ✅ Budget d'appels par ligne et par job
             """)
         
-        return target_precision
+        return target_precision, fan_out, profile
 
 
-def render_retry_button(df_combined, id_col):
+def render_retry_button(df_combined, id_col, target_precision="ROOFTOP", fan_out=False, profile=False):
     """Bouton de lancement de la relance."""
     if df_combined is None or df_combined.empty:
         st.warning("⚠️ Aucune ligne sélectionnée. Ajustez les filtres.")
         return
     
     if st.button("🚀 Lancer la Relance Intelligente", type="primary", use_container_width=True):
-        launch_retry(df_combined, id_col)
+        launch_retry(df_combined, id_col, target_precision, fan_out, profile)
+
+
+def launch_retry(df_combined, id_col, target_precision="ROOFTOP", fan_out=False, profile=False):
+    """Lance la relance intelligente (profilée si `profile`, voir src/profiling.py)."""
+    job_id = new_job_id("RETRY")
+    with profile_job(job_id, enabled=profile) as profile_summary:
+        run_retry(job_id, df_combined, id_col, target_precision, fan_out)
+    st.session_state.retry_profile = profile_summary
 
 
-def launch_retry(df_combined, id_col):
-    """Lance la relance intelligente."""
-    # Nettoyage des colonnes
+def run_retry(job_id, df_combined, id_col, target_precision="ROOFTOP", fan_out=False):
+    """Relance les lignes (job `job_id` de l'ordonnanceur partagé) et met à jour le DataFrame principal."""
+    # Nettoyage des colonnes (l'ancien résultat reste lisible en `previous_*` par le moteur)
+    df_combined = keep_previous_result(df_combined)
     geo_cols_to_clean = [
         'latitude', 'longitude', 'formatted_address', 'address_reformatted',
         'status', 'error_message', 'api_used',
-        'precision_level', 'timestamp', 'address_variant', 'improved'
+        'precision_level', 'timestamp', 'address_variant', 'improved',
+        'suspicion_score', 'suspicion_reasons'
     ]
     df_combined = df_combined.drop(
         columns=[col for col in geo_cols_to_clean if col in df_combined.columns],
@@ -250,10 +332,19 @@ def launch_retry(df_combined, id_col):
             df_combined,
             address_column="full_address",
             max_workers=10,
-            progress_callback=update_progress
+            progress_callback=update_progress,
+            target_precision=target_precision,
+            fan_out=fan_out,
+            job_id=job_id
         )
     
+    st.session_state.retry_report = retried_df.attrs.get("retry_report")
+    retried_df = retried_df.drop(columns=[col for col in retried_df.columns if col.startswith("previous_")])
     st.session_state.retry_results = retried_df
+    write_textfile()
+    if CENTROID_CACHE_ENABLED:
+        scores = compute_suspicion_scores(retried_df)["suspicion_score"]
+        update_centroids(retried_df.assign(suspicion_score=scores))
     st.success("✅ Géocodage terminé !")
     
     # Mise à jour du dataframe principal
@@ -303,6 +394,39 @@ def render_results():
                 improved = retried_df["improved"].sum() if retried_df["improved"].dtype == bool else 0
                 st.metric("🎉 Améliorées", f"{improved:,}")
         
+        # Budget d'appels
+        report = st.session_state.retry_report
+        if report:
+            st.caption(
+                f"💰 {report['calls']:,} appels API (coût {report['cost']:,}) — "
+                f"{report['skipped']:,} appels évités par le budget — "
+                f"{report['target_reached']:,}/{report['rows']:,} lignes à la précision cible `{report['target_precision']}`"
+            )
+            if report.get("row_seconds"):
+                st.caption(
+                    f"⏱️ Durée par ligne : p50 {report['row_seconds']['p50']} s · p99 {report['row_seconds']['p99']} s — "
+                    f"{report['deadline_rows']:,} lignes arrêtées à l'échéance"
+                )
+            if report.get("requeued"):
+                st.caption(
+                    f"⏳ {report['requeued']:,} replanifications après échec temporaire — "
+                    f"{report['recovered']:,} lignes récupérées, {report['gave_up']:,} abandonnées"
+                )
+        
+        # Profil de la relance
+        profile = st.session_state.retry_profile
+        if profile:
+            st.caption(
+                f"🔬 Profil : {profile['seconds']} s, {profile['samples']} échantillons, "
+                f"point chaud `{profile['hotspot']}` — `{profile['path']}`"
+            )
+            functions, allocations = summary_frames(profile)
+            col_functions, col_allocations = st.columns(2)
+            with col_functions:
+                st.dataframe(functions, use_container_width=True, hide_index=True)
+            with col_allocations:
+                st.dataframe(allocations, use_container_width=True, hide_index=True)
+        
         # Détails
         col_left, col_right = st.columns(2)
         
@@ -360,24 +484,26 @@ def render_export():
         
         with col1:
             st.markdown("##### 📄 Résultats de la relance")
-            csv_retry = st.session_state.retry_results.to_csv(index=False).encode('utf-8')
+            retry_file = f"retry_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             st.download_button(
                 label="💾 Télécharger CSV (relance)",
-                data=csv_retry,
-                file_name=f"retry_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                data=csv_download(st.session_state.retry_results),
+                file_name=retry_file,
                 mime="text/csv",
+                on_click="ignore",
                 use_container_width=True
             )
         
         with col2:
             if st.session_state.retry_updated_df is not None:
                 st.markdown("##### 📦 Fichier complet mis à jour")
-                csv_full = st.session_state.retry_updated_df.to_csv(index=False).encode('utf-8')
+                full_file = f"complete_updated_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
                 st.download_button(
                     label="💾 Télécharger CSV (complet)",
-                    data=csv_full,
-                    file_name=f"complete_updated_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                    data=csv_download(st.session_state.retry_updated_df),
+                    file_name=full_file,
                     mime="text/csv",
+                    on_click="ignore",
                     use_container_width=True
                 )
 
@@ -416,7 +542,7 @@ def run_retry_page():
     
     df_combined, id_col = filter_result
     
-    render_retry_config()
-    render_retry_button(df_combined, id_col)
+    target_precision, fan_out, profile = render_retry_config()
+    render_retry_button(df_combined, id_col, target_precision, fan_out, profile)
     render_results()
     render_export()
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Rapport mémoire avant/après le plan de types sur un DataFrame enrichi.
+
+Le DataFrame « avant » reproduit l'état actuel de `st.session_state` : toutes
+les colonnes texte en object et l'horodatage en chaîne. Le script vérifie aussi
+que l'export CSV est identique avec et sans optimisation.
+
+Usage :
+    python -m benchmarks.bench_dtypes --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.dtypes import memory_report, optimize_input_dtypes, optimize_result_dtypes, restore_export_dtypes
+
+STATUSES = np.array(["OK", "OK", "OK", "ZERO_RESULTS", "ERROR"], dtype=object)
+APIS = np.array(["here", "google", "osm"], dtype=object)
+PRECISIONS = np.array(["ROOFTOP", "RANGE_INTERPOLATED", "GEOMETRIC_CENTER", "APPROXIMATE"], dtype=object)
+RAW_PRECISIONS = np.array(["houseNumber", "street", "postalCode", "locality"], dtype=object)
+CITIES = np.array(["Tunis", "Sfax", "Sousse", "Ariana", "Bizerte", "Nabeul", "Gabès", "Monastir"], dtype=object)
+
+
+def build_enriched_frame(rows, seed=0):
+    """Construit un DataFrame enrichi factice (types tels que produits aujourd'hui)."""
+    rng = np.random.default_rng(seed)
+    idx = np.arange(rows)
+    city = CITIES[rng.integers(0, len(CITIES), rows)]
+    data = {
+        "name": pd.Series([f"Societe {i}" for i in idx], dtype=object),
+        "street": pd.Series([f"{i % 300} Rue {i % 97}" for i in idx], dtype=object),
+        "postal_code": pd.Series((1000 + idx % 9000).astype(str), dtype=object),
+        "city": pd.Series(city, dtype=object),
+        "country": pd.Series(np.full(rows, "Tunisie", dtype=object), dtype=object),
+        "full_address": pd.Series([f"Societe {i}, {i % 300} Rue {i % 97}, {c}" for i, c in zip(idx, city)],
+                                  dtype=object),
+        # Coordonnées à 5 décimales (format HERE)
+        "latitude": np.round(rng.uniform(30.2, 37.5, rows), 5),
+        "longitude": np.round(rng.uniform(7.5, 11.6, rows), 5),
+        "status": pd.Series(STATUSES[rng.integers(0, len(STATUSES), rows)], dtype=object),
+        "api_used": pd.Series(APIS[rng.integers(0, len(APIS), rows)], dtype=object),
+        "precision_level": pd.Series(PRECISIONS[rng.integers(0, len(PRECISIONS), rows)], dtype=object),
+        "precision_level_raw": pd.Series(RAW_PRECISIONS[rng.integers(0, len(RAW_PRECISIONS), rows)], dtype=object),
+        "timestamp": pd.Series(
+            (pd.Timestamp("2025-01-01") + pd.to_timedelta(idx, unit="s")).strftime("%Y-%m-%d %H:%M:%S"),
+            dtype=object,
+        ),
+    }
+    return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    before = build_enriched_frame(args.rows)
+
+    start = time.perf_counter()
+    after = optimize_result_dtypes(optimize_input_dtypes(before))
+    elapsed = time.perf_counter() - start
+
+    report = memory_report(before, after)
+    report["octets_avant"] = (report["octets_avant"].astype(float) / 1024 ** 2).round(1)
+    report["octets_apres"] = (report["octets_apres"].astype(float) / 1024 ** 2).round(1)
+    report = report.rename(columns={"octets_avant": "Mo_avant", "octets_apres": "Mo_apres"})
+
+    print(f"{args.rows:,} lignes — plan appliqué en {elapsed:.2f} s\n")
+    print(report.to_string())
+
+    sample = slice(0, min(args.rows, 100_000))
+    same_csv = (
+        before.iloc[sample].to_csv(index=False)
+        == restore_export_dtypes(after.iloc[sample]).to_csv(index=False)
+    )
+    print(f"\nExport CSV identique : {same_csv}")
+
+
+if __name__ == "__main__":
+    main()
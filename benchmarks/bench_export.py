@@ -0,0 +1,72 @@
+"""
+Temps d'écriture et taille de fichier par format d'export.
+
+Usage :
+    python -m benchmarks.bench_export --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.bench_dtypes import build_enriched_frame
+from src.dtypes import optimize_input_dtypes, optimize_result_dtypes
+from src.utils import export_enriched_results
+
+CASES = [
+    ("csv", {}),
+    ("json", {"line_delimited_json": False}),
+    ("json", {"line_delimited_json": True}),
+    ("parquet", {"compression": "snappy"}),
+    ("parquet", {"compression": "zstd"}),
+    ("feather", {"compression": "lz4"}),
+    ("feather", {"compression": "zstd"}),
+]
+
+
+def run(rows):
+    """Exporte le même DataFrame dans chaque format et retourne les mesures."""
+    df = optimize_result_dtypes(optimize_input_dtypes(build_enriched_frame(rows)))
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for export_format, kwargs in CASES:
+                start = time.perf_counter()
+                path = export_enriched_results(df, export_format=export_format, **kwargs)
+                elapsed = time.perf_counter() - start
+                label = export_format
+                if kwargs.get("line_delimited_json"):
+                    label += " (lignes)"
+                elif "compression" in kwargs:
+                    label += f" ({kwargs['compression']})"
+                results.append({
+                    "format": label,
+                    "seconds": round(elapsed, 3),
+                    "size_mb": round(os.path.getsize(path) / 1024 ** 2, 1),
+                })
+                os.remove(path)
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    results = run(args.rows)
+    csv_result = results[0]
+    print(f"{args.rows:,} lignes\n")
+    print(f"{'format':<20}{'écriture (s)':>14}{'taille (Mo)':>13}{'vs CSV (temps)':>16}{'vs CSV (taille)':>17}")
+    for r in results:
+        print(
+            f"{r['format']:<20}{r['seconds']:>14}{r['size_mb']:>13}"
+            f"{r['seconds'] / csv_result['seconds']:>15.2f}x{r['size_mb'] / csv_result['size_mb']:>16.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark de lecture : ancienne `read_file` vs lecture détectée / en flux.
+
+Chaque variante tourne dans un processus séparé pour mesurer son pic de RSS.
+Le fichier généré est en ISO-8859-1 avec un accent en fin de fichier, ce qui
+déclenche la double lecture de l'ancienne implémentation.
+
+Usage :
+    python -m benchmarks.bench_ingestion --rows 1000000
+"""
+import argparse
+import csv
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from src.ingestion import iter_file_chunks, read_file
+
+MAPPED_COLUMNS = ["raison_sociale", "adresse", "code_postal", "ville"]
+
+
+def legacy_read_file(uploaded_file, sep=None):
+    """Copie de `read_file` avant la détection d'encodage (référence)."""
+    try:
+        df = pd.read_csv(uploaded_file, sep=sep, encoding="utf-8")
+    except Exception:
+        uploaded_file.seek(0)
+        df = pd.read_csv(uploaded_file, sep=sep, encoding="ISO-8859-1")
+    return df
+
+
+def generate_csv(path, rows):
+    """Génère un export factice (10 colonnes, dont 4 mappées)."""
+    with open(path, "w", newline="", encoding="ISO-8859-1") as f:
+        writer = csv.writer(f)
+        writer.writerow(MAPPED_COLUMNS + ["gouvernorat", "pays", "telephone", "email", "secteur", "commentaire"])
+        for i in range(rows):
+            accent = "Médina" if i == rows - 1 else "Centre"
+            writer.writerow([
+                f"Societe {i}", f"{i % 300} RUE {i % 97} IMM {i % 13}", 1000 + i % 9000,
+                f"{accent} {i % 50}", "Tunis", "Tunisie", f"+216 71 {i:06d}",
+                f"contact{i}@example.tn", f"secteur {i % 20}", "x" * 40,
+            ])
+
+
+def _run_case(case, path, chunksize, queue):
+    start = time.perf_counter()
+    rows = 0
+    with open(path, "rb") as f:
+        if case == "legacy_read_file":
+            rows = len(legacy_read_file(f, sep=","))
+        elif case == "read_file":
+            rows = len(read_file(f, sep=","))
+        elif case == "read_file_usecols":
+            rows = len(read_file(f, sep=",", usecols=MAPPED_COLUMNS))
+        elif case == "iter_chunks_pandas":
+            for chunk in iter_file_chunks(f, sep=",", usecols=MAPPED_COLUMNS, chunksize=chunksize):
+                rows += len(chunk)
+        elif case == "iter_chunks_pyarrow":
+            for chunk in iter_file_chunks(f, sep=",", usecols=MAPPED_COLUMNS, chunksize=chunksize,
+                                          engine="pyarrow"):
+                rows += len(chunk)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+    queue.put({"case": case, "rows": rows, "seconds": round(elapsed, 3), "peak_rss_mb": round(peak_mb, 1)})
+
+
+def run_case(case, path, chunksize=50_000):
+    """Exécute une variante dans un processus neuf et retourne ses mesures."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_run_case, args=(case, path, chunksize, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+CASES = ["legacy_read_file", "read_file", "read_file_usecols", "iter_chunks_pandas", "iter_chunks_pyarrow"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.csv")
+        generate_csv(path, args.rows)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"Fichier : {args.rows:,} lignes, {size_mb:.1f} Mo\n")
+        print(f"{'variante':<22}{'lignes':>12}{'temps (s)':>12}{'pic RSS (Mo)':>15}")
+        for case in CASES:
+            r = run_case(case, path, args.chunksize)
+            print(f"{r['case']:<22}{r['rows']:>12,}{r['seconds']:>12}{r['peak_rss_mb']:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Latence par ligne de la relance : séquentielle vs variantes en parallèle.
+
+Utilise les fournisseurs factices (benchmarks.fake_providers) : aucune
+requête réseau.
+
+Usage :
+    python -m benchmarks.bench_retry_fanout --rows 200 --latency 0.15 --width 3
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_providers import fake_providers
+from src.geocoding_retry import intelligent_retry_geocode
+
+
+def build_rows(n):
+    """Lignes en échec avec nom, rue et ville (toutes distinctes)."""
+    return [
+        pd.Series({
+            "name": f"Societe {i}",
+            "street": f"{i % 180 + 1} Rue {i}",
+            "postal_code": "1000",
+            "city": "Tunis",
+            "country": "Tunisie",
+            "full_address": f"Societe {i}, {i % 180 + 1} Rue {i}, Tunis",
+            "status": "ZERO_RESULTS",
+        })
+        for i in range(n)
+    ]
+
+
+def run(rows, latency, fan_out, width, target_precision="ROOFTOP"):
+    """Relance chaque ligne et mesure sa latence."""
+    latencies, precisions, row_calls = [], [], []
+    with fake_providers(latency=latency) as stats:
+        for index, row in enumerate(rows):
+            start = time.perf_counter()
+            result = intelligent_retry_geocode(row, index, target_precision=target_precision,
+                                               fan_out=fan_out, fan_out_width=width)
+            latencies.append(time.perf_counter() - start)
+            precisions.append(result.get("precision_level"))
+            row_calls.append(result.get("retry_calls", 0))
+        # Laisser finir les appels abandonnés pour les compter
+        time.sleep(latency * 2)
+    latencies = np.array(latencies)
+    return {
+        "mode": f"parallèle (largeur {width})" if fan_out else "séquentiel",
+        "p50 (s)": round(float(np.percentile(latencies, 50)), 3),
+        "p95 (s)": round(float(np.percentile(latencies, 95)), 3),
+        "moyenne (s)": round(float(latencies.mean()), 3),
+        "appels/ligne": round(sum(stats["calls"].values()) / len(rows), 2),
+        "ROOFTOP": sum(p == "ROOFTOP" for p in precisions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--width", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    report = pd.DataFrame([
+        run(rows, args.latency, fan_out=False, width=1),
+        run(rows, args.latency, fan_out=True, width=args.width),
+    ])
+    print(f"{args.rows} lignes, latence simulée {args.latency * 1000:.0f} ms par appel\n")
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Test de charge du service HTTP de géocodage contre des fournisseurs factices.
+
+Lance `src.service` sur un port libre, remplace HERE / Google / OSM par les
+fournisseurs factices (benchmarks.fake_providers) et envoie des requêtes
+unitaires depuis `--concurrency` clients (connexions persistantes). Une part
+`--repeat` des adresses est déjà connue (servie par le cache).
+
+Usage :
+    python -m benchmarks.bench_service --requests 1000 --concurrency 16 --latency 0.08
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+import numpy as np
+
+from benchmarks.fake_providers import fake_providers
+from src.service import start_service
+
+
+def build_queries(n, repeat, seed=0):
+    """Requêtes unitaires ; une part `repeat` reprend une adresse déjà demandée."""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n):
+        if queries and rng.random() < repeat:
+            queries.append(rng.choice(queries))
+        else:
+            queries.append({"street": f"{i % 180 + 1} Rue {i}", "city": "Tunis", "postal_code": "1000"})
+    return queries
+
+
+def run(queries, port, concurrency, strategy, deadline_ms):
+    """Envoie les requêtes et retourne (latences en s, statuts, durée totale)."""
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    pending = iter(queries)
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        while True:
+            with lock:
+                query = next(pending, None)
+            if query is None:
+                break
+            start = time.perf_counter()
+            connection.request("GET", "/geocode?" + urlencode({**query, "strategy": strategy, "deadline_ms": deadline_ms}))
+            response = connection.getresponse()
+            body = json.loads(response.read())
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[body.get("status", response.status)] += 1
+        connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.08, help="Latence simulée d'un appel fournisseur (s)")
+    parser.add_argument("--repeat", type=float, default=0.3, help="Part des adresses déjà demandées")
+    parser.add_argument("--strategy", default="multi")
+    parser.add_argument("--deadline-ms", type=int, default=2000)
+    args = parser.parse_args()
+
+    queries = build_queries(args.requests, args.repeat)
+    server = start_service(port=0)
+    rates = {api: 10_000 for api in ("here", "google", "google_places", "osm")}
+    try:
+        with fake_providers(latency=args.latency, rates=rates) as stats:
+            latencies, statuses, total = run(queries, server.server_address[1], args.concurrency,
+                                             args.strategy, args.deadline_ms)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(f"{len(latencies)} requêtes, {args.concurrency} clients, latence fournisseur {args.latency * 1000:.0f} ms")
+    print(f"débit   : {len(latencies) / total:.1f} req/s")
+    print(f"latence : p50 {p50:.1f} ms · p95 {p95:.1f} ms · p99 {p99:.1f} ms · max {latencies.max() * 1000:.1f} ms")
+    print(f"statuts : {dict(statuses)}")
+    print(f"appels fournisseurs : {dict(stats['calls'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Construction et requêtes de l'index spatial sur 1M de points.
+
+Usage :
+    python -m benchmarks.bench_spatial --points 1000000 --queries 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.spatial_index import SpatialIndex
+
+# Emprise approximative de la Tunisie
+LAT_RANGE = (30.2, 37.5)
+LON_RANGE = (7.5, 11.6)
+
+
+def build_points(n, seed=0):
+    """Points factices : 80 % concentrés autour de quelques villes, 20 % uniformes."""
+    rng = np.random.default_rng(seed)
+    centers = np.array([[36.80, 10.18], [34.74, 10.76], [35.83, 10.64], [37.27, 9.87], [33.88, 10.10]])
+    n_clustered = int(n * 0.8)
+    picks = centers[rng.integers(0, len(centers), n_clustered)]
+    clustered = picks + rng.normal(0, 0.05, (n_clustered, 2))
+    uniform = np.column_stack([
+        rng.uniform(*LAT_RANGE, n - n_clustered),
+        rng.uniform(*LON_RANGE, n - n_clustered),
+    ])
+    coords = np.vstack([clustered, uniform])
+    return pd.DataFrame({
+        "latitude": coords[:, 0].round(6),
+        "longitude": coords[:, 1].round(6),
+        "formatted_address": [f"Adresse {i}" for i in range(n)],
+        "precision_level": "ROOFTOP",
+        "api_used": "here",
+        "status": "OK",
+    })
+
+
+def timed(label, func, results):
+    start = time.perf_counter()
+    value = func()
+    results.append((label, time.perf_counter() - start))
+    return value
+
+
+def run(n_points, n_queries, radius_m):
+    df = build_points(n_points)
+    rng = np.random.default_rng(1)
+    sample = df.sample(n_queries, random_state=1)
+    # Requêtes à ~50 m de points connus
+    q_lat = sample["latitude"].to_numpy() + rng.normal(0, 0.0003, n_queries)
+    q_lon = sample["longitude"].to_numpy() + rng.normal(0, 0.0003, n_queries)
+
+    results = []
+    index = timed("construction", lambda: SpatialIndex.from_frame(df), results)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "spatial_index.npz")
+        timed("sauvegarde .npz", lambda: index.save(path), results)
+        size_mb = os.path.getsize(path) / 1024 ** 2
+        index = timed("chargement .npz", lambda: SpatialIndex.load(path), results)
+
+    pairs = timed(f"query_radius ({radius_m} m)", lambda: index.query_radius(q_lat, q_lon, radius_m), results)
+    point_index, _ = timed("nearest", lambda: index.nearest(q_lat, q_lon, radius_m), results)
+    timed("reverse_geocode", lambda: index.reverse_geocode(q_lat, q_lon, radius_m), results)
+    return results, size_mb, len(pairs), float((point_index >= 0).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--radius", type=float, default=200)
+    args = parser.parse_args()
+
+    results, size_mb, n_pairs, hit_rate = run(args.points, args.queries, args.radius)
+    print(f"{args.points:,} points, {args.queries:,} requêtes — fichier {size_mb:.1f} Mo\n")
+    print(f"{'étape':<26}{'secondes':>10}{'requêtes/s':>14}")
+    for label, seconds in results:
+        rate = f"{args.queries / seconds:,.0f}" if label not in ("construction", "sauvegarde .npz", "chargement .npz") else ""
+        print(f"{label:<26}{seconds:>10.3f}{rate:>14}")
+    print(f"\nPaires dans le rayon : {n_pairs:,} — requêtes avec voisin : {hit_rate:.1%}")
+
+
+if __name__ == "__main__":
+    main()
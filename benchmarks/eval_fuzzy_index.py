@@ -0,0 +1,167 @@
+"""
+Précision / rappel et latence de l'index flou d'adresses.
+
+Échantillon étiqueté : CSV avec les colonnes address, postal_code, city,
+place_id (les lignes de même place_id désignent le même lieu). La première
+ligne de chaque place_id est indexée, les suivantes servent de requêtes.
+Sans --sample, un échantillon synthétique est généré (fautes de frappe,
+« Rue » manquant, mots inversés, zéros de tête) avec des négatifs difficiles
+(même rue avec un autre numéro, autre rue au même numéro).
+
+Usage :
+    python -m benchmarks.eval_fuzzy_index
+    python -m benchmarks.eval_fuzzy_index --sample data/labelled_addresses.csv
+    python -m benchmarks.eval_fuzzy_index --entries 200000 --queries 20000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.fuzzy_index import FuzzyIndex, normalize_address, row_block
+
+STREETS = [
+    "Habib Bourguiba", "de Marseille", "Ibn Khaldoun", "Farhat Hached", "de la Liberté", "Mohamed V",
+    "Hédi Chaker", "Taieb Mhiri", "de Palestine", "Alain Savary", "de Carthage", "Jean Jaurès",
+    "de Rome", "de Paris", "Hédi Nouira", "Mongi Slim", "de Londres", "Ali Belhouane", "de Grèce",
+    "Abou El Kacem Chebbi", "Tahar Haddad", "des Jasmins", "de l'Indépendance", "Bab Bhar",
+]
+STREET_TYPES = ["Rue", "Avenue", "Av", "Rue", "Boulevard"]
+POSTAL_CODES = ["1000", "1002", "1053", "2080", "3000", "4000", "5000", "8050", "2070", "7000"]
+THRESHOLDS = [0.5, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9]
+
+
+def _typo(word, rng):
+    if len(word) < 5:
+        return word
+    i = int(rng.integers(1, len(word) - 2))
+    kind = rng.integers(0, 3)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + word[i] + word[i:]
+
+
+def _variant(number, street_type, street, rng):
+    """Version bruitée d'une adresse (même lieu)."""
+    words = street.split()
+    kind = rng.integers(0, 5)
+    if kind == 0:
+        words = [_typo(w, rng) for w in words]
+        return f"{number} {street_type} {' '.join(words)}"
+    if kind == 1:
+        return f"{number} {street}"
+    if kind == 2:
+        return f"{street_type} {street} {number}"
+    if kind == 3:
+        return f"{number:03d} {street_type.upper()} {street.upper()}"
+    return f"{number}, {street_type.lower()} {' '.join(_typo(w, rng) for w in words)}".replace("é", "e")
+
+
+def synthetic_sample(places=2000, variants=2, seed=0):
+    """Échantillon étiqueté : place_id commun = même lieu (lieux tous distincts)."""
+    rng = np.random.default_rng(seed)
+    combos = len(STREETS) * 199 * len(POSTAL_CODES)
+    picks = rng.choice(combos, size=min(places, combos), replace=False)
+    keys = {(int(k % 199) + 1, STREETS[int(k // 199 % len(STREETS))], POSTAL_CODES[int(k // 199 // len(STREETS))])
+            for k in picks}
+
+    rows = []
+    for place_id, (number, street, postal_code) in enumerate(sorted(keys)):
+        street_type = STREET_TYPES[rng.integers(0, len(STREET_TYPES))]
+        rows.append((f"{number} {street_type} {street}", postal_code, place_id))
+        for _ in range(variants):
+            rows.append((_variant(number, street_type, street, rng), postal_code, place_id))
+        # Négatifs difficiles (lieux non indexés) : même rue autre numéro, autre rue même numéro
+        negatives = [(number + int(rng.integers(1, 9)), street),
+                     (number, STREETS[(STREETS.index(street) + 1) % len(STREETS)])]
+        for neg_number, neg_street in negatives:
+            if (neg_number, neg_street, postal_code) not in keys:
+                rows.append((f"{neg_number} {street_type} {neg_street}", postal_code, -1))
+    return pd.DataFrame(rows, columns=["address", "postal_code", "place_id"]).assign(city=None)
+
+
+def _split(sample):
+    """Adresses indexées (1re occurrence de chaque lieu) et requêtes étiquetées."""
+    sample = sample.assign(
+        block=[row_block(r) for r in sample.to_dict("records")],
+        normalized=sample["address"].map(normalize_address),
+    )
+    labelled = sample[sample["place_id"] >= 0]
+    indexed = labelled.drop_duplicates("place_id")
+    queries = pd.concat([labelled.drop(indexed.index), sample[sample["place_id"] < 0]])
+    return indexed, queries
+
+
+def evaluate(sample, thresholds=THRESHOLDS):
+    """Précision et rappel pour chaque seuil."""
+    indexed, queries = _split(sample)
+    results = []
+    for threshold in thresholds:
+        index = FuzzyIndex(threshold=threshold)
+        for row in indexed.itertuples():
+            index.add(row.block, row.normalized, {"place_id": row.place_id})
+        true_pos = false_pos = 0
+        positives = int((queries["place_id"] >= 0).sum())
+        for row in queries.itertuples():
+            match = index.lookup(row.block, row.normalized)
+            if match is None:
+                continue
+            if match[1]["place_id"] == row.place_id:
+                true_pos += 1
+            else:
+                false_pos += 1
+        returned = true_pos + false_pos
+        results.append({
+            "seuil": threshold,
+            "précision": round(true_pos / returned, 3) if returned else float("nan"),
+            "rappel": round(true_pos / positives, 3) if positives else float("nan"),
+            "réponses": returned,
+        })
+    return pd.DataFrame(results)
+
+
+def benchmark_latency(entries, n_queries, threshold=0.7, seed=1):
+    """Latence d'une recherche (µs) dans un index de `entries` adresses."""
+    sample = synthetic_sample(places=entries, variants=1, seed=seed)
+    indexed, queries = _split(sample)
+    index = FuzzyIndex(threshold=threshold)
+    start = time.perf_counter()
+    for row in indexed.itertuples():
+        index.add(row.block, row.normalized, {"place_id": row.place_id})
+    build_seconds = time.perf_counter() - start
+
+    queries = queries.sample(min(n_queries, len(queries)), random_state=seed)
+    latencies = []
+    for row in queries.itertuples():
+        start = time.perf_counter()
+        index.lookup(row.block, row.normalized)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1e6
+    return {
+        "adresses indexées": len(index),
+        "construction (s)": round(build_seconds, 2),
+        "p50 (µs)": round(float(np.percentile(latencies, 50)), 1),
+        "p99 (µs)": round(float(np.percentile(latencies, 99)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", help="CSV étiqueté (address, postal_code, city, place_id)")
+    parser.add_argument("--entries", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    args = parser.parse_args()
+
+    sample = pd.read_csv(args.sample, dtype={"postal_code": str}) if args.sample else synthetic_sample()
+    print("Précision / rappel par seuil\n")
+    print(evaluate(sample).to_string(index=False))
+    print("\nLatence de recherche\n")
+    for key, value in benchmark_latency(args.entries, args.queries).items():
+        print(f"{key:<20}{value}")
+
+
+if __name__ == "__main__":
+    main()
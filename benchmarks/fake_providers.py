@@ -0,0 +1,111 @@
+"""
+Fournisseurs de géocodage factices pour les benchmarks.
+
+Remplace les appels HERE / Google / OSM du moteur de géocodage et du moteur
+de relance par des fonctions en mémoire avec une latence et des précisions simulées,
+déterministes pour une même adresse. Les appels passent par un seau à
+jetons par API (limites de débit simulées).
+
+Exemple :
+    with fake_providers(latency=0.15) as stats:
+        intelligent_retry_geocode(row, 0)
+    print(stats["calls"])
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from src import geocoding, geocoding_retry
+from src.memo import memoize
+from src.rate_limiter import TokenBucket
+
+# Probabilités (ROOFTOP, RANGE_INTERPOLATED, GEOMETRIC_CENTER, APPROXIMATE) ; le reste : ZERO_RESULTS
+PRECISION_PROBABILITIES = {
+    "here": (0.20, 0.15, 0.25, 0.25),
+    "google": (0.25, 0.10, 0.25, 0.30),
+    "osm": (0.05, 0.05, 0.20, 0.40),
+}
+PRECISIONS = ("ROOFTOP", "RANGE_INTERPOLATED", "GEOMETRIC_CENTER", "APPROXIMATE")
+DEFAULT_RATES = {"here": 50, "google": 50, "google_places": 50, "osm": 50}
+
+
+def _draw(api_name, key):
+    """Tirage déterministe dans [0, 1) pour (API, adresse)."""
+    digest = hashlib.blake2b(f"{api_name}|{key}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") / 2 ** 64
+
+
+def fake_result(api_name, key):
+    """Résultat simulé au format des APIs."""
+    draw = _draw(api_name, key)
+    threshold = 0.0
+    for precision, probability in zip(PRECISIONS, PRECISION_PROBABILITIES[api_name.split("_")[0]]):
+        threshold += probability
+        if draw < threshold:
+            return {
+                "status": "OK", "api_used": api_name.split("_")[0], "precision_level": precision,
+                "latitude": 36.8 + draw / 10, "longitude": 10.18 + draw / 10,
+                "formatted_address": f"{api_name}:{key}",
+            }
+    return {"status": "ZERO_RESULTS", "api_used": api_name.split("_")[0]}
+
+
+@contextmanager
+def fake_providers(latency=0.15, rates=None):
+    """
+    Installe les fournisseurs factices dans les moteurs de géocodage et de relance.
+
+    Args:
+        latency: Latence simulée d'un appel (secondes)
+        rates: Débit maximal par API (requêtes/s)
+
+    Yields:
+        dict: Statistiques {"calls": Counter par API}
+    """
+    rates = {**DEFAULT_RATES, **(rates or {})}
+    buckets = {api: TokenBucket(rate) for api, rate in rates.items()}
+    stats = {"calls": Counter()}
+    lock = threading.Lock()
+
+    def network(api_name, key):
+        buckets[api_name].acquire()
+        with lock:
+            stats["calls"][api_name] += 1
+        time.sleep(latency)
+        return fake_result(api_name, key)
+
+    @memoize
+    def here(address):
+        return network("here", address)
+
+    @memoize
+    def google(address, postal_code=None, city=None, governorate=None, place_id=None):
+        return network("google", place_id or address)
+
+    @memoize
+    def osm(address):
+        return network("osm", address)
+
+    replacements = {
+        "geocode_with_here_cached": here,
+        "geocode_with_google_cached": google,
+        "geocode_with_osm_cached": osm,
+        "get_place_id_with_google": lambda query: network("google_places", query).get("formatted_address"),
+        "geocode_with_google": lambda address=None, components_dict=None, place_id=None:
+            network("google", place_id or address),
+        "geocode_with_osm_structured": lambda **fields: network("osm", repr(sorted(fields.items()))),
+    }
+    originals = {
+        (module, name): getattr(module, name)
+        for module in (geocoding, geocoding_retry)
+        for name in replacements if hasattr(module, name)
+    }
+    for module, name in originals:
+        setattr(module, name, replacements[name])
+    try:
+        yield stats
+    finally:
+        for (module, name), func in originals.items():
+            setattr(module, name, func)
@@ -0,0 +1,278 @@
+"""
+Serveur HTTP factice imitant HERE, Google et Nominatim, pour travailler hors ligne.
+
+Les réponses suivent le format des vraies APIs (HERE geocode, Google
+geocode et findplacefromtext, Nominatim search) et sont déterministes pour
+une même requête (précision tirée comme dans benchmarks.fake_providers).
+Latence, erreurs et limitations de débit (429 / OVER_QUERY_LIMIT) sont
+injectées selon un profil par fournisseur, avec un générateur à graine fixe.
+
+Les clients `src/apis/` y sont redirigés par leurs URL de base :
+    HERE_BASE_URL=http://127.0.0.1:8700
+    GOOGLE_BASE_URL=http://127.0.0.1:8700
+    OSM_BASE_URL=http://127.0.0.1:8700
+
+Usage :
+    python -m benchmarks.fake_server --port 8700 --latency lognormal:0.15,0.4 --throttle-rate 0.02
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from benchmarks.fake_providers import fake_result
+
+# Précision simulée -> type de résultat de chaque fournisseur
+HERE_RESULT_TYPES = {
+    "ROOFTOP": "houseNumber",
+    "RANGE_INTERPOLATED": "street",
+    "GEOMETRIC_CENTER": "postalCode",
+    "APPROXIMATE": "locality",
+}
+OSM_TYPES = {
+    "ROOFTOP": ("house", "building"),
+    "RANGE_INTERPOLATED": ("road", "highway"),
+    "GEOMETRIC_CENTER": ("suburb", "place"),
+    "APPROXIMATE": ("city", "place"),
+}
+
+ROUTES = {
+    "/v1/geocode": ("here", "geocode"),
+    "/maps/api/geocode/json": ("google", "geocode"),
+    "/maps/api/place/findplacefromtext/json": ("google_places", "findplace"),
+    "/search": ("osm", "search"),
+}
+
+
+def parse_latency(spec):
+    """
+    Distribution de latence à partir d'une chaîne.
+
+    Formats : "fixed:0.1", "uniform:0.05,0.3", "lognormal:médiane,sigma",
+    "exponential:moyenne".
+
+    Returns:
+        callable: Fonction(rng) -> secondes
+    """
+    kind, _, values = spec.partition(":")
+    params = [float(value) for value in values.split(",") if value]
+    if kind == "fixed":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "lognormal":
+        median, sigma = params
+        return lambda rng: median * rng.lognormvariate(0, sigma)
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1 / params[0])
+    raise ValueError(f"Distribution de latence inconnue : {spec}")
+
+
+class ProviderProfile:
+    """
+    Comportement simulé d'un fournisseur.
+
+    Args:
+        latency: Distribution de latence (voir `parse_latency`)
+        error_rate: Part des requêtes en erreur serveur (HTTP 500 / UNKNOWN_ERROR)
+        throttle_rate: Part des requêtes limitées (HTTP 429 / OVER_QUERY_LIMIT)
+        retry_after: En-tête Retry-After des réponses 429 (secondes)
+    """
+
+    def __init__(self, latency="fixed:0", error_rate=0.0, throttle_rate=0.0, retry_after=1):
+        self.latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+
+
+def _key(params, *fields):
+    return "|".join(str(params.get(field, "")) for field in fields)
+
+
+def _place_id(key):
+    return "fake-" + hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def here_response(params):
+    """Réponse HERE geocode (items)."""
+    result = fake_result("here", params.get("q", ""))
+    if result["status"] != "OK":
+        return 200, {"items": []}
+    return 200, {"items": [{
+        "title": result["formatted_address"],
+        "resultType": HERE_RESULT_TYPES[result["precision_level"]],
+        "address": {"label": result["formatted_address"], "countryCode": "TUN"},
+        "position": {"lat": result["latitude"], "lng": result["longitude"]},
+    }]}
+
+
+def google_response(params):
+    """Réponse Google geocode (status, results)."""
+    key = params.get("place_id") or params.get("address") or params.get("components", "")
+    result = fake_result("google", key)
+    if result["status"] != "OK":
+        return 200, {"status": "ZERO_RESULTS", "results": []}
+    return 200, {"status": "OK", "results": [{
+        "formatted_address": result["formatted_address"],
+        "place_id": _place_id(key),
+        "geometry": {
+            "location": {"lat": result["latitude"], "lng": result["longitude"]},
+            "location_type": result["precision_level"],
+        },
+    }]}
+
+
+def findplace_response(params):
+    """Réponse Google findplacefromtext (candidates)."""
+    query = params.get("input", "")
+    result = fake_result("google_places", query)
+    if result["status"] != "OK":
+        return 200, {"status": "ZERO_RESULTS", "candidates": []}
+    return 200, {"status": "OK", "candidates": [{"place_id": _place_id(query)}]}
+
+
+def osm_response(params):
+    """Réponse Nominatim search (liste)."""
+    key = params.get("q") or _key(params, "street", "city", "postalcode", "country")
+    result = fake_result("osm", key)
+    if result["status"] != "OK":
+        return 200, []
+    osm_type, osm_class = OSM_TYPES[result["precision_level"]]
+    return 200, [{
+        "place_id": int(_place_id(key)[5:13], 16),
+        "lat": str(result["latitude"]),
+        "lon": str(result["longitude"]),
+        "display_name": result["formatted_address"],
+        "type": osm_type,
+        "class": osm_class,
+    }]
+
+
+RESPONDERS = {
+    "here": here_response,
+    "google": google_response,
+    "google_places": findplace_response,
+    "osm": osm_response,
+}
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    """
+    Serveur des quatre endpoints, avec profils et compteurs.
+
+    Args:
+        address: (hôte, port) ; port 0 pour un port libre
+        profiles: {api: ProviderProfile} (les API absentes répondent sans latence ni erreur)
+        seed: Graine du tirage des latences et des erreurs
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), profiles=None, seed=0):
+        super().__init__(address, _FakeHandler)
+        self.profiles = profiles or {}
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def draw(self, api_name):
+        """Tire (latence, incident) pour une requête : incident None, "error" ou "throttle"."""
+        profile = self.profiles.get(api_name) or ProviderProfile()
+        with self._lock:
+            latency = max(0.0, profile.latency(self._rng))
+            draw = self._rng.random()
+        if draw < profile.throttle_rate:
+            return latency, "throttle", profile
+        if draw < profile.throttle_rate + profile.error_rate:
+            return latency, "error", profile
+        return latency, None, profile
+
+    def count(self, api_name, outcome):
+        with self._lock:
+            self.stats[(api_name, outcome)] += 1
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path)
+        if route is None:
+            self._send(404, {"error": "not found"})
+            return
+        api_name = route[0]
+        params = dict(parse_qsl(url.query))
+        latency, incident, profile = self.server.draw(api_name)
+        time.sleep(latency)
+        self.server.count(api_name, incident or "ok")
+
+        google = api_name.startswith("google")
+        if incident == "throttle":
+            if google:
+                self._send(200, {"status": "OVER_QUERY_LIMIT", "error_message": "Fake quota exceeded"})
+            else:
+                self._send(429, {"error": "Too Many Requests"}, {"Retry-After": str(profile.retry_after)})
+        elif incident == "error":
+            if google:
+                self._send(200, {"status": "UNKNOWN_ERROR", "error_message": "Fake server error"})
+            else:
+                self._send(500, {"error": "Internal Server Error"})
+        else:
+            self._send(*RESPONDERS[api_name](params))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_server(profiles=None, host="127.0.0.1", port=0, seed=0):
+    """Démarre le serveur factice dans un thread d'arrière-plan."""
+    server = FakeProviderServer((host, port), profiles, seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency", default="lognormal:0.15,0.4", help="Distribution de latence de tous les fournisseurs")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    profile = ProviderProfile(args.latency, args.error_rate, args.throttle_rate)
+    server = FakeProviderServer((args.host, args.port), {api: profile for api in RESPONDERS}, args.seed)
+    print(f"Fournisseurs factices sur {server.base_url} (HERE, Google, Nominatim)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(dict(server.stats))
+
+
+if __name__ == "__main__":
+    main()
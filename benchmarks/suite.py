@@ -0,0 +1,338 @@
+"""
+Suite de benchmarks de bout en bout, avec seuils de régression.
+
+Chaque cas mesure une étape du parcours d'un job, hors ligne :
+- read_file : lecture d'un gros CSV (ISO-8859-1)
+- reformat : reformatage des adresses, ligne par ligne (`generate_reformatted_address`)
+  vs version vectorisée pandas (référence, résultat identique vérifié)
+- geocode : débit de `parallel_geocode_row` contre les fournisseurs factices,
+  à plusieurs niveaux de concurrence
+- merge : report des résultats dans le DataFrame enrichi (`launch_geocoding`)
+- export : `export_enriched_results` par format
+- analytics : graphiques et rapport PDF de la page Analytics
+
+Chaque mesure est la médiane de `--repeat` exécutions. Les résultats sont
+écrits en JSON (`--output`) et comparés à `benchmarks/baseline.json` : le
+script sort en erreur si une métrique se dégrade de plus de `--threshold`
+(50 % par défaut, les durées courtes étant bruitées ; seuil par métrique dans
+"thresholds" de la référence). La référence dépend de la machine : la régénérer avec
+`--update-baseline` sur la machine qui exécute les contrôles.
+
+Usage :
+    python -m benchmarks.suite
+    python -m benchmarks.suite --only reformat merge --repeat 5
+    python -m benchmarks.suite --update-baseline
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import matplotlib
+
+matplotlib.use("Agg")
+# Les emojis des titres n'existent pas dans la police par défaut de matplotlib
+warnings.filterwarnings("ignore", message="Glyph .* missing from font")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+from streamlit import config as streamlit_config  # noqa: E402
+
+from benchmarks import bench_export  # noqa: E402
+from benchmarks.bench_dtypes import build_enriched_frame  # noqa: E402
+from benchmarks.bench_ingestion import generate_csv  # noqa: E402
+from benchmarks.fake_providers import fake_providers  # noqa: E402
+from src.geocoding import generate_reformatted_address, parallel_geocode_row  # noqa: E402
+from src.ingestion import read_file  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+OUTPUT_PATH = "data/output/benchmarks/latest.json"
+DEFAULT_THRESHOLD = 0.5
+
+# Pages Streamlit importées hors `streamlit run` : avertissements masqués
+streamlit_config.set_option("global.showWarningOnDirectExecution", False)
+for _name in list(logging.root.manager.loggerDict):
+    if _name.startswith("streamlit"):
+        logging.getLogger(_name).setLevel(logging.ERROR)
+
+KEYWORDS = r"\b(?:Rue|Avenue|Av|Boulevard|Blvd|Résidence|Immeuble)\b"
+
+
+def metric(value, unit="s", better="lower"):
+    return {"value": round(float(value), 4), "unit": unit, "better": better}
+
+
+def timed(func, repeat):
+    """Médiane des durées de `func()` sur `repeat` exécutions (et dernier résultat)."""
+    durations, value = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), value
+
+
+# ========== CAS ==========
+
+def bench_read_file(scale, repeat):
+    rows = scale["read_rows"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "large.csv")
+        generate_csv(path, rows)
+
+        def read():
+            with open(path, "rb") as f:
+                return len(read_file(f, sep=","))
+
+        seconds, count = timed(read, repeat)
+    assert count == rows
+    return {"read_file.seconds": metric(seconds), "read_file.rows_per_s": metric(rows / seconds, "rows/s", "higher")}
+
+
+def vectorized_reformat(df):
+    """Reformatage vectorisé, équivalent à `generate_reformatted_address` ligne par ligne."""
+    street = df["street"].where(df["street"].notna()).astype(str)
+    street = street.str.replace(r"^0{1,3}", "", regex=True)
+    street = street.str.replace(r"0\s+(\d+)", r"\1", regex=True)
+    street = street.str.replace(r"(?i)\b(?:IMM?|ILL|IMMB)\b", "Immeuble", regex=True)
+    street = street.str.replace(r"(?i)\b(?:RES|RS)\b", "Résidence", regex=True)
+
+    parts = street.str.extract(r"^(\d{1,4})(\s*)(.*)", expand=True)
+    numbered = parts[0].notna() & ~parts[2].fillna("").str.contains("(?i)" + KEYWORDS, regex=True)
+    plain = ~street.str.contains("(?i)" + KEYWORDS, regex=True)
+    street = street.where(~plain, "Rue " + street).where(plain, street.str.strip())
+    street = street.where(~numbered, (parts[0] + parts[1] + "Rue " + parts[2]).str.strip())
+    address = street.where(df["street"].notna())
+
+    for field in ["postal_code", "city", "governorate", "country"]:
+        if field not in df.columns:
+            continue
+        value = df[field].where(df[field].notna()).astype(str).str.strip().where(df[field].notna())
+        joined = address + ", " + value
+        address = joined.where(address.notna() & value.notna(), address.fillna(value))
+    return address.fillna("")
+
+
+def bench_reformat(scale, repeat):
+    df = build_enriched_frame(scale["reformat_rows"])[["street", "postal_code", "city", "country"]]
+    df["street"] = df["street"].str.replace("Rue", "IMM", n=1).where(df.index % 3 != 0, "0 " + df["street"])
+    per_row_seconds, per_row = timed(lambda: df.apply(generate_reformatted_address, axis=1), repeat)
+    vectorized_seconds, vectorized = timed(lambda: vectorized_reformat(df), repeat)
+    assert per_row.tolist() == vectorized.tolist(), "Reformatage vectorisé différent du reformatage par ligne"
+    return {
+        "reformat.per_row_seconds": metric(per_row_seconds),
+        "reformat.vectorized_seconds": metric(vectorized_seconds),
+        "reformat.speedup": metric(per_row_seconds / vectorized_seconds, "x", "higher"),
+    }
+
+
+def bench_geocode(scale, repeat):
+    rows = scale["geocode_rows"]
+    results = {}
+    for concurrency in scale["concurrency"]:
+        def geocode():
+            # Fournisseurs neufs à chaque exécution : aucune réponse servie par le cache
+            with fake_providers(latency=scale["latency"], rates={"here": 100_000}):
+                df = pd.DataFrame({
+                    "full_address": [f"{i} Rue {time.perf_counter_ns()}, Tunis" for i in range(rows)],
+                    "street": [f"{i} Rue de Marseille" for i in range(rows)],
+                    "city": "Tunis",
+                })
+                return parallel_geocode_row(df, max_workers=concurrency, api_mode="here", mapped_fields={})
+
+        seconds, result = timed(geocode, repeat)
+        assert len(result) == rows
+        results[f"geocode.c{concurrency}.rows_per_s"] = metric(rows / seconds, "rows/s", "higher")
+    return results
+
+
+def bench_merge(scale, repeat):
+    # Import tardif : la page Streamlit n'est chargée que pour ce cas
+    from app.page_geocoding import merge_enriched_results
+
+    source = build_enriched_frame(scale["merge_rows"])[["name", "street", "postal_code", "city", "country"]]
+    results = build_enriched_frame(scale["merge_results"], seed=1).drop(columns=["name"])
+    results["row_index"] = range(0, 2 * len(results), 2)
+    seconds, merged = timed(lambda: merge_enriched_results(source.copy(), results), repeat)
+    assert merged["status"].notna().sum() == len(results)
+    return {"merge.seconds": metric(seconds), "merge.rows_per_s": metric(len(results) / seconds, "rows/s", "higher")}
+
+
+def bench_export_formats(scale, repeat):
+    runs = [bench_export.run(scale["export_rows"]) for _ in range(repeat)]
+    results = {}
+    for index, case in enumerate(runs[0]):
+        name = re.sub(r"\W+", "_", case["format"]).strip("_")
+        results[f"export.{name}.seconds"] = metric(statistics.median(run[index]["seconds"] for run in runs))
+    return results
+
+
+def bench_analytics(scale, repeat):
+    from app.page_analytics import create_analytics_plots, generate_pdf_report
+
+    df = build_enriched_frame(scale["analytics_rows"])
+    success = df[df["status"] == "OK"]
+    stats = {
+        "total_rows": len(df),
+        "total_success": len(success),
+        "total_failed": len(df) - len(success),
+        "success_rate": len(success) / len(df) * 100,
+        "precision_details": success["precision_level"].value_counts().to_dict(),
+        "api_details": df["api_used"].value_counts().to_dict(),
+        "failed_by_status": df["status"].value_counts().to_dict(),
+    }
+    figures = []
+
+    def plots():
+        figures.append(create_analytics_plots(df))
+        return figures[-1]
+
+    plot_seconds, fig = timed(plots, repeat)
+    pdf_seconds, buffer = timed(lambda: generate_pdf_report(df, fig, stats), repeat)
+    for figure in figures:
+        plt.close(figure)
+    assert buffer.getbuffer().nbytes > 0
+    return {"analytics.plots_seconds": metric(plot_seconds), "analytics.pdf_seconds": metric(pdf_seconds)}
+
+
+CASES = {
+    "read_file": bench_read_file,
+    "reformat": bench_reformat,
+    "geocode": bench_geocode,
+    "merge": bench_merge,
+    "export": bench_export_formats,
+    "analytics": bench_analytics,
+}
+
+SCALES = {
+    "quick": {
+        "read_rows": 20_000, "reformat_rows": 5_000, "geocode_rows": 40, "concurrency": [1, 4],
+        "latency": 0.005, "merge_rows": 4_000, "merge_results": 500, "export_rows": 20_000,
+        "analytics_rows": 5_000,
+    },
+    "default": {
+        "read_rows": 300_000, "reformat_rows": 50_000, "geocode_rows": 200, "concurrency": [1, 4, 10],
+        "latency": 0.01, "merge_rows": 20_000, "merge_results": 2_000, "export_rows": 200_000,
+        "analytics_rows": 100_000,
+    },
+}
+
+
+# ========== COMPARAISON ==========
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare des mesures à la référence.
+
+    Args:
+        results: {métrique: {"value", "unit", "better"}}
+        baseline: Contenu de baseline.json ({"metrics": ..., "thresholds": ...})
+        threshold: Dégradation relative tolérée par défaut
+
+    Returns:
+        list: Lignes {"metric", "baseline", "value", "change", "regression"} (métriques communes)
+    """
+    thresholds = baseline.get("thresholds", {})
+    rows = []
+    for name, current in results.items():
+        reference = baseline.get("metrics", {}).get(name)
+        if reference is None or not reference["value"]:
+            continue
+        change = current["value"] / reference["value"] - 1
+        # Dégradation : plus lent (better=lower) ou moins de débit (better=higher)
+        degradation = change if current["better"] == "lower" else -change
+        rows.append({
+            "metric": name,
+            "baseline": reference["value"],
+            "value": current["value"],
+            "change": round(change, 4),
+            "regression": degradation > thresholds.get(name, threshold),
+        })
+    return rows
+
+
+def run_suite(names, scale, repeat):
+    results = {}
+    for name in names:
+        start = time.perf_counter()
+        results.update(CASES[name](SCALES[scale], repeat))
+        print(f"  {name:<10} {time.perf_counter() - start:6.1f}s", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--scale", choices=list(SCALES), default="default")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true", help="Enregistrer les mesures comme référence")
+    args = parser.parse_args()
+
+    results = run_suite(args.only, args.scale, args.repeat)
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "metrics": results,
+    }
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if baseline and baseline.get("meta", {}).get("scale") != args.scale:
+        print(f"⚠️ Référence mesurée à l'échelle {baseline.get('meta', {}).get('scale')} : comparaison ignorée")
+        baseline = {}
+    comparison = compare(results, baseline, args.threshold)
+    report["comparison"] = comparison
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    compared = {row["metric"]: row for row in comparison}
+    print(f"\n{'métrique':<36}{'référence':>12}{'mesure':>12}{'écart':>9}")
+    for name, current in results.items():
+        row = compared.get(name)
+        reference = f"{row['baseline']:.4g}" if row else "-"
+        change = f"{row['change']:+.0%}" if row else ""
+        flag = "  ❌" if row and row["regression"] else ""
+        print(f"{name:<36}{reference:>12}{current['value']:>12.4g}{change:>9}{flag}")
+    print(f"\nRésultats : {args.output}")
+
+    if args.update_baseline:
+        report["thresholds"] = baseline.get("thresholds", {})
+        report.pop("comparison")
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"Référence mise à jour : {args.baseline}")
+        return 0
+
+    regressions = [row["metric"] for row in comparison if row["regression"]]
+    if regressions:
+        print(f"❌ {len(regressions)} régression(s) au-delà du seuil : {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
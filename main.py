@@ -4,6 +4,10 @@ from app.page_geocoding import run_geocoding_page
 from app.page_retry import run_retry_page
 from app.page_analytics import run_analytics_page
 import base64
+from src.config import METRICS_PORT, QUOTA_ENABLED, SCHEDULER_ENABLED
+from src.metrics import start_metrics_server
+from src.quota import quota_summary
+from src.scheduler import get_scheduler
 from custom_style import apply_custom_style  # Import du style
 
 # Appliquer le style
@@ -61,6 +65,8 @@ def initialize_global_state():
         "retry_filename": None,
         "retry_results": None,
         "retry_updated_df": None,
+        "retry_report": None,
+        "retry_scores": None,
     }
     
     # États spécifiques à page_analytics
@@ -81,6 +87,10 @@ def initialize_global_state():
 # Initialiser l'état global
 initialize_global_state()
 
+# Endpoint /metrics (lancé une seule fois par processus)
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
+
 # === Sidebar avec navigation ===
 with st.sidebar:
     st.markdown("---")
@@ -132,6 +142,35 @@ with st.sidebar:
     
     st.markdown("---")
     
+    # Quotas des APIs (registre partagé entre sessions)
+    if QUOTA_ENABLED:
+        with st.expander("💳 Quotas API", expanded=False):
+            labels = {"day": "jour", "month": "mois"}
+            state_icons = {"ok": "🟢", "soft": "🟠", "hard": "🔴"}
+            for item in quota_summary():
+                if item["limit"] is None and not item["used"]:
+                    continue
+                limit = f"{item['limit']:,}" if item["limit"] is not None else "∞"
+                remaining = f" — reste {item['remaining']:,}" if item["remaining"] is not None else ""
+                st.markdown(
+                    f"{state_icons[item['state']]} **{item['api']}** ({labels[item['period']]}) : "
+                    f"{item['used']:,}/{limit}{remaining}"
+                )
+    
+    # Jobs en cours dans l'ordonnanceur partagé (toutes sessions)
+    if SCHEDULER_ENABLED:
+        with st.expander("🧵 File de géocodage", expanded=False):
+            jobs = get_scheduler().stats()
+            if not jobs:
+                st.caption("Aucun job en cours")
+            lane_icons = {"priority": "⚡", "bulk": "📦"}
+            for item in jobs:
+                st.markdown(
+                    f"{lane_icons[item['lane']]} **{item['job_id']}** : {item['queued']:,} en file, "
+                    f"{item['running']}/{item['max_concurrency']} en cours, {item['done']:,} terminées — "
+                    f"attente moy. {item['wait_avg']:.1f} s (max {item['wait_max']:.1f} s)"
+                )
+    
     # Informations système
     with st.expander("ℹ️ Informations", expanded=False):
         st.markdown("""
@@ -1,8 +1,18 @@
-import requests
 import time
 from datetime import datetime
-from src.config import GOOGLE_API_KEY
+from src.backoff import TRANSIENT_EXCEPTIONS, TRANSIENT_STATUSES, transient_fields
+from src.config import GOOGLE_API_KEY, GOOGLE_BASE_URL
 from src.logger import log_api_call
+from src.quota import quota_exceeded_result, reserve_call
+from src.rate_limiter import acquire_rate_limit
+from src.apis.transport import http_get
+from src.deadline import (
+    deadline_exceeded_result,
+    expired as deadline_expired,
+    remaining as deadline_remaining,
+    request_timeout,
+)
+from src.metrics import observe_api_call
 
 
 def get_place_id_with_google(query: str) -> str:
@@ -15,7 +25,7 @@ def get_place_id_with_google(query: str) -> str:
     Returns:
         place_id si trouvé, None sinon
     """
-    url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
+    url = f"{GOOGLE_BASE_URL}/maps/api/place/findplacefromtext/json"
     params = {
         "input": query,
         "inputtype": "textquery",
@@ -23,14 +33,22 @@ def get_place_id_with_google(query: str) -> str:
         "key": GOOGLE_API_KEY
     }
 
+    if deadline_expired() or acquire_rate_limit("google_places", deadline_remaining()) is None:
+        return None
+    if deadline_expired() or not reserve_call("google_places"):
+        return None
+    start_time = time.time()
+
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = http_get(url, api_name="google_places", params=params, timeout=request_timeout("google_places"))
         data = response.json()
+        observe_api_call("google_places", data["status"], time.time() - start_time)
         if data["status"] == "OK" and data.get("candidates"):
             return data["candidates"][0].get("place_id")
         else:
             print(f"❌ No match or bad status: {data['status']}")
     except Exception as e:
+        observe_api_call("google_places", "ERROR", time.time() - start_time)
         print(f"❌ Exception: {e}")
     return None
 
@@ -47,7 +65,7 @@ def geocode_with_google(address: str = None, components_dict: dict = None, place
     Returns:
         Dictionnaire avec latitude, longitude, adresse formatée, status, etc.
     """
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
+    url = f"{GOOGLE_BASE_URL}/maps/api/geocode/json"
     params = {
         "key": GOOGLE_API_KEY,
         "region": "tn"
@@ -71,10 +89,17 @@ def geocode_with_google(address: str = None, components_dict: dict = None, place
         if address:
             params["address"] = address
 
+    if deadline_expired():
+        return deadline_exceeded_result("google")
+    # Jeton du limiteur attendu dans la limite de l'échéance, quota réservé juste avant l'envoi
+    if acquire_rate_limit("google", deadline_remaining()) is None or deadline_expired():
+        return deadline_exceeded_result("google")
+    if not reserve_call("google"):
+        return quota_exceeded_result("google")
     start_time = time.time()
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = http_get(url, api_name="google", params=params, timeout=request_timeout("google"))
         duration = time.time() - start_time
         data = response.json()
 
@@ -107,6 +132,7 @@ def geocode_with_google(address: str = None, components_dict: dict = None, place
                 "precision_level": None,
                 "precision_level_raw": None,
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                **(transient_fields(response) if data["status"] in TRANSIENT_STATUSES else {}),
             }
             
     except Exception as e:
@@ -123,6 +149,7 @@ def geocode_with_google(address: str = None, components_dict: dict = None, place
             "precision_level": None,
             "precision_level_raw": None,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            **(transient_fields() if isinstance(e, TRANSIENT_EXCEPTIONS) else {}),
         }
 
 
@@ -1,8 +1,17 @@
-import requests
 import time
 from datetime import datetime
-from src.config import HERE_API_KEY
+from src.backoff import TRANSIENT_EXCEPTIONS, TRANSIENT_HTTP_CODES, transient_fields
+from src.config import HERE_API_KEY, HERE_BASE_URL
 from src.logger import log_api_call
+from src.quota import quota_exceeded_result, reserve_call
+from src.rate_limiter import acquire_rate_limit
+from src.apis.transport import http_get
+from src.deadline import (
+    deadline_exceeded_result,
+    expired as deadline_expired,
+    remaining as deadline_remaining,
+    request_timeout,
+)
 
 def determine_here_precision(match_level: str) -> str:
     if not match_level:
@@ -23,18 +32,40 @@ def determine_here_precision(match_level: str) -> str:
         return "UNKNOWN"
 
 def geocode_with_here(address: str) -> dict:
-    url = "https://geocode.search.hereapi.com/v1/geocode"
+    url = f"{HERE_BASE_URL}/v1/geocode"
     params = {
         "q": address,
         "apiKey": HERE_API_KEY,
         "in": "countryCode:TUN"
     }
 
+    if deadline_expired():
+        return deadline_exceeded_result("here")
+    # Jeton du limiteur attendu dans la limite de l'échéance, quota réservé juste avant l'envoi
+    if acquire_rate_limit("here", deadline_remaining()) is None or deadline_expired():
+        return deadline_exceeded_result("here")
+    if not reserve_call("here"):
+        return quota_exceeded_result("here")
     start_time = time.time()
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = http_get(url, api_name="here", params=params, timeout=request_timeout("here"))
         duration = time.time() - start_time
+        if response.status_code in TRANSIENT_HTTP_CODES:
+            # Quota (429) ou indisponibilité : la ligne sera replanifiée
+            log_api_call("here", response.url, "ERROR", duration, error=f"HTTP {response.status_code}")
+            return {
+                "latitude": None,
+                "longitude": None,
+                "formatted_address": None,
+                "status": "ERROR",
+                "error_message": f"HTTP {response.status_code}",
+                "api_used": "here",
+                "precision_level": None,
+                "precision_level_raw": None,
+                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                **transient_fields(response),
+            }
         data = response.json()
         items = data.get("items", [])
         
@@ -80,4 +111,5 @@ def geocode_with_here(address: str) -> dict:
             "precision_level": None,
             "precision_level_raw": None,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            **(transient_fields() if isinstance(e, TRANSIENT_EXCEPTIONS) else {}),
         }
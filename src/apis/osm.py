@@ -1,8 +1,18 @@
 import requests
 import time
 from datetime import datetime
-from src.config import OSM_EMAIL
+from src.backoff import TRANSIENT_EXCEPTIONS, TRANSIENT_HTTP_CODES, transient_fields
+from src.config import OSM_BASE_URL, OSM_EMAIL
 from src.logger import log_api_call
+from src.quota import quota_exceeded_result, reserve_call
+from src.rate_limiter import acquire_rate_limit
+from src.apis.transport import http_get
+from src.deadline import (
+    deadline_exceeded_result,
+    expired as deadline_expired,
+    remaining as deadline_remaining,
+    request_timeout,
+)
 
 
 def geocode_with_osm(address, email=OSM_EMAIL):
@@ -16,7 +26,7 @@ def geocode_with_osm(address, email=OSM_EMAIL):
     Returns:
         dict: Résultat du géocodage avec le format standardisé
     """
-    base_url = "https://nominatim.openstreetmap.org/search"
+    base_url = f"{OSM_BASE_URL}/search"
     
     params = {
         "q": address,
@@ -30,10 +40,17 @@ def geocode_with_osm(address, email=OSM_EMAIL):
         "User-Agent": "GeocodingApp/1.0 (contact via email parameter)"
     }
     
+    if deadline_expired():
+        return deadline_exceeded_result("osm")
+    # Jeton du limiteur attendu dans la limite de l'échéance, quota réservé juste avant l'envoi
+    if acquire_rate_limit("osm", deadline_remaining()) is None or deadline_expired():
+        return deadline_exceeded_result("osm")
+    if not reserve_call("osm"):
+        return quota_exceeded_result("osm")
     start_time = time.time()
     
     try:
-        response = requests.get(base_url, params=params, headers=headers, timeout=10)
+        response = http_get(base_url, api_name="osm", params=params, headers=headers, timeout=request_timeout("osm"))
         response_time = time.time() - start_time
         
         if response.status_code == 200:
@@ -108,15 +125,17 @@ def geocode_with_osm(address, email=OSM_EMAIL):
                 "precision_level": None,
                 "error_message": error_msg,
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "response_time": round(response_time, 3)
+                "response_time": round(response_time, 3),
+                **(transient_fields(response) if response.status_code in TRANSIENT_HTTP_CODES else {}),
             }
             
     except requests.exceptions.Timeout:
+        response_time = time.time() - start_time
         log_api_call(
             api_name="osm",
             url=base_url,
             status="timeout",
-            duration=10.0,
+            duration=response_time,
             error="Timeout de la requête"
         )
         
@@ -129,7 +148,8 @@ def geocode_with_osm(address, email=OSM_EMAIL):
             "precision_level": None,
             "error_message": "Timeout de la requête",
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "response_time": 10.0
+            "response_time": round(response_time, 3),
+            **transient_fields(),
         }
         
     except Exception as e:
@@ -151,7 +171,8 @@ def geocode_with_osm(address, email=OSM_EMAIL):
             "precision_level": None,
             "error_message": f"Erreur: {str(e)}",
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "response_time": round(response_time, 3)
+            "response_time": round(response_time, 3),
+            **(transient_fields() if isinstance(e, TRANSIENT_EXCEPTIONS) else {}),
         }
 
 
@@ -206,7 +227,7 @@ def geocode_with_osm_structured(street=None, city=None, postal_code=None,
     Returns:
         dict: Résultat du géocodage
     """
-    base_url = "https://nominatim.openstreetmap.org/search"
+    base_url = f"{OSM_BASE_URL}/search"
     
     params = {
         "format": "json",
@@ -229,10 +250,17 @@ def geocode_with_osm_structured(street=None, city=None, postal_code=None,
         "User-Agent": "GeocodingApp/1.0 (contact via email parameter)"
     }
     
+    if deadline_expired():
+        return deadline_exceeded_result("osm")
+    # Jeton du limiteur attendu dans la limite de l'échéance, quota réservé juste avant l'envoi
+    if acquire_rate_limit("osm", deadline_remaining()) is None or deadline_expired():
+        return deadline_exceeded_result("osm")
+    if not reserve_call("osm"):
+        return quota_exceeded_result("osm")
     start_time = time.time()
     
     try:
-        response = requests.get(base_url, params=params, headers=headers, timeout=10)
+        response = http_get(base_url, api_name="osm", params=params, headers=headers, timeout=request_timeout("osm"))
         response_time = time.time() - start_time
         
         if response.status_code == 200:
@@ -302,7 +330,8 @@ def geocode_with_osm_structured(street=None, city=None, postal_code=None,
                 "precision_level": None,
                 "error_message": error_msg,
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "response_time": round(response_time, 3)
+                "response_time": round(response_time, 3),
+                **(transient_fields(response) if response.status_code in TRANSIENT_HTTP_CODES else {}),
             }
             
     except Exception as e:
@@ -324,5 +353,6 @@ def geocode_with_osm_structured(street=None, city=None, postal_code=None,
             "precision_level": None,
             "error_message": f"Erreur: {str(e)}",
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "response_time": round(response_time, 3)
+            "response_time": round(response_time, 3),
+            **(transient_fields() if isinstance(e, TRANSIENT_EXCEPTIONS) else {}),
         }
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+Transport HTTP commun aux clients `src/apis/`.
+
+Chaque thread garde sa propre `requests.Session` (connexions keep-alive
+réutilisées) : les threads de l'ordonnanceur partagé et du service HTTP
+vivent longtemps, les poignées TLS ne sont donc faites qu'une fois par
+fournisseur et par thread au lieu d'une fois par requête.
+
+Si une cassette est active (`HTTP_CASSETTE_MODE`, voir `src/cassette.py`),
+les réponses sont enregistrées, ou rejouées sans réseau.
+"""
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.cassette import MODE_RECORD, MODE_REPLAY, get_cassette
+from src.config import HTTP_POOL_SIZE
+from src.timeouts import provider_timeout, record_latency
+
+_local = threading.local()
+
+
+def get_session():
+    """Session HTTP du thread courant (créée au premier appel)."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
+
+
+def http_get(url, api_name=None, **kwargs):
+    """
+    `requests.get` sur la session du thread (mêmes arguments, même réponse).
+
+    Si `api_name` est fourni, la durée de la requête alimente le timeout
+    adaptatif de l'API (`src/timeouts.py`), y compris quand elle expire.
+    """
+    cassette = get_cassette()
+    start = time.perf_counter()
+    try:
+        if cassette is not None and cassette.mode == MODE_REPLAY:
+            response = cassette.replay(api_name, url, kwargs.get("params"), kwargs.get("timeout"))
+        else:
+            response = get_session().get(url, **kwargs)
+    except requests.exceptions.Timeout:
+        # Un timeout réduit par l'échéance de la ligne ne dit rien de la latence du fournisseur
+        if (kwargs.get("timeout") or 0) >= provider_timeout(api_name):
+            record_latency(api_name, time.perf_counter() - start)
+        raise
+    elapsed = time.perf_counter() - start
+    record_latency(api_name, elapsed)
+    if cassette is not None and cassette.mode == MODE_RECORD:
+        cassette.record(api_name, url, kwargs.get("params"), response, elapsed)
+    return response
@@ -0,0 +1,180 @@
+"""
+Relance automatique des lignes en échec temporaire (quota, timeout, 5xx).
+
+Les modules `src/apis/` marquent ces réponses `transient` (avec
+`retry_after` si l'API l'indique). Au lieu d'être enregistrée comme un
+échec, la ligne est replacée dans une file différée avec un délai
+exponentiel à gigue complète, jamais inférieur au Retry-After. Les threads
+de travail ne dorment pas : seul le thread qui collecte les résultats
+attend, sur la prochaine échéance ou le prochain résultat.
+"""
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from src.config import BACKOFF_BASE_SECONDS, BACKOFF_MAX_ATTEMPTS, BACKOFF_MAX_SECONDS
+
+# Statuts d'API à retenter plus tard
+TRANSIENT_STATUSES = ("OVER_QUERY_LIMIT", "UNKNOWN_ERROR", "RESOURCE_EXHAUSTED")
+TRANSIENT_HTTP_CODES = (429, 500, 502, 503, 504)
+TRANSIENT_EXCEPTIONS = (requests.exceptions.Timeout, requests.exceptions.ConnectionError)
+# Statuts produits localement, sans réponse du fournisseur : marqués `transient`
+# pour ne pas être mis en cache, mais inutiles à replanifier (quota épuisé
+# jusqu'à la période suivante, échéance de la ligne passée)
+CONTROL_STATUSES = ("QUOTA_EXCEEDED", "DEADLINE_EXCEEDED")
+
+
+def parse_retry_after(value):
+    """
+    Délai d'un en-tête Retry-After (secondes ou date HTTP).
+
+    Returns:
+        float | None: Secondes à attendre
+    """
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def transient_fields(response=None):
+    """
+    Champs à ajouter à un résultat d'erreur temporaire.
+
+    Args:
+        response: Réponse HTTP (pour l'en-tête Retry-After), optionnelle
+
+    Returns:
+        dict: transient, retry_after
+    """
+    retry_after = None
+    if response is not None:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+    return {"transient": True, "retry_after": retry_after}
+
+
+def is_transient(result):
+    """Vrai si le résultat est un échec temporaire sans aucun résultat exploitable, à replanifier."""
+    if not result or result.get("status") == "OK" or result.get("status") in CONTROL_STATUSES:
+        return False
+    return bool(result.get("transient"))
+
+
+def backoff_delay(attempt, retry_after=None, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_MAX_SECONDS, rng=random.random):
+    """
+    Délai avant la tentative `attempt + 1` (gigue complète, au moins Retry-After).
+
+    Args:
+        attempt: Nombre de tentatives déjà faites (1 pour la première relance)
+        retry_after: Délai imposé par l'API (secondes), optionnel
+
+    Returns:
+        float: Secondes
+    """
+    delay = rng() * min(cap, base * 2 ** (attempt - 1))
+    if retry_after:
+        delay = max(delay, min(float(retry_after), cap))
+    return delay
+
+
+class DelayedQueue:
+    """
+    File de tâches différées (tas trié par échéance), sûre entre threads.
+
+    Exemple :
+        queue = DelayedQueue()
+        queue.push(2.5, task)
+        for task in queue.pop_due():
+            executor.submit(...)
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+    def push(self, delay, item):
+        """Ajoute `item`, disponible dans `delay` secondes."""
+        with self._lock:
+            heapq.heappush(self._heap, (self._clock() + delay, next(self._counter), item))
+
+    def pop_due(self):
+        """Retire et retourne les tâches arrivées à échéance."""
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def time_until_next(self):
+        """Secondes avant la prochaine échéance (None si la file est vide)."""
+        with self._lock:
+            if not self._heap:
+                return None
+            return max(0.0, self._heap[0][0] - self._clock())
+
+
+def run_with_backoff(executor, func, tasks, max_attempts=BACKOFF_MAX_ATTEMPTS, report=None, delay_func=backoff_delay):
+    """
+    Soumet les tâches et replanifie celles en échec temporaire.
+
+    Args:
+        executor: ThreadPoolExecutor
+        func: Fonction appelée avec les arguments de la tâche
+        tasks: Itérable de (clé, tuple d'arguments)
+        max_attempts: Tentatives maximales par tâche (la dernière réponse est rendue)
+        report: Dictionnaire mis à jour (requeued, recovered, gave_up), optionnel
+        delay_func: Fonction(attempt, retry_after) -> délai
+
+    Yields:
+        tuple: (clé, future terminée, nombre de tentatives)
+    """
+    report = report if report is not None else {}
+    for field in ("requeued", "recovered", "gave_up"):
+        report.setdefault(field, 0)
+    delayed = DelayedQueue()
+    running = {}
+
+    def submit(key, args, attempt):
+        running[executor.submit(func, *args)] = (key, args, attempt)
+
+    for key, args in tasks:
+        submit(key, args, 1)
+
+    while running or len(delayed):
+        for key, args, attempt in delayed.pop_due():
+            submit(key, args, attempt)
+        if not running:
+            time.sleep(delayed.time_until_next() or 0)
+            continue
+        done, _ = wait(running, timeout=delayed.time_until_next(), return_when=FIRST_COMPLETED)
+        for future in done:
+            key, args, attempt = running.pop(future)
+            result = future.result() if future.exception() is None else None
+            if is_transient(result) and attempt < max_attempts:
+                report["requeued"] += 1
+                delayed.push(delay_func(attempt, result.get("retry_after")), (key, args, attempt + 1))
+                continue
+            if is_transient(result):
+                report["gave_up"] += 1
+            elif attempt > 1:
+                report["recovered"] += 1
+            yield key, future, attempt
@@ -0,0 +1,94 @@
+"""
+Budget d'appels API (nombre d'appels et coût) par ligne et par job.
+
+Un budget de ligne peut avoir un budget de job parent : un appel n'est
+autorisé que s'il tient dans les deux. Les appels refusés sont comptés
+(`skipped`) pour le rapport de relance.
+"""
+import threading
+from collections import Counter
+
+from src.config import API_CALL_COSTS
+
+
+def call_cost(api_name):
+    """Coût relatif d'un appel à `api_name` (0 si inconnu)."""
+    return API_CALL_COSTS.get(api_name, 0.0)
+
+
+class CallBudget:
+    """
+    Compteur d'appels et de coût avec plafonds optionnels.
+
+    Exemple :
+        job_budget = CallBudget(max_calls=5000)
+        row_budget = CallBudget(max_calls=6, parent=job_budget)
+        if row_budget.try_spend("google"):
+            result = geocode_with_google(...)
+    """
+
+    def __init__(self, max_calls=None, max_cost=None, parent=None):
+        self.max_calls = max_calls or None
+        self.max_cost = max_cost or None
+        self.parent = parent
+        self.calls = 0
+        self.cost = 0.0
+        self.skipped = 0
+        self.calls_by_api = Counter()
+        self._lock = threading.Lock()
+
+    def _fits(self, cost):
+        if self.max_calls is not None and self.calls + 1 > self.max_calls:
+            return False
+        if self.max_cost is not None and self.cost + cost > self.max_cost + 1e-9:
+            return False
+        return True
+
+    def _spend(self, api_name, cost):
+        with self._lock:
+            if not self._fits(cost):
+                return False
+            if self.parent is not None and not self.parent._spend(api_name, cost):
+                return False
+            self.calls += 1
+            self.cost += cost
+            self.calls_by_api[api_name] += 1
+            return True
+
+    def try_spend(self, api_name, cost=None):
+        """
+        Réserve un appel si le budget (et celui du parent) le permet.
+
+        Returns:
+            bool: True si l'appel peut être fait
+        """
+        cost = call_cost(api_name) if cost is None else cost
+        if self._spend(api_name, cost):
+            return True
+        self.skip()
+        return False
+
+    def skip(self, count=1):
+        """Compte des appels non effectués faute de budget."""
+        with self._lock:
+            self.skipped += count
+        if self.parent is not None:
+            self.parent.skip(count)
+
+    def exhausted(self):
+        """Vrai si plus aucun appel (même gratuit) ne peut être fait."""
+        with self._lock:
+            own = self.max_calls is not None and self.calls >= self.max_calls
+        return own or (self.parent is not None and self.parent.exhausted())
+
+    def summary(self):
+        """Totaux pour le rapport (appels, coût, appels évités)."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "cost": round(self.cost, 2),
+                "skipped": self.skipped,
+                "calls_by_api": dict(self.calls_by_api),
+                "max_calls": self.max_calls,
+                "max_cost": self.max_cost,
+            }
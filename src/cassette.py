@@ -0,0 +1,255 @@
+"""
+Cassette HTTP : enregistrement et rejeu des réponses des fournisseurs.
+
+En mode "record", chaque réponse obtenue par `src/apis/transport.py` est
+stockée avec sa durée mesurée, sous une clé (API, chemin, paramètres
+normalisés) : clés d'API et email retirés, espaces et casse normalisés. Le
+corps est compressé (zlib) dans une table SQLite. En mode "replay", les
+clients `src/apis/` sont servis depuis la cassette sans réseau, quota ni
+limiteur de débit, avec la latence enregistrée ("recorded") ou sans latence
+("zero") ; une requête absente de la cassette lève `CassetteMiss` (erreur non
+temporaire).
+
+Une cassette peut aussi être construite à partir des logs d'appels
+(`logs/geocoding_logs.json`), qui contiennent la réponse brute de HERE et de
+Google :
+    python -m src.cassette import logs/geocoding_logs.json
+    python -m src.cassette stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.config import HTTP_CASSETTE_LATENCY, HTTP_CASSETTE_MODE, HTTP_CASSETTE_PATH
+from src.metrics import CASSETTE_REQUESTS
+
+MODE_OFF, MODE_RECORD, MODE_REPLAY = "off", "record", "replay"
+
+# Paramètres propres au compte : exclus de la clé (et jamais stockés)
+SECRET_PARAMS = {"apikey", "key", "email"}
+# En-têtes de réponse utiles aux clients (quota, type de contenu)
+KEPT_HEADERS = ("Content-Type", "Retry-After")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    api TEXT NOT NULL,
+    path TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status_code INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    latency REAL NOT NULL,
+    recorded TEXT NOT NULL
+)
+"""
+UPSERT = """
+INSERT INTO responses (key, api, path, params, status_code, headers, body, latency, recorded)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET
+    status_code = excluded.status_code, headers = excluded.headers, body = excluded.body,
+    latency = excluded.latency, recorded = excluded.recorded
+"""
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """Requête absente de la cassette en mode replay."""
+
+
+def normalize_request(url, params=None):
+    """
+    Chemin et paramètres normalisés d'une requête.
+
+    Args:
+        url: URL appelée (la requête éventuelle est fusionnée avec `params`)
+        params: Paramètres passés à `requests`
+
+    Returns:
+        tuple: (chemin, [(nom, valeur), ...] triés, sans secrets)
+    """
+    parts = urlsplit(url)
+    merged = parse_qsl(parts.query, keep_blank_values=True) + list((params or {}).items())
+    normalized = sorted(
+        (name, " ".join(str(value).split()).casefold())
+        for name, value in merged
+        if value is not None and name.lower() not in SECRET_PARAMS
+    )
+    return parts.path.rstrip("/") or "/", normalized
+
+
+def request_key(api_name, url, params=None):
+    """Clé de cassette : (API, chemin, paramètres normalisés), hachée."""
+    path, normalized = normalize_request(url, params)
+    raw = json.dumps([api_name or "", path, normalized], ensure_ascii=False)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest(), path, normalized
+
+
+class Cassette:
+    """
+    Magasin de réponses HTTP, sûr entre threads.
+
+    Args:
+        path: Fichier SQLite de la cassette
+        mode: "record" ou "replay"
+        latency: "recorded" (durée mesurée à l'enregistrement) ou "zero"
+        sleep: Fonction d'attente (injectable pour les tests)
+    """
+
+    def __init__(self, path=HTTP_CASSETTE_PATH, mode=MODE_REPLAY, latency=HTTP_CASSETTE_LATENCY, sleep=time.sleep):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._sleep = sleep
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(SCHEMA)
+        self._lock = threading.Lock()
+
+    def store(self, api_name, url, params, status_code, body, headers=None, latency=0.0):
+        """Enregistre (ou remplace) la réponse d'une requête."""
+        key, path, normalized = request_key(api_name, url, params)
+        kept = {name: headers[name] for name in KEPT_HEADERS if headers and name in headers}
+        with self._lock:
+            self._conn.execute(UPSERT, (
+                key, api_name or "", path, json.dumps(normalized, ensure_ascii=False), int(status_code),
+                json.dumps(kept), zlib.compress(body), float(latency), time.strftime("%Y-%m-%d %H:%M:%S"),
+            ))
+
+    def record(self, api_name, url, params, response, latency):
+        """Enregistre une réponse `requests` obtenue du fournisseur."""
+        self.store(api_name, url, params, response.status_code, response.content, response.headers, latency)
+        CASSETTE_REQUESTS.inc(mode=MODE_RECORD, outcome="recorded")
+
+    def replay(self, api_name, url, params=None, timeout=None):
+        """
+        Réponse enregistrée pour cette requête.
+
+        Args:
+            timeout: Timeout de la requête ; une latence enregistrée plus longue lève `Timeout`
+
+        Returns:
+            requests.Response: Réponse reconstruite (statut, en-têtes, corps)
+        """
+        key, path, _ = request_key(api_name, url, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status_code, headers, body, latency FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            CASSETTE_REQUESTS.inc(mode=MODE_REPLAY, outcome="miss")
+            raise CassetteMiss(f"Requête absente de la cassette : {api_name} {path}")
+        CASSETTE_REQUESTS.inc(mode=MODE_REPLAY, outcome="hit")
+
+        status_code, headers, body, latency = row
+        if self.latency != "zero" and latency > 0:
+            if timeout is not None and latency > timeout:
+                self._sleep(timeout)
+                raise requests.exceptions.Timeout(f"Latence enregistrée {latency:.2f}s > timeout {timeout:.2f}s")
+            self._sleep(latency)
+
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(json.loads(headers))
+        response._content = zlib.decompress(body)
+        response.encoding = "utf-8"
+        response.url = url
+        return response
+
+    def stats(self):
+        """{api: {"responses": n, "latency_avg": s}} de la cassette."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT api, COUNT(*), AVG(latency) FROM responses GROUP BY api ORDER BY api"
+            ).fetchall()
+        return {api: {"responses": count, "latency_avg": round(avg or 0.0, 3)} for api, count, avg in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def import_api_logs(log_path, cassette):
+    """
+    Ajoute à la cassette les réponses brutes présentes dans les logs d'appels.
+
+    Seuls HERE et Google journalisent la réponse brute et l'URL complète ;
+    les entrées OSM (résultat déjà transformé) et les erreurs sont ignorées.
+
+    Returns:
+        int: Nombre de réponses importées
+    """
+    imported = 0
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            body = entry.get("result")
+            api_name = entry.get("api")
+            raw = (api_name == "here" and isinstance(body, dict) and "items" in body) or (
+                api_name == "google" and isinstance(body, dict) and "status" in body
+            )
+            if not raw or not entry.get("url"):
+                continue
+            cassette.store(
+                api_name, entry["url"], None, 200, json.dumps(body).encode("utf-8"),
+                {"Content-Type": "application/json"}, entry.get("duration") or 0.0,
+            )
+            imported += 1
+    return imported
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Cassette configurée (`HTTP_CASSETTE_MODE`), ou None si désactivée."""
+    global _cassette
+    if HTTP_CASSETTE_MODE not in (MODE_RECORD, MODE_REPLAY):
+        return None
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(HTTP_CASSETTE_PATH, HTTP_CASSETTE_MODE, HTTP_CASSETTE_LATENCY)
+    return _cassette
+
+
+def replaying():
+    """True si les appels sont servis par la cassette (pas de réseau ni de quota)."""
+    cassette = get_cassette()
+    return cassette is not None and cassette.mode == MODE_REPLAY
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cassette HTTP des fournisseurs")
+    parser.add_argument("--path", default=HTTP_CASSETTE_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Importer les réponses des logs d'appels")
+    importer.add_argument("log_path", nargs="?", default="logs/geocoding_logs.json")
+    commands.add_parser("stats", help="Réponses enregistrées par API")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.path, MODE_RECORD)
+    if args.command == "import":
+        print(f"{import_api_logs(args.log_path, cassette)} réponses importées dans {args.path}")
+    for api_name, stats in cassette.stats().items():
+        print(f"{api_name:15s} {stats['responses']:8d} réponses  latence moyenne {stats['latency_avg']:.3f}s")
+    cassette.close()
+
+
+if __name__ == "__main__":
+    main()
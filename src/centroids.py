@@ -0,0 +1,247 @@
+"""
+Centroïdes appris à partir de nos propres résultats.
+
+Chaque résultat précis (ROOFTOP, RANGE_INTERPOLATED) déjà payé alimente des
+sommes par code postal, ville et gouvernorat dans une base SQLite. Les
+centroïdes servent ensuite à :
+- répondre localement aux replis de précision grossière (au lieu d'OSM)
+- contrôler les nouveaux résultats (distance au centroïde de leur zone)
+"""
+import os
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.config import CENTROID_DB, CENTROID_MIN_COUNT, CENTROID_SUSPECT_KM, SUSPICION_THRESHOLD
+from src.gazetteer import normalize_name, normalize_postal_code
+from src.geo import KM_PER_DEGREE, haversine_km
+
+# Niveaux d'agrégation, du plus fin au plus large
+CENTROID_LEVELS = ("postal_code", "city", "governorate")
+LEVEL_PRECISION = {
+    "postal_code": ("GEOMETRIC_CENTER", "postalCode"),
+    "city": ("APPROXIMATE", "locality"),
+    "governorate": ("APPROXIMATE", "governorate"),
+}
+SOURCE_PRECISIONS = ("ROOFTOP", "RANGE_INTERPOLATED")
+# Résultats déjà dérivés de données locales : jamais réinjectés
+LOCAL_APIS = ("gazetteer", "centroid_cache", "fuzzy_cache")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS centroids (
+    level TEXT NOT NULL,
+    key TEXT NOT NULL,
+    lat_sum REAL NOT NULL,
+    lon_sum REAL NOT NULL,
+    lat_sq_sum REAL NOT NULL,
+    lon_sq_sum REAL NOT NULL,
+    count INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (level, key)
+)
+"""
+
+UPSERT = """
+INSERT INTO centroids (level, key, lat_sum, lon_sum, lat_sq_sum, lon_sq_sum, count, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(level, key) DO UPDATE SET
+    lat_sum = lat_sum + excluded.lat_sum,
+    lon_sum = lon_sum + excluded.lon_sum,
+    lat_sq_sum = lat_sq_sum + excluded.lat_sq_sum,
+    lon_sq_sum = lon_sq_sum + excluded.lon_sq_sum,
+    count = count + excluded.count,
+    updated_at = excluded.updated_at
+"""
+
+
+def _connect(db_path):
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute(SCHEMA)
+    return conn
+
+
+def _level_key(level, value):
+    if level == "postal_code":
+        return normalize_postal_code(value)
+    return normalize_name(value)
+
+
+def update_centroids(enriched_df, db_path=CENTROID_DB):
+    """
+    Ajoute les résultats précis d'un job aux centroïdes (mise à jour incrémentale).
+
+    Les résultats servis localement et, si la colonne `suspicion_score` est
+    fournie, les résultats suspects (score au moins SUSPICION_THRESHOLD) ne
+    sont pas appris : un point aberrant déplacerait le centroïde qui sert
+    ensuite à le contrôler.
+
+    Args:
+        enriched_df: DataFrame enrichi (colonnes status, precision_level, api_used,
+                     latitude, longitude, suspicion_score et champs mappés)
+        db_path: Base SQLite des centroïdes
+
+    Returns:
+        int: Nombre de points ajoutés
+    """
+    required = {"status", "precision_level", "latitude", "longitude"}
+    if enriched_df is None or enriched_df.empty or not required.issubset(enriched_df.columns):
+        return 0
+
+    mask = (
+        (enriched_df["status"] == "OK")
+        & enriched_df["precision_level"].isin(SOURCE_PRECISIONS)
+        & enriched_df["latitude"].notna()
+        & enriched_df["longitude"].notna()
+    )
+    if "api_used" in enriched_df.columns:
+        mask &= ~enriched_df["api_used"].isin(LOCAL_APIS)
+    if "suspicion_score" in enriched_df.columns:
+        mask &= ~(pd.to_numeric(enriched_df["suspicion_score"], errors="coerce") >= SUSPICION_THRESHOLD)
+    points = enriched_df.loc[mask]
+    if points.empty:
+        return 0
+
+    lat = pd.to_numeric(points["latitude"], errors="coerce").astype("float64")
+    lon = pd.to_numeric(points["longitude"], errors="coerce").astype("float64")
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    rows = []
+    for level in CENTROID_LEVELS:
+        if level not in points.columns:
+            continue
+        keys = points[level].map(lambda v, level=level: _level_key(level, v))
+        frame = pd.DataFrame({"key": keys, "lat": lat, "lon": lon}).dropna()
+        frame = frame[frame["key"] != ""]
+        if frame.empty:
+            continue
+        frame["lat_sq"] = frame["lat"] ** 2
+        frame["lon_sq"] = frame["lon"] ** 2
+        sums = frame.groupby("key").agg(
+            lat_sum=("lat", "sum"), lon_sum=("lon", "sum"),
+            lat_sq_sum=("lat_sq", "sum"), lon_sq_sum=("lon_sq", "sum"),
+            points=("lat", "size"),
+        )
+        rows.extend(
+            (level, key, r.lat_sum, r.lon_sum, r.lat_sq_sum, r.lon_sq_sum, int(r.points), now)
+            for key, r in zip(sums.index, sums.itertuples(index=False))
+        )
+
+    if rows:
+        with _connect(db_path) as conn:
+            conn.executemany(UPSERT, rows)
+        conn.close()
+    return len(points)
+
+
+@lru_cache(maxsize=4)
+def _read_centroids(db_path, mtime_ns):
+    conn = _connect(db_path)
+    try:
+        records = conn.execute(
+            "SELECT level, key, lat_sum, lon_sum, lat_sq_sum, lon_sq_sum, count FROM centroids"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    centroids = {}
+    for level, key, lat_sum, lon_sum, lat_sq_sum, lon_sq_sum, count in records:
+        lat = lat_sum / count
+        lon = lon_sum / count
+        var_lat = max(lat_sq_sum / count - lat ** 2, 0.0)
+        var_lon = max(lon_sq_sum / count - lon ** 2, 0.0)
+        spread_km = float(np.sqrt(var_lat + var_lon * np.cos(np.radians(lat)) ** 2) * KM_PER_DEGREE)
+        centroids[(level, key)] = {
+            "level": level, "key": key, "latitude": lat, "longitude": lon,
+            "spread_km": spread_km, "count": count,
+        }
+    return centroids
+
+
+def load_centroids(db_path=CENTROID_DB):
+    """
+    Retourne les centroïdes {(niveau, clé): centroïde} depuis la base.
+
+    Le contenu est gardé en mémoire tant que le fichier SQLite n'a pas changé.
+    """
+    if not os.path.exists(db_path):
+        return {}
+    return _read_centroids(db_path, os.stat(db_path).st_mtime_ns)
+
+
+def find_centroid(row, min_count=CENTROID_MIN_COUNT, db_path=CENTROID_DB):
+    """
+    Cherche le centroïde le plus fin connu pour la ligne.
+
+    Returns:
+        dict | None: level, key, latitude, longitude, spread_km, count
+    """
+    centroids = load_centroids(db_path)
+    if not centroids:
+        return None
+    for level in CENTROID_LEVELS:
+        value = row.get(level)
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            continue
+        centroid = centroids.get((level, _level_key(level, value)))
+        if centroid and centroid["count"] >= min_count:
+            return centroid
+    return None
+
+
+def geocode_from_centroids(row, db_path=CENTROID_DB):
+    """
+    Résultat de précision grossière construit depuis les centroïdes appris.
+
+    Returns:
+        dict | None: Résultat au format des APIs (api_used="centroid_cache")
+    """
+    centroid = find_centroid(row, db_path=db_path)
+    if centroid is None:
+        return None
+    precision_level, precision_raw = LEVEL_PRECISION[centroid["level"]]
+    return {
+        "latitude": round(centroid["latitude"], 6),
+        "longitude": round(centroid["longitude"], 6),
+        "formatted_address": f"{centroid['key']} (centroïde de {centroid['count']} résultats)",
+        "status": "OK",
+        "error_message": None,
+        "api_used": "centroid_cache",
+        "precision_level": precision_level,
+        "precision_level_raw": precision_raw,
+        "answered_locally": True,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def check_against_centroids(result, row, db_path=CENTROID_DB):
+    """
+    Ajoute au résultat sa distance au centroïde de sa zone et un verdict.
+
+    Un résultat est `suspect` s'il est à plus de max(CENTROID_SUSPECT_KM,
+    3 × dispersion de la zone) du centroïde.
+
+    Returns:
+        dict: Le résultat, complété de centroid_distance_km et centroid_check
+    """
+    if (
+        result.get("status") != "OK"
+        or result.get("api_used") in LOCAL_APIS
+        or result.get("latitude") is None
+        or result.get("longitude") is None
+    ):
+        return result
+    centroid = find_centroid(row, db_path=db_path)
+    if centroid is None:
+        return result
+
+    distance = haversine_km(result["latitude"], result["longitude"], centroid["latitude"], centroid["longitude"])
+    threshold = max(CENTROID_SUSPECT_KM, 3 * centroid["spread_km"])
+    result["centroid_distance_km"] = round(distance, 2)
+    result["centroid_check"] = "ok" if distance <= threshold else "suspect"
+    return result
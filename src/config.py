@@ -5,4 +5,140 @@ load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 OSM_EMAIL = os.getenv("OSM_EMAIL")
-HERE_API_KEY = os.getenv("HERE_API_KEY")
\ No newline at end of file
+HERE_API_KEY = os.getenv("HERE_API_KEY")
+
+# Métriques (format Prometheus)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) or None
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+
+# Gazetteer hors ligne (pré-géocodage des lignes code postal / ville)
+GAZETTEER_ENABLED = os.getenv("GAZETTEER_ENABLED", "true").lower() in ("1", "true", "yes")
+GAZETTEER_CSV = os.getenv("GAZETTEER_CSV", "data/gazetteer/tn_gazetteer.csv")
+GAZETTEER_INDEX = os.getenv("GAZETTEER_INDEX", "data/cache/tn_gazetteer.npy")
+# Le CSV livré n'est qu'un échantillon : tant que le référentiel complet n'est
+# pas chargé, le gazetteer ne répond qu'aux correspondances exactes
+GAZETTEER_COMPLETE = os.getenv("GAZETTEER_COMPLETE", "false").lower() in ("1", "true", "yes")
+
+# Cache de centroïdes appris à partir des résultats passés
+CENTROID_CACHE_ENABLED = os.getenv("CENTROID_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CENTROID_DB = os.getenv("CENTROID_DB", "data/cache/centroids.sqlite")
+CENTROID_MIN_COUNT = int(os.getenv("CENTROID_MIN_COUNT", "5"))
+CENTROID_SUSPECT_KM = float(os.getenv("CENTROID_SUSPECT_KM", "20"))
+
+# Index spatial des résultats géocodés
+SPATIAL_INDEX_ENABLED = os.getenv("SPATIAL_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+SPATIAL_INDEX_PATH = os.getenv("SPATIAL_INDEX_PATH", "data/cache/spatial_index.npz")
+
+# Index flou des adresses déjà géocodées
+FUZZY_INDEX_ENABLED = os.getenv("FUZZY_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+FUZZY_INDEX_DB = os.getenv("FUZZY_INDEX_DB", "data/cache/fuzzy_index.sqlite")
+FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", "0.7"))
+
+# Contrôles de plausibilité (score de suspicion pour cibler les relances)
+SUSPICION_THRESHOLD = float(os.getenv("SUSPICION_THRESHOLD", "0.5"))
+
+# Budget d'appels de la relance intelligente (0 = illimité)
+RETRY_MAX_CALLS_PER_ROW = int(os.getenv("RETRY_MAX_CALLS_PER_ROW", "6"))
+RETRY_MAX_COST_PER_ROW = float(os.getenv("RETRY_MAX_COST_PER_ROW", "0"))
+RETRY_MAX_CALLS_PER_JOB = int(os.getenv("RETRY_MAX_CALLS_PER_JOB", "0"))
+RETRY_MAX_COST_PER_JOB = float(os.getenv("RETRY_MAX_COST_PER_JOB", "0"))
+# Coût relatif d'un appel par API (OSM est gratuit mais limité à 1 req/s)
+API_CALL_COSTS = {
+    api: float(cost)
+    for api, cost in (
+        item.split("=") for item in os.getenv(
+            "API_CALL_COSTS", "here=1,osm=2,google=5,google_places=17"
+        ).split(",") if item.strip()
+    )
+}
+
+# Limites de débit par API (requêtes par seconde, 0 = illimité)
+API_RATE_LIMITS = {
+    api: float(rate)
+    for api, rate in (
+        item.split("=") for item in os.getenv(
+            "API_RATE_LIMITS", "here=5,google=50,google_places=50,osm=1"
+        ).split(",") if item.strip()
+    )
+}
+
+# Relance : requêtes de variantes envoyées en parallèle pour une même API
+RETRY_FAN_OUT = os.getenv("RETRY_FAN_OUT", "false").lower() in ("1", "true", "yes")
+RETRY_FAN_OUT_WIDTH = int(os.getenv("RETRY_FAN_OUT_WIDTH", "3"))
+
+# Stratégies de géocodage déclaratives (JSON optionnel, complète/remplace les stratégies intégrées)
+STRATEGIES_FILE = os.getenv("STRATEGIES_FILE", "data/strategies.json")
+
+# Routage des fournisseurs par région / forme d'adresse (appris des tentatives passées)
+ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "true").lower() in ("1", "true", "yes")
+ROUTING_DB = os.getenv("ROUTING_DB", "data/cache/routing.sqlite")
+ROUTING_MIN_ATTEMPTS = int(os.getenv("ROUTING_MIN_ATTEMPTS", "30"))
+ROUTING_PRIOR_WEIGHT = float(os.getenv("ROUTING_PRIOR_WEIGHT", "10"))
+ROUTING_LATENCY_COST = float(os.getenv("ROUTING_LATENCY_COST", "1"))
+
+# Relance automatique des échecs temporaires (quota, timeout, 5xx)
+BACKOFF_MAX_ATTEMPTS = int(os.getenv("BACKOFF_MAX_ATTEMPTS", "4"))
+BACKOFF_BASE_SECONDS = float(os.getenv("BACKOFF_BASE_SECONDS", "1"))
+BACKOFF_MAX_SECONDS = float(os.getenv("BACKOFF_MAX_SECONDS", "60"))
+
+# Quotas des APIs (registre partagé entre jobs et sessions)
+QUOTA_ENABLED = os.getenv("QUOTA_ENABLED", "true").lower() in ("1", "true", "yes")
+QUOTA_DB = os.getenv("QUOTA_DB", "data/cache/quota.sqlite")
+QUOTA_SOFT_RATIO = float(os.getenv("QUOTA_SOFT_RATIO", "0.8"))
+# Plafonds "api:période=appels" (période : day ou month), ex. here:day=1000,google:month=40000
+QUOTA_LIMITS = {}
+for _item in os.getenv("QUOTA_LIMITS", "").split(","):
+    if _item.strip():
+        _target, _limit = _item.split("=")
+        _api, _period = _target.strip().split(":")
+        QUOTA_LIMITS.setdefault(_api, {})[_period] = int(_limit)
+
+# Limiteur de débit partagé entre les processus de la machine (workers Streamlit)
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "data/cache/rate_limits.sqlite")
+
+# Ordonnanceur partagé entre les jobs concurrents (files équitables pondérées)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "16"))
+SCHEDULER_MAX_PER_JOB = int(os.getenv("SCHEDULER_MAX_PER_JOB", "10"))
+SCHEDULER_SMALL_JOB_ROWS = int(os.getenv("SCHEDULER_SMALL_JOB_ROWS", "1000"))
+
+# Transport HTTP des clients d'API (connexions keep-alive par thread)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "4"))
+
+# Service HTTP de géocodage unitaire (python -m src.service)
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8600"))
+SERVICE_STRATEGY = os.getenv("SERVICE_STRATEGY", "multi")
+SERVICE_DEADLINE_MS = int(os.getenv("SERVICE_DEADLINE_MS", "2000"))
+SERVICE_MAX_BATCH = int(os.getenv("SERVICE_MAX_BATCH", "100"))
+
+# Échéance par ligne (secondes, 0 = aucune) et timeout par défaut d'un appel fournisseur
+ROW_DEADLINE_SECONDS = float(os.getenv("ROW_DEADLINE_SECONDS", "20"))
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", "10"))
+
+# Timeouts adaptatifs : p99 de la latence récente × facteur, borné par le plancher
+# et par PROVIDER_TIMEOUT_SECONDS
+ADAPTIVE_TIMEOUTS = os.getenv("ADAPTIVE_TIMEOUTS", "true").lower() in ("1", "true", "yes")
+TIMEOUT_FACTOR = float(os.getenv("TIMEOUT_FACTOR", "3"))
+TIMEOUT_FLOOR_SECONDS = float(os.getenv("TIMEOUT_FLOOR_SECONDS", "1"))
+TIMEOUT_WINDOW = int(os.getenv("TIMEOUT_WINDOW", "500"))
+TIMEOUT_MIN_SAMPLES = int(os.getenv("TIMEOUT_MIN_SAMPLES", "50"))
+
+# URL de base des fournisseurs (serveur factice : python -m benchmarks.fake_server)
+HERE_BASE_URL = os.getenv("HERE_BASE_URL", "https://geocode.search.hereapi.com").rstrip("/")
+GOOGLE_BASE_URL = os.getenv("GOOGLE_BASE_URL", "https://maps.googleapis.com").rstrip("/")
+OSM_BASE_URL = os.getenv("OSM_BASE_URL", "https://nominatim.openstreetmap.org").rstrip("/")
+
+# Cassette HTTP : "record" enregistre les réponses des fournisseurs, "replay" les rejoue
+# sans réseau (latence "recorded" ou "zero"), "off" par défaut
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "off").lower()
+HTTP_CASSETTE_PATH = os.getenv("HTTP_CASSETTE_PATH", "data/cache/http_cassette.sqlite")
+HTTP_CASSETTE_LATENCY = os.getenv("HTTP_CASSETTE_LATENCY", "recorded").lower()
+
+# Profilage des jobs (échantillonnage des piles + tracemalloc), résultats sous PROFILE_DIR/<job_id>/
+JOB_PROFILING = os.getenv("JOB_PROFILING", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/output/profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "15"))
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1"))
@@ -0,0 +1,149 @@
+"""
+Échéance par ligne, propagée jusqu'aux appels des fournisseurs.
+
+Le moteur ouvre une échéance pour chaque ligne (`deadline_scope`) ; les
+clients `src/apis/` lisent le temps restant pour réduire le timeout de leur
+requête (`request_timeout`) et ne partent plus une fois l'échéance passée.
+Les stratégies et la relance s'arrêtent alors avec le meilleur résultat
+obtenu. L'échéance est propre au thread : `bind` la transmet aux appels
+lancés dans d'autres threads (groupes parallèles, variantes en éventail).
+
+Exemple :
+    with deadline_scope(15):
+        result = geocode_row_with_strategy(address, index, row, {})
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+
+from src.config import ROW_DEADLINE_SECONDS
+from src.timeouts import provider_timeout
+
+# Timeout minimal d'une requête (en deçà, l'appel n'a aucune chance d'aboutir)
+MIN_REQUEST_TIMEOUT = 0.05
+DEADLINE_STATUS = "DEADLINE_EXCEEDED"
+
+_local = threading.local()
+
+
+def current_deadline():
+    """Échéance du thread (horloge `time.monotonic`), None si aucune."""
+    return getattr(_local, "until", None)
+
+
+@contextmanager
+def deadline_scope(seconds=None, until=None):
+    """
+    Ouvre une échéance pour le bloc `with` (la plus proche l'emporte si imbriquée).
+
+    Args:
+        seconds: Durée accordée à partir de maintenant (None ou 0 : pas de limite)
+        until: Échéance absolue (`time.monotonic`)
+    """
+    previous = current_deadline()
+    candidates = [value for value in (previous, until) if value is not None]
+    if seconds:
+        candidates.append(time.monotonic() + seconds)
+    _local.until = min(candidates) if candidates else None
+    try:
+        yield _local.until
+    finally:
+        _local.until = previous
+
+
+def remaining():
+    """Secondes avant l'échéance (None si aucune)."""
+    until = current_deadline()
+    if until is None:
+        return None
+    return max(0.0, until - time.monotonic())
+
+
+def expired():
+    """Vrai si l'échéance du thread est passée."""
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def request_timeout(api_name=None, default=None):
+    """
+    Timeout d'une requête : celui du fournisseur, réduit au temps restant.
+
+    Args:
+        api_name: API appelée
+        default: Timeout sans échéance (par défaut, timeout adaptatif de l'API)
+    """
+    default = provider_timeout(api_name) if default is None else default
+    left = remaining()
+    if left is None:
+        return default
+    return max(MIN_REQUEST_TIMEOUT, min(default, left))
+
+
+def bind(func):
+    """Enveloppe `func` pour qu'elle s'exécute sous l'échéance du thread appelant."""
+    until = current_deadline()
+    if until is None:
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with deadline_scope(until=until):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def run_row(func, *args, seconds=ROW_DEADLINE_SECONDS, until=None):
+    """
+    Traite une ligne sous son échéance et ajoute sa durée au résultat.
+
+    Args:
+        func: Fonction de traitement d'une ligne (retourne un dict)
+        seconds: Échéance de la ligne (secondes, 0 : aucune)
+        until: Échéance absolue imposée par l'appelant (requête du service)
+
+    Returns:
+        dict: Résultat de `func`, complété de `row_seconds`
+    """
+    start = time.perf_counter()
+    with deadline_scope(seconds, until):
+        result = func(*args)
+    if isinstance(result, dict):
+        result["row_seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def latency_summary(seconds):
+    """
+    Percentiles de durée par ligne.
+
+    Returns:
+        dict: p50, p99, max (secondes), ou {} sans données
+    """
+    values = np.asarray([value for value in seconds if value is not None and not np.isnan(value)], dtype=float)
+    if values.size == 0:
+        return {}
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"p50": round(float(p50), 3), "p99": round(float(p99), 3), "max": round(float(values.max()), 3)}
+
+
+def deadline_exceeded_result(api_name):
+    """Résultat d'un appel non envoyé : l'échéance de la ligne est passée."""
+    return {
+        "latitude": None,
+        "longitude": None,
+        "formatted_address": None,
+        "status": DEADLINE_STATUS,
+        "error_message": "Échéance de la ligne dépassée",
+        "api_used": api_name,
+        "precision_level": None,
+        "precision_level_raw": None,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # Temporaire : la réponse n'est pas mise en cache
+        "transient": True,
+        "retry_after": None,
+    }
@@ -0,0 +1,144 @@
+"""
+Plan de types mémoire pour les DataFrames chargés et enrichis.
+
+- colonnes texte (adresses) : dtype chaîne compact (pyarrow) au lieu d'object
+- colonnes de résultat à faible cardinalité : category
+- coordonnées : float32 quand la conversion est sans perte
+- horodatages : datetime64
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_RESULT_COLUMNS = [
+    "status", "api_used", "precision_level", "precision_level_raw",
+    "address_variant", "osm_type", "osm_class", "centroid_check", "source_api",
+]
+COORDINATE_COLUMNS = ["latitude", "longitude"]
+TIMESTAMP_COLUMNS = ["timestamp"]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Ratio valeurs distinctes / lignes au-delà duquel category n'apporte rien
+MAX_CATEGORY_RATIO = 0.5
+
+
+def _string_dtype():
+    """Dtype chaîne compact avec NaN comme valeur manquante (comme object)."""
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)  # pandas >= 2.3 ("str")
+    except TypeError:
+        pass
+    except ImportError:
+        return None
+    try:
+        return pd.StringDtype("pyarrow_numpy")  # pandas 2.1 - 2.2
+    except (TypeError, ImportError):
+        return None
+
+
+def optimize_input_dtypes(df):
+    """
+    Convertit les colonnes texte d'un fichier chargé en dtype chaîne compact.
+
+    Les colonnes numériques (ex: code postal lu en entier) sont laissées telles
+    quelles : elles sont déjà plus compactes que leur version texte.
+    """
+    string_dtype = _string_dtype()
+    if string_dtype is None:
+        return df
+
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                df[col] = df[col].astype(string_dtype)
+            except (TypeError, ValueError):
+                # Colonne mixte (ex: listes) : on la garde en object
+                pass
+    return df
+
+
+def _is_lossless_float32(values):
+    """Vrai si chaque coordonnée se relit à l'identique après passage en float32."""
+    values = values.dropna()
+    if values.empty:
+        return True
+    as_float32 = values.astype("float32")
+    roundtrip = as_float32.astype(str).astype("float64")
+    return bool((roundtrip == values).all())
+
+
+def optimize_result_dtypes(df, coordinate_tolerance=0.0):
+    """
+    Applique le plan de types aux colonnes de résultat d'un DataFrame enrichi.
+
+    Args:
+        df: DataFrame enrichi
+        coordinate_tolerance: Écart maximal accepté (en degrés) pour passer les
+            coordonnées en float32. 0 = uniquement si la valeur décimale est
+            conservée exactement.
+
+    Returns:
+        pd.DataFrame: Copie avec les nouveaux types
+    """
+    df = df.copy()
+
+    for col in CATEGORICAL_RESULT_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            if df[col].nunique(dropna=True) <= max(len(df) * MAX_CATEGORY_RATIO, 1):
+                df[col] = df[col].astype("category")
+
+    for col in COORDINATE_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        if coordinate_tolerance > 0:
+            safe = bool(((values.astype("float32") - values).abs() <= coordinate_tolerance).all())
+        else:
+            safe = _is_lossless_float32(values)
+        df[col] = values.astype("float32") if safe else values
+
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format=TIMESTAMP_FORMAT, errors="coerce")
+
+    return df
+
+
+def restore_export_dtypes(df):
+    """
+    Prépare un DataFrame optimisé pour les exports texte (CSV, JSON, TXT).
+
+    Les horodatages reprennent leur format d'origine et les coordonnées float32
+    leur valeur décimale exacte, pour un fichier identique à l'export
+    sans optimisation.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime(TIMESTAMP_FORMAT)
+        elif df[col].dtype == "float32":
+            df[col] = df[col].astype(str).astype("float64")
+    return df
+
+
+def memory_report(df_before, df_after):
+    """
+    Compare l'empreinte mémoire (deep) de deux DataFrames colonne par colonne.
+
+    Returns:
+        pd.DataFrame: Colonnes dtype_avant, dtype_apres, octets_avant, octets_apres, gain_pct
+                      (avec une ligne TOTAL)
+    """
+    before = df_before.memory_usage(deep=True, index=False)
+    after = df_after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "dtype_avant": df_before.dtypes.astype(str),
+        "dtype_apres": df_after.dtypes.reindex(df_before.columns).astype(str),
+        "octets_avant": before,
+        "octets_apres": after.reindex(before.index),
+    })
+    report.loc["TOTAL"] = ["", "", before.sum(), after.sum()]
+    report["gain_pct"] = (
+        (1 - report["octets_apres"].astype(float) / report["octets_avant"].astype(float)) * 100
+    ).round(1)
+    return report
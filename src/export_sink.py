@@ -0,0 +1,186 @@
+"""
+Export incrémental des résultats pendant le job.
+
+`ExportSink` ajoute chaque batch terminé à un fichier CSV, NDJSON ou Parquet
+sur disque. Les boutons de téléchargement lisent ensuite ce fichier au lieu
+de re-sérialiser le DataFrame complet à chaque rerun Streamlit.
+"""
+import os
+import tempfile
+
+import pandas as pd
+
+from src.dtypes import restore_export_dtypes
+
+SINK_FORMATS = ("csv", "ndjson", "parquet")
+
+# Colonnes de résultat connues : réservées dès le premier batch pour que les
+# formats à schéma fixe (CSV, Parquet) n'en perdent aucune si elles
+# n'apparaissent que dans un batch ultérieur.
+SINK_RESULT_COLUMNS = [
+    "address_reformatted", "latitude", "longitude", "formatted_address", "status",
+    "error_message", "api_used", "precision_level", "precision_level_raw", "timestamp",
+    "osm_type", "osm_class", "osm_place_id", "response_time", "answered_locally",
+    "centroid_distance_km", "centroid_check", "source_api", "fuzzy_score", "matched_address",
+    "transient", "retry_after", "attempts", "row_index",
+]
+SINK_FLOAT_COLUMNS = ["latitude", "longitude", "response_time", "centroid_distance_km", "fuzzy_score", "retry_after"]
+
+
+class ExportSink:
+    """
+    Fichier d'export alimenté batch par batch.
+
+    Le premier batch fixe les colonnes (complétées par SINK_RESULT_COLUMNS) ;
+    les batches suivants sont alignés sur ces colonnes. Une colonne inconnue
+    apparue dans un batch ultérieur est ajoutée en fin de schéma : le fichier
+    CSV ou Parquet déjà écrit est réécrit avec cette colonne vide. En NDJSON,
+    chaque ligne garde toutes ses clés.
+
+    Exemple :
+        with ExportSink("data/output/jobs/JOB_1.csv", "csv") as sink:
+            for batch in batches:
+                sink.write_batch(batch)
+    """
+
+    def __init__(self, path, export_format="csv", sep=",", compression="zstd"):
+        if export_format not in SINK_FORMATS:
+            raise ValueError(f"Format d'export incrémental non supporté : {export_format}")
+        self.path = path
+        self.export_format = export_format
+        self.sep = sep
+        self.compression = compression
+        self.columns = None
+        self.rows_written = 0
+        self._parquet_writer = None
+        self._parquet_schema = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Repartir d'un fichier vide
+        open(path, "wb").close()
+
+    def _align(self, df):
+        if self.columns is None:
+            extra = [col for col in SINK_RESULT_COLUMNS if col not in df.columns]
+            self.columns = list(df.columns) + extra
+        else:
+            new_columns = [col for col in df.columns if col not in self.columns]
+            if new_columns:
+                self._extend(new_columns)
+        return df.reindex(columns=self.columns)
+
+    def _extend(self, new_columns):
+        """Ajoute des colonnes au schéma et réécrit le fichier déjà produit."""
+        if self.export_format == "csv":
+            written = pd.read_csv(self.path, sep=self.sep, dtype=str, keep_default_na=False)
+            written = written.reindex(columns=written.columns.tolist() + new_columns, fill_value="")
+            written.to_csv(self.path, index=False, sep=self.sep)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._parquet_writer.close()
+            written = pq.read_table(self.path)
+            for name in new_columns:
+                field = pa.field(name, pa.float64() if name in SINK_FLOAT_COLUMNS else pa.string())
+                written = written.append_column(field, pa.nulls(len(written), field.type))
+            written = written.replace_schema_metadata(None)
+            self._parquet_schema = written.schema
+            self._parquet_writer = pq.ParquetWriter(self.path, written.schema, compression=self.compression)
+            self._parquet_writer.write_table(written)
+        self.columns = self.columns + new_columns
+
+    def write_batch(self, df):
+        """Ajoute un batch enrichi au fichier."""
+        if df is None or df.empty:
+            return
+        df = restore_export_dtypes(df)
+
+        if self.export_format == "ndjson":
+            with open(self.path, "a", encoding="utf-8") as f:
+                content = df.to_json(orient="records", lines=True, force_ascii=False)
+                f.write(content if content.endswith("\n") else content + "\n")
+        elif self.export_format == "csv":
+            write_header = self.columns is None
+            df = self._align(df)
+            df.to_csv(self.path, mode="a", header=write_header, index=False, sep=self.sep)
+        else:
+            self._write_parquet(self._align(df))
+
+        self.rows_written += len(df)
+
+    def _write_parquet(self, df):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("L'export parquet nécessite le paquet pyarrow (pip install pyarrow).") from e
+
+        def as_text(series):
+            return series.astype(object).where(series.isna(), series.astype(str))
+
+        for col in df.columns:
+            if col in SINK_FLOAT_COLUMNS:
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+            elif df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = as_text(df[col])
+
+        if self._parquet_schema is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            # Colonnes vides dans le premier batch : typées en texte
+            for i, field in enumerate(schema):
+                if field.name not in SINK_FLOAT_COLUMNS and df[field.name].isna().all():
+                    schema = schema.set(i, pa.field(field.name, pa.string()))
+            self._parquet_schema = schema
+            self._parquet_writer = pq.ParquetWriter(self.path, schema, compression=self.compression)
+
+        for field in self._parquet_schema:
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                df[field.name] = as_text(df[field.name])
+
+        table = pa.Table.from_pandas(df, schema=self._parquet_schema, preserve_index=False, safe=False)
+        self._parquet_writer.write_table(table)
+
+    def close(self):
+        """Termine le fichier (pied de page Parquet)."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def file_download(path):
+    """
+    Retourne une fonction ouvrant le fichier au moment du clic.
+
+    À passer en `data` de `st.download_button` : rien n'est lu ni sérialisé
+    lors des reruns, et Streamlit reçoit le descripteur de fichier plutôt
+    qu'une copie du contenu en mémoire.
+    """
+    def open_file():
+        return open(path, "rb")
+    return open_file
+
+
+def csv_download(df, sep=","):
+    """
+    Retourne une fonction qui écrit `df` en CSV (par blocs) dans un fichier temporaire.
+
+    L'écriture n'a lieu qu'au clic sur le bouton de téléchargement. Le fichier
+    est anonyme et propre à ce clic : deux sessions ne s'écrasent pas, et il
+    disparaît du disque à sa fermeture.
+    """
+    def write_and_open():
+        f = tempfile.TemporaryFile(buffering=0)
+        restore_export_dtypes(df).to_csv(f, index=False, sep=sep, chunksize=50_000, encoding="utf-8")
+        f.seek(0)
+        return f
+    return write_and_open
@@ -0,0 +1,265 @@
+"""
+Index flou (trigrammes) des adresses déjà géocodées.
+
+Le cache exact (`lru_cache`) rate les adresses qui ne diffèrent que par une
+faute de frappe, un « Rue » manquant ou l'ordre des mots. Ici, chaque adresse
+normalisée est découpée en trigrammes ; une recherche ne compare que les
+adresses du même bloc (code postal, sinon ville) et renvoie le résultat
+stocké si la similarité de Jaccard dépasse le seuil et si les numéros sont
+identiques.
+"""
+import os
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from src.config import FUZZY_INDEX_DB, FUZZY_MATCH_THRESHOLD
+from src.gazetteer import normalize_name, normalize_postal_code
+
+# Mots sans valeur discriminante (types de voie, articles)
+STOPWORDS = {
+    "rue", "r", "avenue", "av", "ave", "boulevard", "bd", "blvd", "route", "rte",
+    "impasse", "imp", "place", "pl", "cite", "residence", "res", "immeuble", "imm",
+    "de", "du", "des", "la", "le", "les", "l", "d", "el", "et",
+}
+SOURCE_PRECISIONS = ("ROOFTOP", "RANGE_INTERPOLATED", "GEOMETRIC_CENTER")
+LOCAL_APIS = ("gazetteer", "centroid_cache", "fuzzy_cache")
+STORED_FIELDS = ("latitude", "longitude", "formatted_address", "precision_level", "precision_level_raw", "api_used")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fuzzy_entries (
+    block TEXT NOT NULL,
+    address TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    formatted_address TEXT,
+    precision_level TEXT,
+    precision_level_raw TEXT,
+    api_used TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (block, address)
+)
+"""
+
+
+def normalize_address(text):
+    """
+    Forme canonique : minuscules sans accents, sans mots vides, numéros sans zéros
+    de tête, mots triés (l'ordre des mots n'a plus d'importance).
+    """
+    tokens = []
+    for token in normalize_name(text).split():
+        if token.isdigit():
+            tokens.append(str(int(token)))
+        elif token not in STOPWORDS:
+            tokens.append(token)
+    return " ".join(sorted(tokens))
+
+
+def trigrams(normalized):
+    """Ensemble des trigrammes des mots (chaque mot encadré d'espaces)."""
+    grams = set()
+    for token in normalized.split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def numbers(normalized):
+    """Numéros présents dans l'adresse (doivent correspondre exactement)."""
+    return frozenset(t for t in normalized.split() if t.isdigit())
+
+
+def _has_value(row, field):
+    value = row.get(field)
+    return value is not None and not (not isinstance(value, str) and pd.isna(value)) and str(value).strip() != ""
+
+
+def row_block(row):
+    """Bloc de comparaison : code postal normalisé, sinon ville normalisée."""
+    if _has_value(row, "postal_code"):
+        postal_code = normalize_postal_code(row["postal_code"])
+        if postal_code:
+            return f"cp:{postal_code}"
+    if _has_value(row, "city"):
+        return f"city:{normalize_name(row['city'])}"
+    return None
+
+
+def row_address(row):
+    """Texte indexé pour une ligne : nom et rue normalisés."""
+    parts = [str(row[field]) for field in ("name", "street") if _has_value(row, field)]
+    return normalize_address(" ".join(parts))
+
+
+class FuzzyIndex:
+    """
+    Index trigrammes en mémoire, partitionné par bloc.
+
+    Exemple :
+        index = FuzzyIndex(threshold=0.7)
+        index.add("cp:1000", "12 rue de marseille", result)
+        match = index.lookup("cp:1000", "12 marseile")
+    """
+
+    def __init__(self, threshold=FUZZY_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._blocks = {}
+
+    def __len__(self):
+        return sum(len(block["entries"]) for block in self._blocks.values())
+
+    def add(self, block, address, result):
+        """Ajoute (ou remplace) l'adresse normalisée `address` du bloc."""
+        if not block or not address:
+            return
+        data = self._blocks.setdefault(block, {"entries": [], "positions": {}, "postings": {}})
+        position = data["positions"].get(address)
+        if position is not None:
+            data["entries"][position] = (address, numbers(address), len(trigrams(address)), result)
+            return
+        grams = trigrams(address)
+        position = len(data["entries"])
+        data["positions"][address] = position
+        data["entries"].append((address, numbers(address), len(grams), result))
+        for gram in grams:
+            data["postings"].setdefault(gram, []).append(position)
+
+    def lookup(self, block, address):
+        """
+        Meilleure adresse du bloc au-dessus du seuil.
+
+        Returns:
+            tuple | None: (similarité, résultat stocké, adresse trouvée)
+        """
+        data = self._blocks.get(block)
+        if data is None or not address:
+            return None
+        position = data["positions"].get(address)
+        if position is not None:
+            return 1.0, data["entries"][position][3], address
+
+        grams = trigrams(address)
+        shared = Counter()
+        for gram in grams:
+            shared.update(data["postings"].get(gram, ()))
+        query_numbers = numbers(address)
+
+        best = None
+        for position, common in shared.items():
+            candidate, candidate_numbers, size, result = data["entries"][position]
+            score = common / (len(grams) + size - common)
+            if score >= self.threshold and candidate_numbers == query_numbers:
+                if best is None or score > best[0]:
+                    best = (score, result, candidate)
+        return best
+
+
+def _connect(db_path):
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute(SCHEMA)
+    return conn
+
+
+def update_fuzzy_index(enriched_df, db_path=FUZZY_INDEX_DB):
+    """
+    Enregistre les adresses géocodées avec succès d'un job.
+
+    Seuls les résultats d'API (pas ceux déjà servis localement) d'une précision
+    au moins GEOMETRIC_CENTER sont gardés.
+
+    Returns:
+        int: Nombre d'adresses enregistrées
+    """
+    required = {"status", "precision_level", "latitude", "longitude"}
+    if enriched_df is None or enriched_df.empty or not required.issubset(enriched_df.columns):
+        return 0
+    mask = (
+        (enriched_df["status"] == "OK")
+        & enriched_df["precision_level"].isin(SOURCE_PRECISIONS)
+        & enriched_df["latitude"].notna()
+        & enriched_df["longitude"].notna()
+    )
+    if "api_used" in enriched_df.columns:
+        mask &= ~enriched_df["api_used"].isin(LOCAL_APIS)
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    records = []
+    for row in enriched_df.loc[mask].to_dict("records"):
+        block, address = row_block(row), row_address(row)
+        if not block or not address:
+            continue
+        text = [None if pd.isna(row.get(field)) else str(row[field]) for field in STORED_FIELDS[2:]]
+        records.append((block, address, float(row["latitude"]), float(row["longitude"]), *text, now))
+    if records:
+        with _connect(db_path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO fuzzy_entries "
+                "(block, address, latitude, longitude, formatted_address, precision_level, "
+                "precision_level_raw, api_used, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+        conn.close()
+    return len(records)
+
+
+@lru_cache(maxsize=2)
+def _read_index(db_path, mtime_ns, threshold):
+    index = FuzzyIndex(threshold=threshold)
+    conn = _connect(db_path)
+    try:
+        for block, address, *values in conn.execute(
+            f"SELECT block, address, {', '.join(STORED_FIELDS)} FROM fuzzy_entries"
+        ):
+            index.add(block, address, dict(zip(STORED_FIELDS, values)))
+    finally:
+        conn.close()
+    return index
+
+
+_load_lock = threading.Lock()
+
+
+def load_fuzzy_index(db_path=FUZZY_INDEX_DB, threshold=FUZZY_MATCH_THRESHOLD):
+    """Index en mémoire, reconstruit quand la base SQLite change."""
+    if not os.path.exists(db_path):
+        return None
+    with _load_lock:
+        return _read_index(db_path, os.stat(db_path).st_mtime_ns, threshold)
+
+
+def fuzzy_lookup(row, db_path=FUZZY_INDEX_DB, threshold=FUZZY_MATCH_THRESHOLD):
+    """
+    Résultat stocké pour une adresse quasi identique déjà géocodée.
+
+    Returns:
+        dict | None: Résultat au format des APIs (api_used="fuzzy_cache",
+                     answered_locally, fuzzy_score, matched_address)
+    """
+    index = load_fuzzy_index(db_path, threshold)
+    block = row_block(row)
+    if index is None or block is None:
+        return None
+    match = index.lookup(block, row_address(row))
+    if match is None:
+        return None
+
+    score, stored, matched_address = match
+    return {
+        **stored,
+        "status": "OK",
+        "error_message": None,
+        "api_used": "fuzzy_cache",
+        "source_api": stored.get("api_used"),
+        "answered_locally": True,
+        "fuzzy_score": round(score, 3),
+        "matched_address": matched_address,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
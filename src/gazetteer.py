@@ -0,0 +1,238 @@
+"""
+Gazetteer tunisien hors ligne (gouvernorats, délégations, localités, codes postaux).
+
+La source `data/gazetteer/tn_gazetteer.csv` est compilée en un tableau numpy
+trié par clé (hash 64 bits) puis relue en mémoire partagée (`mmap_mode="r"`).
+Une recherche coûte une recherche dichotomique, sans appel réseau.
+"""
+import hashlib
+import os
+import re
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.config import GAZETTEER_COMPLETE, GAZETTEER_CSV, GAZETTEER_INDEX
+
+GAZETTEER_DTYPE = np.dtype([
+    ("key", "<u8"),
+    ("latitude", "<f4"),
+    ("longitude", "<f4"),
+    ("name", "<U32"),
+    ("governorate", "<U16"),
+])
+
+# Précision retournée selon le type de correspondance
+MATCH_PRECISION = {
+    "postal_code": ("GEOMETRIC_CENTER", "postalCode"),
+    "locality": ("APPROXIMATE", "locality"),
+    "governorate": ("APPROXIMATE", "governorate"),
+}
+
+
+def normalize_name(value):
+    """Minuscules, sans accents ni ponctuation, espaces réduits."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^a-z0-9]+", " ", text.lower())
+    return text.strip()
+
+
+def normalize_postal_code(value):
+    """Code postal tunisien sur 4 chiffres (accepte 1000, '1000', 1000.0)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    text = str(value).strip()
+    text = re.sub(r"\.0+$", "", text)
+    digits = re.sub(r"\D", "", text)
+    if not digits or len(digits) > 4:
+        return ""
+    return digits.zfill(4)
+
+
+def _hash_key(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def build_gazetteer(csv_path=GAZETTEER_CSV, output_path=GAZETTEER_INDEX):
+    """
+    Compile la source CSV en index binaire trié.
+
+    Clés générées :
+        gov:<gouvernorat>            pour les gouvernorats
+        loc:<gouvernorat>:<nom>      pour les délégations et localités
+        loc::<nom>                   si le nom n'existe que dans un gouvernorat
+        cp:<code postal>             pour toute ligne avec un code postal
+
+    Returns:
+        str: Chemin de l'index écrit
+    """
+    source = pd.read_csv(csv_path, dtype={"postal_code": str})
+    places = source[source["kind"] != "governorate"]
+    name_counts = places.groupby(places["name"].map(normalize_name))["governorate"].nunique()
+
+    records = {}
+
+    def add(key, row):
+        hashed = _hash_key(key)
+        if hashed not in records:
+            records[hashed] = (hashed, row["latitude"], row["longitude"], row["name"], row["governorate"])
+
+    for _, row in source.iterrows():
+        name = normalize_name(row["name"])
+        governorate = normalize_name(row["governorate"])
+        if row["kind"] == "governorate":
+            add(f"gov:{governorate}", row)
+        else:
+            add(f"loc:{governorate}:{name}", row)
+            if name_counts.get(name, 0) == 1:
+                add(f"loc::{name}", row)
+        postal_code = normalize_postal_code(row.get("postal_code"))
+        if postal_code:
+            add(f"cp:{postal_code}", row)
+
+    index = np.array(sorted(records.values()), dtype=GAZETTEER_DTYPE)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, index)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+@lru_cache(maxsize=1)
+def load_gazetteer(csv_path=GAZETTEER_CSV, index_path=GAZETTEER_INDEX):
+    """Charge l'index en mémoire partagée (recompilé si la source est plus récente)."""
+    if not os.path.exists(csv_path):
+        return None
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(csv_path):
+        build_gazetteer(csv_path, index_path)
+    return np.load(index_path, mmap_mode="r")
+
+
+@lru_cache(maxsize=1)
+def governorate_centroids(csv_path=GAZETTEER_CSV):
+    """
+    Centres des gouvernorats (nom normalisé, latitude, longitude).
+
+    Returns:
+        pd.DataFrame: Colonnes governorate, latitude, longitude
+    """
+    if not os.path.exists(csv_path):
+        return pd.DataFrame(columns=["governorate", "latitude", "longitude"])
+    source = pd.read_csv(csv_path, dtype={"postal_code": str})
+    governorates = source[source["kind"] == "governorate"]
+    return pd.DataFrame({
+        "governorate": governorates["governorate"].map(normalize_name).to_numpy(),
+        "latitude": governorates["latitude"].astype("float64").to_numpy(),
+        "longitude": governorates["longitude"].astype("float64").to_numpy(),
+    })
+
+
+def _find(index, key):
+    hashed = np.uint64(_hash_key(key))
+    pos = int(np.searchsorted(index["key"], hashed))
+    if pos < len(index) and index["key"][pos] == hashed:
+        return index[pos]
+    return None
+
+
+def lookup(postal_code=None, city=None, governorate=None, index=None, exact=False):
+    """
+    Cherche un lieu dans le gazetteer, du plus précis au plus général.
+
+    Args:
+        exact: Ne retenir que le lieu saisi : ni nom de localité cherché hors
+               de son gouvernorat, ni repli sur le gouvernorat quand la ville
+               est inconnue du gazetteer
+
+    Returns:
+        dict | None: latitude, longitude, name, governorate, match
+    """
+    if index is None:
+        index = load_gazetteer()
+    if index is None:
+        return None
+
+    candidates = []
+    cp = normalize_postal_code(postal_code)
+    if cp:
+        candidates.append(("postal_code", f"cp:{cp}"))
+    city_norm = normalize_name(city)
+    gov_norm = normalize_name(governorate)
+    if city_norm:
+        if gov_norm:
+            candidates.append(("locality", f"loc:{gov_norm}:{city_norm}"))
+        if not exact:
+            candidates.append(("locality", f"loc::{city_norm}"))
+        # Ville chef-lieu saisie comme gouvernorat
+        candidates.append(("governorate", f"gov:{city_norm}"))
+    if gov_norm and not (exact and city_norm):
+        candidates.append(("governorate", f"gov:{gov_norm}"))
+
+    for match, key in candidates:
+        record = _find(index, key)
+        if record is not None:
+            return {
+                "latitude": float(record["latitude"]),
+                "longitude": float(record["longitude"]),
+                "name": str(record["name"]),
+                "governorate": str(record["governorate"]),
+                "match": match,
+            }
+    return None
+
+
+def _has_value(row, field):
+    return field in row and pd.notna(row[field]) and str(row[field]).strip() != ""
+
+
+def geocode_locally(row):
+    """
+    Répond à une ligne sans appel API si le gazetteer atteint sa précision requise.
+
+    Une ligne sans rue ni nom ne peut pas dépasser la précision du code postal
+    (GEOMETRIC_CENTER) ou de la ville (APPROXIMATE) : elle est servie
+    localement. Si un code postal est fourni, seule une correspondance sur ce
+    code est acceptée.
+
+    Tant que `GAZETTEER_COMPLETE` est faux (échantillon livré avec le dépôt),
+    une ville absente du gazetteer n'est pas ramenée au centre de son
+    gouvernorat : la ligne part vers les APIs.
+
+    Returns:
+        dict | None: Résultat au format des APIs, marqué `answered_locally`
+    """
+    if _has_value(row, "street") or _has_value(row, "name"):
+        return None
+
+    postal_code = row.get("postal_code") if _has_value(row, "postal_code") else None
+    place = lookup(
+        postal_code=postal_code,
+        city=row.get("city") if _has_value(row, "city") else None,
+        governorate=row.get("governorate") if _has_value(row, "governorate") else None,
+        exact=not GAZETTEER_COMPLETE,
+    )
+    if place is None or (postal_code and place["match"] != "postal_code"):
+        return None
+
+    precision_level, precision_raw = MATCH_PRECISION[place["match"]]
+    label_parts = [normalize_postal_code(postal_code)] if postal_code else []
+    label_parts += [place["name"], place["governorate"], "Tunisie"]
+    return {
+        "latitude": place["latitude"],
+        "longitude": place["longitude"],
+        "formatted_address": ", ".join(p for p in dict.fromkeys(label_parts) if p),
+        "status": "OK",
+        "error_message": None,
+        "api_used": "gazetteer",
+        "precision_level": precision_level,
+        "precision_level_raw": precision_raw,
+        "answered_locally": True,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
@@ -1,9 +1,7 @@
 import pandas as pd
-import time
 import re
 from datetime import datetime
-from functools import lru_cache
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 import streamlit as st
 
 # Import des APIs séparées
@@ -13,15 +11,32 @@ from src.apis.google import (
     get_place_id_with_google
 )
 from src.apis.osm import geocode_with_osm, geocode_with_osm_structured
+from src.backoff import run_with_backoff
+from src.centroids import check_against_centroids, geocode_from_centroids, update_centroids
+from src.config import (
+    CENTROID_CACHE_ENABLED, FUZZY_INDEX_ENABLED, GAZETTEER_ENABLED, QUOTA_ENABLED, ROUTING_ENABLED,
+    SPATIAL_INDEX_ENABLED,
+)
+from src.fuzzy_index import fuzzy_lookup, update_fuzzy_index
+from src.gazetteer import geocode_locally
+from src.memo import memoize
+from src.quota import allow_call, format_remaining
+from src.routing import route_providers, tracked_call, update_routing_model
+from src.scheduler import get_scheduler, job_executor
+from src.deadline import latency_summary, run_row
+from src.spatial_index import update_spatial_index
+from src.strategies import execute_strategy, get_strategy, load_strategies
+from src.metrics import REGISTRY, QUEUE_DEPTH, observe_row_result
+from src.plausibility import compute_suspicion_scores
 
 # Cache pour éviter les appels répétés
-@lru_cache(maxsize=None)
+@memoize
 def geocode_with_here_cached(address):
     """Version cachée de geocode_with_here"""
     return geocode_with_here(address)
 
 
-@lru_cache(maxsize=None)
+@memoize
 def geocode_with_google_cached(address, postal_code=None, city=None, governorate=None, place_id=None):
     """Version cachée de geocode_with_google"""
     components_dict = {
@@ -32,14 +47,37 @@ def geocode_with_google_cached(address, postal_code=None, city=None, governorate
     return geocode_with_google(address=address, components_dict=components_dict, place_id=place_id)
 
 
-@lru_cache(maxsize=None)
+@memoize
 def geocode_with_osm_cached(address):
     """Version cachée de geocode_with_osm"""
-    # IMPORTANT: Respecter la politique d'utilisation de Nominatim (1 req/sec)
-    time.sleep(1)
+    # Politique d'utilisation de Nominatim (1 req/sec) : appliquée par le
+    # limiteur de débit partagé (API_RATE_LIMITS) dans src/apis/osm.py
     return geocode_with_osm(address)
 
 
+def _collect_cache_metrics():
+    """Expose les statistiques des caches mémoire des APIs."""
+    caches = {
+        "here": geocode_with_here_cached,
+        "google": geocode_with_google_cached,
+        "osm": geocode_with_osm_cached,
+    }
+    hits, misses, sizes = [], [], []
+    for api_name, cached_func in caches.items():
+        info = cached_func.cache_info()
+        hits.append(({"api": api_name}, info.hits))
+        misses.append(({"api": api_name}, info.misses))
+        sizes.append(({"api": api_name}, info.currsize))
+    return [
+        ("geocoder_cache_hits_total", "counter", "Appels servis par le cache.", hits),
+        ("geocoder_cache_misses_total", "counter", "Appels non trouvés dans le cache.", misses),
+        ("geocoder_cache_entries", "gauge", "Nombre d'entrées dans le cache.", sizes),
+    ]
+
+
+REGISTRY.register_collector(_collect_cache_metrics)
+
+
 def generate_address_without_name(row):
     """Génère une adresse sans le nom de l'établissement."""
     parts = []
@@ -82,250 +120,138 @@ def generate_reformatted_address(row):
     return ", ".join(parts)
 
 
-def is_better(result, previous):
-    """Détermine si un résultat est meilleur qu'un autre basé sur la précision."""
-    precision_order = ["ROOFTOP", "RANGE_INTERPOLATED", "GEOMETRIC_CENTER", "APPROXIMATE"]
-    p1 = result.get("precision_level")
-    p2 = previous.get("precision_level")
-    try:
-        return precision_order.index(p1) < precision_order.index(p2)
-    except:
-        return False
+def geocode_row_locally(row, index):
+    """
+    Tente de répondre à la ligne sans appel API : gazetteer hors ligne, puis
+    index flou des adresses déjà géocodées.
+
+    Returns:
+        dict | None: Résultat marqué `answered_locally`, ou None si la ligne
+                     nécessite une API
+    """
+    result = None
+    if GAZETTEER_ENABLED:
+        result = geocode_locally(row)
+    if result is None and FUZZY_INDEX_ENABLED:
+        result = fuzzy_lookup(row)
+    if result:
+        result["address_reformatted"] = generate_reformatted_address(row)
+        result["row_index"] = index
+    return result
+
+
+def _place_query(row):
+    """Requête Places : nom de l'établissement + ville (ou pays)."""
+    query = str(row["name"])
+    if "city" in row and pd.notna(row["city"]):
+        query += " " + str(row["city"])
+    elif "country" in row and pd.notna(row["country"]):
+        query += " " + str(row["country"])
+    return query
+
+
+def _components(row):
+    return {
+        "postal_code": row.get("postal_code"),
+        "city": row.get("city"),
+        "governorate": row.get("governorate")
+    }
+
+
+def _call_google_place_id(row):
+    place_id = get_place_id_with_google(_place_query(row))
+    if place_id:
+        return geocode_with_google(place_id=place_id)
+    return None
+
+
+def _call_osm_structured(row):
+    return geocode_with_osm_structured(
+        street=row.get("street"),
+        city=row.get("city"),
+        postal_code=row.get("postal_code"),
+        country=row.get("country")
+    )
+
+
+def _call_centroids(row):
+    return geocode_from_centroids(row) if CENTROID_CACHE_ENABLED else None
+
+
+# Appels disponibles pour les stratégies (src/strategies.py) : fonction(step, row, query, index)
+STRATEGY_CALLS = {
+    "local": lambda step, row, query, index: geocode_row_locally(row, index),
+    "here": lambda step, row, query, index: tracked_call("here", row, geocode_with_here_cached, query),
+    "google": lambda step, row, query, index: tracked_call(
+        "google", row, geocode_with_google, address=query, components_dict=_components(row)),
+    "google_place_id": lambda step, row, query, index: tracked_call("google", row, _call_google_place_id, row),
+    "osm": lambda step, row, query, index: tracked_call("osm", row, geocode_with_osm_cached, query),
+    "osm_structured": lambda step, row, query, index: tracked_call("osm", row, _call_osm_structured, row),
+    "centroids": lambda step, row, query, index: _call_centroids(row),
+}
+
+# Variantes d'adresse : fonction(row, address)
+STRATEGY_VARIANTS = {
+    "reformatted": lambda row, address: generate_reformatted_address(row),
+    "no_name": lambda row, address: generate_address_without_name(row),
+    "original": lambda row, address: address,
+}
+
+
+def geocode_row_with_strategy(address, index, row, mapped_fields, strategy="multi", job_budget=None):
+    """
+    Géocode une ligne selon une stratégie déclarative (voir src/strategies.py).
+
+    Args:
+        address: Adresse complète de la ligne
+        index: Index de la ligne
+        row: Ligne du DataFrame
+        mapped_fields: Mapping des champs (non utilisé)
+        strategy: Nom de la stratégie ("here", "google", "osm", "multi" ou stratégie du fichier)
+        job_budget: CallBudget partagé par le job (optionnel)
+
+    Returns:
+        dict: Résultat du géocodage
+    """
+    return execute_strategy(
+        get_strategy(strategy), address, index, row,
+        STRATEGY_CALLS, STRATEGY_VARIANTS, job_budget=job_budget,
+        router=route_providers if ROUTING_ENABLED else None,
+        quota=allow_call if QUOTA_ENABLED else None
+    )
 
 
 def geocode_row_with_fallback(address, index, row, mapped_fields):
     """Géocode une ligne avec logique de fallback: HERE -> Google -> OSM."""
-    address_reformatted = generate_reformatted_address(row)
-    best_result = None
-    
-    # ÉTAPE 1: HERE API
-    result = geocode_with_here_cached(address_reformatted)
-    if result and result["status"] == "OK":
-        result["address_reformatted"] = address_reformatted
-        if result.get("precision_level") == "ROOFTOP":
-            result["row_index"] = index
-            return result
-        best_result = result
-    
-    # ÉTAPE 2: GOOGLE MAPS API
-    if not best_result or best_result.get("precision_level") not in ["ROOFTOP", "RANGE_INTERPOLATED"]:
-        if "name" in row and pd.notna(row["name"]):
-            query = str(row["name"])
-            if "city" in row and pd.notna(row["city"]):
-                query += " " + str(row["city"])
-            elif "country" in row and pd.notna(row["country"]):
-                query += " " + str(row["country"])
-            
-            place_id = get_place_id_with_google(query)
-            if place_id:
-                result = geocode_with_google(place_id=place_id)
-                if result and result["status"] == "OK":
-                    if not best_result or is_better(result, best_result):
-                        best_result = result
-                        if result.get("precision_level") == "ROOFTOP":
-                            best_result["row_index"] = index
-                            return best_result
-        
-        components_dict = {
-            "postal_code": row.get("postal_code"),
-            "city": row.get("city"),
-            "governorate": row.get("governorate")
-        }
-        
-        address_no_name = generate_address_without_name(row)
-        result = geocode_with_google(address=address_no_name, components_dict=components_dict)
-        if result and result["status"] == "OK":
-            if not best_result or is_better(result, best_result):
-                best_result = result
-                if result.get("precision_level") == "ROOFTOP":
-                    best_result["row_index"] = index
-                    return best_result
-        
-        result = geocode_with_google(address=address_reformatted, components_dict=components_dict)
-        if result and result["status"] == "OK":
-            result["address_reformatted"] = address_reformatted
-            if not best_result or is_better(result, best_result):
-                best_result = result
-    
-    # ÉTAPE 3: OPENSTREETMAP (OSM)
-    if not best_result or best_result.get("precision_level") == "APPROXIMATE":
-        result = geocode_with_osm_cached(address_reformatted)
-        if result and result["status"] == "OK":
-            result["address_reformatted"] = address_reformatted
-            if not best_result or is_better(result, best_result):
-                best_result = result
-                if result.get("precision_level") == "ROOFTOP":
-                    best_result["row_index"] = index
-                    return best_result
-        
-        if not best_result or best_result.get("precision_level") == "APPROXIMATE":
-            address_no_name = generate_address_without_name(row)
-            result = geocode_with_osm_cached(address_no_name)
-            if result and result["status"] == "OK":
-                if not best_result or is_better(result, best_result):
-                    best_result = result
-        
-        if not best_result or best_result.get("precision_level") == "APPROXIMATE":
-            result = geocode_with_osm_structured(
-                street=row.get("street"),
-                city=row.get("city"),
-                postal_code=row.get("postal_code"),
-                country=row.get("country")
-            )
-            if result and result["status"] == "OK":
-                if not best_result or is_better(result, best_result):
-                    best_result = result
-    
-    if best_result:
-        best_result["row_index"] = index
-        return best_result
-    else:
-        return {
-            "row_index": index,
-            "status": "ERROR",
-            "error_message": "Aucune API n'a retourné de résultat (HERE, Google, OSM).",
-            "api_used": "none",
-            "latitude": None,
-            "longitude": None,
-            "formatted_address": None,
-            "precision_level": None,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+    return geocode_row_with_strategy(address, index, row, mapped_fields, strategy="multi")
 
 
 def geocode_row_here_only(address, index, row, mapped_fields):
     """Géocode une ligne en utilisant uniquement HERE Maps."""
-    address_reformatted = generate_reformatted_address(row)
-    result = geocode_with_here_cached(address_reformatted)
-    if result and result["status"] == "OK":
-        result["address_reformatted"] = address_reformatted
-        result["row_index"] = index
-        return result
-    else:
-        return {
-            "row_index": index,
-            "status": "ERROR",
-            "error_message": "HERE n'a pas retourné de résultat.",
-            "api_used": "here",
-            "latitude": None,
-            "longitude": None,
-            "formatted_address": None,
-            "precision_level": None,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+    return geocode_row_with_strategy(address, index, row, mapped_fields, strategy="here")
 
 
 def geocode_row_google_only(address, index, row, mapped_fields):
     """Géocode une ligne en utilisant uniquement Google Maps."""
-    address_reformatted = generate_reformatted_address(row)
-    components_dict = {
-        "postal_code": row.get("postal_code"),
-        "city": row.get("city"),
-        "governorate": row.get("governorate")
-    }
-    best_result = None
-
-    if "name" in row and pd.notna(row["name"]):
-        query = str(row["name"])
-        if "city" in row and pd.notna(row["city"]):
-            query += " " + str(row["city"])
-        elif "country" in row and pd.notna(row["country"]):
-            query += " " + str(row["country"])
-        
-        place_id = get_place_id_with_google(query)
-        if place_id:
-            result = geocode_with_google(place_id=place_id)
-            if result and result["status"] == "OK":
-                best_result = result
-                if result.get("precision_level") == "ROOFTOP":
-                    best_result["row_index"] = index
-                    return best_result
-
-    address_no_name = generate_address_without_name(row)
-    result = geocode_with_google(address=address_no_name, components_dict=components_dict)
-    if result and result["status"] == "OK":
-        if not best_result or is_better(result, best_result):
-            best_result = result
-            if result.get("precision_level") == "ROOFTOP":
-                best_result["row_index"] = index
-                return best_result
-
-    result = geocode_with_google(address=address_reformatted, components_dict=components_dict)
-    if result and result["status"] == "OK":
-        result["address_reformatted"] = address_reformatted
-        if not best_result or is_better(result, best_result):
-            best_result = result
-
-    if best_result:
-        best_result["row_index"] = index
-        return best_result
-    else:
-        return {
-            "row_index": index,
-            "status": "ERROR",
-            "error_message": "Aucune réponse de Google.",
-            "api_used": "google",
-            "latitude": None,
-            "longitude": None,
-            "formatted_address": None,
-            "precision_level": None,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+    return geocode_row_with_strategy(address, index, row, mapped_fields, strategy="google")
 
 
 def geocode_row_osm_only(address, index, row, mapped_fields):
     """Géocode une ligne en utilisant uniquement OpenStreetMap."""
-    address_reformatted = generate_reformatted_address(row)
-    best_result = None
-    
-    result = geocode_with_osm_cached(address_reformatted)
-    if result and result["status"] == "OK":
-        result["address_reformatted"] = address_reformatted
-        best_result = result
-        if result.get("precision_level") == "ROOFTOP":
-            best_result["row_index"] = index
-            return best_result
-    
-    if not best_result:
-        address_no_name = generate_address_without_name(row)
-        result = geocode_with_osm_cached(address_no_name)
-        if result and result["status"] == "OK":
-            best_result = result
-            if result.get("precision_level") == "ROOFTOP":
-                best_result["row_index"] = index
-                return best_result
-    
-    if not best_result:
-        result = geocode_with_osm_structured(
-            street=row.get("street"),
-            city=row.get("city"),
-            postal_code=row.get("postal_code"),
-            country=row.get("country")
-        )
-        if result and result["status"] == "OK":
-            best_result = result
-    
-    if best_result:
-        best_result["row_index"] = index
-        return best_result
-    else:
-        return {
-            "row_index": index,
-            "status": "ERROR",
-            "error_message": "OSM n'a pas retourné de résultat.",
-            "api_used": "osm",
-            "latitude": None,
-            "longitude": None,
-            "formatted_address": None,
-            "precision_level": None,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+    return geocode_row_with_strategy(address, index, row, mapped_fields, strategy="osm")
 
 
 def parallel_geocode_row(df, address_column="full_address", 
-                         max_workers=10, progress_callback=None, api_mode="here"):
-    """Géocode plusieurs lignes en parallèle avec choix de l'API."""
-    mapped_fields = st.session_state.mapping_config.get("fields", {})
+                         max_workers=10, progress_callback=None, api_mode="here",
+                         mapped_fields=None, job_id=None, job_rows=None):
+    """
+    Géocode plusieurs lignes en parallèle avec choix de l'API.
+
+    Les lignes passent par l'ordonnanceur partagé entre les jobs
+    (`job_id` regroupe les lots d'un même job, `job_rows` est sa taille totale).
+    """
+    if mapped_fields is None:
+        mapped_fields = st.session_state.mapping_config.get("fields", {})
     results = []
     
     if api_mode == "multi":
@@ -336,33 +262,42 @@ def parallel_geocode_row(df, address_column="full_address",
         geocode_func = geocode_row_google_only
     elif api_mode == "osm":
         geocode_func = geocode_row_osm_only
+    elif api_mode in load_strategies():
+        def geocode_func(address, index, row, mapped_fields):
+            return geocode_row_with_strategy(address, index, row, mapped_fields, strategy=api_mode)
     else:
         geocode_func = geocode_row_here_only
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(
-                geocode_func,
-                row[address_column],
-                row.name,
-                row,
-                mapped_fields
-            ): index for index, row in df.iterrows()
-        }
-
-        for future in as_completed(futures):
+    backoff_report = {}
+    # Chaque ligne a sa propre échéance (ROW_DEADLINE_SECONDS) et sa durée mesurée
+    geocode_func = partial(run_row, geocode_func)
+    with job_executor(job_id, job_rows or len(df), max_workers) as executor:
+        # Lignes en échec temporaire (quota, timeout) replanifiées sans bloquer les threads
+        tasks = (
+            (index, (row[address_column], row.name, row, mapped_fields))
+            for index, row in df.iterrows()
+        )
+        QUEUE_DEPTH.inc(len(df), queue="geocoding")
+
+        for index, future, attempts in run_with_backoff(executor, geocode_func, tasks, report=backoff_report):
             try:
                 geocode_result = future.result()
                 index = geocode_result["row_index"]
                 original_row = df.loc[index].to_dict()
-                merged = {**original_row, **geocode_result}
+                if CENTROID_CACHE_ENABLED:
+                    geocode_result = check_against_centroids(geocode_result, original_row)
+                merged = {**original_row, **geocode_result, "attempts": attempts}
                 results.append(merged)
             except Exception as e:
-                results.append({
+                geocode_result = {
                     "status": "ERROR",
                     "error_message": str(e),
-                    "row_index": futures[future]
-                })
+                    "row_index": index,
+                    "attempts": attempts
+                }
+                results.append(geocode_result)
+            QUEUE_DEPTH.dec(queue="geocoding")
+            observe_row_result(geocode_result)
             if progress_callback:
                 progress_callback()
 
@@ -375,6 +310,7 @@ def parallel_geocode_row(df, address_column="full_address",
         cols.insert(fa_index + 1, "address_reformatted")
         result_df = result_df[cols]
 
+    result_df.attrs["backoff_report"] = backoff_report
     return result_df
 
 
@@ -388,6 +324,7 @@ def create_job_entry(job_id, total_rows):
         "total_rows": total_rows,
         "success": 0,
         "failed": 0,
+        "answered_locally": 0,
         "precision_counts": {},
         "details_df": None
     }
@@ -399,10 +336,40 @@ def finalize_job(job, enriched_df):
     job["status"] = "success"
     job["success"] = (enriched_df["status"] == "OK").sum()
     job["failed"] = len(enriched_df) - job["success"]
+    if "answered_locally" in enriched_df.columns:
+        job["answered_locally"] = int(enriched_df["answered_locally"].eq(True).sum())
+    if "attempts" in enriched_df.columns:
+        # Lignes replanifiées après un échec temporaire, et tentatives supplémentaires
+        extra_attempts = pd.to_numeric(enriched_df["attempts"], errors="coerce").fillna(1) - 1
+        job["requeued_rows"] = int((extra_attempts > 0).sum())
+        job["extra_attempts"] = int(extra_attempts.sum())
     
     if "precision_level" in enriched_df.columns:
         job["precision_counts"] = enriched_df["precision_level"].value_counts().to_dict()
     
+    if CENTROID_CACHE_ENABLED:
+        scores = compute_suspicion_scores(enriched_df)["suspicion_score"]
+        job["centroid_points_added"] = update_centroids(enriched_df.assign(suspicion_score=scores))
+    if FUZZY_INDEX_ENABLED:
+        job["fuzzy_addresses_added"] = update_fuzzy_index(enriched_df)
+    if SPATIAL_INDEX_ENABLED and "latitude" in enriched_df.columns:
+        job["spatial_index_points"] = update_spatial_index(enriched_df)
+    if ROUTING_ENABLED:
+        job["routing_attempts_added"] = update_routing_model()
+    if QUOTA_ENABLED:
+        job["quota_remaining"] = format_remaining()
+    if "row_seconds" in enriched_df.columns:
+        latency = latency_summary(pd.to_numeric(enriched_df["row_seconds"], errors="coerce"))
+        job["row_p50_seconds"] = latency.get("p50")
+        job["row_p99_seconds"] = latency.get("p99")
+    if "deadline_exceeded" in enriched_df.columns:
+        job["deadline_rows"] = int(enriched_df["deadline_exceeded"].eq(True).sum())
+    scheduler_report = get_scheduler().job_report(job["job_id"])
+    if scheduler_report:
+        job["queue_lane"] = scheduler_report["lane"]
+        job["queue_wait_avg"] = round(scheduler_report["wait_avg"], 2)
+        job["queue_wait_max"] = round(scheduler_report["wait_max"], 2)
+
     job["details_df"] = enriched_df
     return job
 
@@ -1,17 +1,53 @@
 import pandas as pd
 import re
 from datetime import datetime
-from functools import lru_cache
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import streamlit as st
 
 # Import des APIs
-from src.apis.here import geocode_with_here
 from src.apis.google import (
     geocode_with_google,
     get_place_id_with_google
 )
-from src.apis.osm import geocode_with_osm, geocode_with_osm_structured
+from src.apis.osm import geocode_with_osm_structured
+from src.backoff import is_transient, run_with_backoff
+from src.call_budget import CallBudget, call_cost
+from src.config import (
+    GAZETTEER_ENABLED,
+    RETRY_MAX_CALLS_PER_ROW,
+    RETRY_MAX_COST_PER_ROW,
+    RETRY_MAX_CALLS_PER_JOB,
+    RETRY_MAX_COST_PER_JOB,
+    RETRY_FAN_OUT,
+    RETRY_FAN_OUT_WIDTH,
+    QUOTA_ENABLED,
+    ROUTING_ENABLED,
+    SUSPICION_THRESHOLD,
+)
+from src.geocoding import geocode_with_here_cached, geocode_with_google_cached, geocode_with_osm_cached
+from src.gazetteer import geocode_locally
+from src.geo import haversine_km
+from src.metrics import QUEUE_DEPTH, observe_row_result
+from src.plausibility import score_candidate
+from src.quota import allow_call
+from src.routing import (
+    PROVIDERS as ROUTING_PROVIDERS,
+    expected_cost,
+    has_evidence,
+    load_routing_model,
+    tracked_call,
+    update_routing_model,
+)
+from src.scheduler import job_executor
+from src.deadline import (
+    DEADLINE_STATUS,
+    bind as bind_deadline,
+    expired as deadline_expired,
+    latency_summary,
+    remaining as deadline_remaining,
+    run_row,
+)
 
 
 # ========== FONCTIONS UTILITAIRES ==========
@@ -104,27 +140,308 @@ def is_better_precision(new_result, current_best):
 
 # ========== STRATÉGIE DE RELANCE INTELLIGENTE ==========
 
-def intelligent_retry_geocode(row, index, target_precision="ROOFTOP"):
+PRECISION_ORDER = ["ROOFTOP", "RANGE_INTERPOLATED", "GEOMETRIC_CENTER", "APPROXIMATE"]
+
+# Résultat avant relance, copié en `previous_*` (la page efface les colonnes de résultat)
+PREVIOUS_COLUMNS = ["status", "precision_level", "api_used", "latitude", "longitude",
+                    "formatted_address", "suspicion_score"]
+# En deçà, un candidat est le même point que l'ancien résultat suspect
+SAME_POINT_KM = 0.1
+
+
+def keep_previous_result(df):
+    """Copie les colonnes de résultat en `previous_*` avant leur nettoyage."""
+    return df.assign(**{f"previous_{col}": df[col] for col in PREVIOUS_COLUMNS if col in df.columns})
+
+
+def _previous(row, field):
+    value = row.get(f"previous_{field}", row.get(field))
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value
+
+
+def is_suspect_row(row):
+    """Vrai si la ligne était OK mais avec un score de suspicion au-dessus du seuil."""
+    score = _previous(row, "suspicion_score")
+    return _previous(row, "status") == "OK" and score is not None and score >= SUSPICION_THRESHOLD
+
+
+def accept_relocation(row, result):
+    """
+    Vérifie un candidat pour une ligne suspecte : un autre point que l'ancien, et plausible.
+
+    Le candidat est complété de son score (`suspicion_score`, `suspicion_reasons`).
+
+    Returns:
+        bool: True si le candidat peut remplacer l'ancien résultat
+    """
+    if not result or result.get("status") != "OK":
+        return False
+    lat, lon = _previous(row, "latitude"), _previous(row, "longitude")
+    if (
+        lat is not None and lon is not None
+        and result.get("latitude") is not None and result.get("longitude") is not None
+        and haversine_km(lat, lon, result["latitude"], result["longitude"]) < SAME_POINT_KM
+    ):
+        return False
+    scores = score_candidate(row, result)
+    result["suspicion_score"] = float(scores["suspicion_score"])
+    result["suspicion_reasons"] = scores["suspicion_reasons"]
+    return result["suspicion_score"] < SUSPICION_THRESHOLD
+
+
+def is_improvement(result, row):
+    """Vrai si le résultat améliore l'ancien : statut, précision, ou point moins suspect."""
+    if not result or result.get("status") != "OK":
+        return False
+    if _previous(row, "status") != "OK":
+        return True
+    if is_better_precision(result, {"precision_level": _previous(row, "precision_level")}):
+        return True
+    old_score, new_score = _previous(row, "suspicion_score"), result.get("suspicion_score")
+    return old_score is not None and new_score is not None and new_score < old_score
+
+
+def reaches_target(result, target_precision):
+    """Vrai si le résultat atteint (ou dépasse) la précision cible."""
+    if not result or result.get("status") != "OK":
+        return False
+    try:
+        return PRECISION_ORDER.index(result.get("precision_level")) <= PRECISION_ORDER.index(target_precision)
+    except ValueError:
+        return False
+
+
+def _components(row):
+    return (row.get("postal_code"), row.get("city"), row.get("governorate"))
+
+
+def build_retry_plan(row, address_variants, current_api=None, fresh=False):
+    """
+    Liste ordonnée des appels possibles pour une ligne.
+
+    Ordre : appels déjà en cache (gratuits), puis APIs autres que celle du
+    résultat actuel, puis coût croissant (API_CALL_COSTS), divisé par la
+    probabilité de ROOFTOP dans la région de la ligne quand le modèle de
+    routage a assez de données ; à égalité, l'ordre historique (variantes
+    HERE, place_id Google, variantes Google, variantes OSM, OSM structuré).
+
+    Args:
+        fresh: Ligne suspecte : les étapes de l'API du résultat actuel
+               contournent le cache mémoire (qui rendrait le même point)
+
+    Returns:
+        list[dict]: Étapes (kind, api, variant, address, cached, fresh, cost, expected_cost)
+    """
+    steps = []
+    for variant_type, address in address_variants:
+        steps.append({"kind": "here", "api": "here", "variant": variant_type, "address": address,
+                      "cached": geocode_with_here_cached.cache_contains(address)})
+    if "name" in row and pd.notna(row["name"]):
+        query = str(row["name"])
+        if "city" in row and pd.notna(row["city"]):
+            query += " " + str(row["city"])
+        elif "country" in row and pd.notna(row["country"]):
+            query += " " + str(row["country"])
+        steps.append({"kind": "google_place_id", "api": "google_places", "variant": "place_id",
+                      "address": query, "cached": False})
+    for variant_type, address in address_variants:
+        steps.append({"kind": "google", "api": "google", "variant": variant_type, "address": address,
+                      "cached": geocode_with_google_cached.cache_contains(address, *_components(row))})
+    for variant_type, address in address_variants:
+        steps.append({"kind": "osm", "api": "osm", "variant": variant_type, "address": address,
+                      "cached": geocode_with_osm_cached.cache_contains(address)})
+    steps.append({"kind": "osm_structured", "api": "osm", "variant": "structured", "address": None,
+                  "cached": False})
+
+    # Modèle de routage : coût attendu pour obtenir ROOFTOP dans la région de la ligne
+    model = load_routing_model() if ROUTING_ENABLED else {}
+    routed = bool(model) and has_evidence(row, ROUTING_PROVIDERS, model)
+    for position, step in enumerate(steps):
+        step["fresh"] = bool(fresh and current_api and step["api"].startswith(current_api))
+        if step["fresh"]:
+            step["cached"] = False
+        step["cost"] = call_cost(step["api"])
+        if step["kind"] == "google_place_id":
+            step["cost"] += call_cost("google")
+        step["expected_cost"] = (
+            expected_cost(row, step["api"].split("_")[0], model, cost=step["cost"]) if routed else step["cost"]
+        )
+        step["position"] = position
+    return sorted(
+        steps,
+        key=lambda s: (not s["cached"], s["api"].startswith(current_api or "-"), s["expected_cost"], s["position"]),
+    )
+
+
+# Étapes indépendantes d'une même API, pouvant partir en parallèle
+FAN_OUT_KINDS = ("here", "google", "osm")
+
+
+def _call_variant(step, row):
+    """Appel (via le cache, sauf étape `fresh`) d'une variante d'adresse pour une API."""
+    def uncached(func):
+        return func.__wrapped__ if step.get("fresh") else func
+
+    if step["kind"] == "here":
+        return tracked_call("here", row, uncached(geocode_with_here_cached), step["address"])
+    if step["kind"] == "google":
+        return tracked_call("google", row, uncached(geocode_with_google_cached), step["address"], *_components(row))
+    return tracked_call("osm", row, uncached(geocode_with_osm_cached), step["address"])
+
+
+def _quota_allows(step, budget):
+    """Consulte le quota des APIs de l'étape (place_id : étape facultative)."""
+    if step["cached"] or not QUOTA_ENABLED:
+        return True
+    apis = ("google_places", "google") if step["kind"] == "google_place_id" else (step["api"],)
+    if all(allow_call(api, optional=step["kind"] == "google_place_id") for api in apis):
+        return True
+    budget.skip()
+    return False
+
+
+def execute_retry_step(step, row, budget):
+    """
+    Exécute une étape du plan si elle est en cache ou si le budget et le
+    quota le permettent.
+
+    Returns:
+        dict | None: Résultat de l'API (None si l'étape est sautée)
+    """
+    kind = step["kind"]
+    if not _quota_allows(step, budget):
+        return None
+    if kind in FAN_OUT_KINDS:
+        if step["cached"] or budget.try_spend(step["api"]):
+            return _call_variant(step, row)
+    elif kind == "google_place_id":
+        if budget.try_spend("google_places"):
+            place_id = get_place_id_with_google(step["address"])
+            if place_id and budget.try_spend("google"):
+                return tracked_call("google", row, geocode_with_google, place_id=place_id)
+    elif kind == "osm_structured":
+        if budget.try_spend("osm"):
+            return tracked_call(
+                "osm", row, geocode_with_osm_structured,
+                street=row.get("street"),
+                city=row.get("city"),
+                postal_code=row.get("postal_code"),
+                country=row.get("country")
+            )
+    return None
+
+
+def fan_out_steps(steps, row, budget, target_precision, width=RETRY_FAN_OUT_WIDTH, accept=None):
+    """
+    Interroge en parallèle les variantes d'une même API (fenêtre glissante).
+
+    Au plus `width` appels sont en vol ; dès qu'un résultat atteint la
+    précision cible, les variantes restantes ne sont pas envoyées et les
+    appels encore en vol sont abandonnés (leur réponse est ignorée). Le
+    surcoût par rapport à l'exécution séquentielle est donc d'au plus
+    `width - 1` appels. Chaque appel est soumis au budget avant son envoi et
+    au limiteur de débit de l'API. `accept(result)` écarte un résultat de la
+    condition d'arrêt (ligne suspecte : même point ou point peu plausible).
+
+    Returns:
+        list[tuple]: (étape, résultat) des appels terminés, dans l'ordre d'arrivée
+    """
+    pending = list(steps)
+    running = {}
+    results = []
+    executor = ThreadPoolExecutor(max_workers=max(1, width))
+    # Les appels partent dans d'autres threads avec l'échéance de la ligne
+    call_variant = bind_deadline(_call_variant)
+
+    def submit_next():
+        while pending and len(running) < width:
+            step = pending.pop(0)
+            if _quota_allows(step, budget) and (step["cached"] or budget.try_spend(step["api"])):
+                running[executor.submit(call_variant, step, row)] = step
+
+    try:
+        submit_next()
+        while running:
+            done, _ = wait(running, timeout=deadline_remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                # Échéance : les appels encore en vol sont abandonnés
+                break
+            target_reached = False
+            for future in done:
+                step = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None
+                results.append((step, result))
+                target_reached = target_reached or (
+                    reaches_target(result, target_precision) and (accept is None or accept(result))
+                )
+            if target_reached:
+                break
+            submit_next()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def _plan_groups(plan, fan_out):
+    """Regroupe les étapes consécutives non cachées d'une même API (si fan_out)."""
+    groups = []
+    for step in plan:
+        if (
+            fan_out and groups and step["kind"] in FAN_OUT_KINDS and not step["cached"]
+            and groups[-1][-1]["kind"] == step["kind"] and not groups[-1][-1]["cached"]
+        ):
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+    return groups
+
+
+def intelligent_retry_geocode(row, index, target_precision="ROOFTOP", job_budget=None,
+                              fan_out=RETRY_FAN_OUT, fan_out_width=RETRY_FAN_OUT_WIDTH):
     """
     Stratégie intelligente de relance avec plusieurs APIs et variantes d'adresse.
     
     Stratégie :
-    1. Si la ligne a déjà un résultat OK mais précision faible → tenter d'améliorer
-    2. Si la ligne a échoué → essayer toutes les APIs avec toutes les variantes
-    3. Retourner le meilleur résultat trouvé
+    1. Construire le plan d'appels (APIs × variantes, place_id, OSM structuré),
+       appels servis par le cache puis appels les moins chers en premier
+    2. Arrêter dès que la précision cible est atteinte
+    3. Ne pas dépasser le budget d'appels / de coût de la ligne et du job
+    4. Retourner le meilleur résultat trouvé (y compris à l'échéance de la ligne,
+       après laquelle seuls les appels servis par le cache sont faits)
+
+    Ligne suspecte (OK mais score de suspicion au-dessus du seuil) : l'API du
+    résultat actuel est rappelée sans le cache mémoire, et un candidat n'est
+    retenu que s'il est ailleurs que l'ancien point et plausible
+    (`accept_relocation`) ; sinon l'ancien résultat est rendu, non amélioré.
     
     Args:
         row: Ligne du DataFrame
         index: Index de la ligne
         target_precision: Niveau de précision cible (par défaut ROOFTOP)
+        job_budget: CallBudget partagé par toutes les lignes du job (optionnel)
+        fan_out: Interroger en parallèle les variantes d'une même API
+        fan_out_width: Appels simultanés max par API (surcoût borné à width - 1)
     
     Returns:
         dict: Meilleur résultat trouvé
     """
     best_result = None
-    current_status = row.get("status")
-    current_precision = row.get("precision_level")
-    current_api = row.get("api_used")
+    current_api = _previous(row, "api_used")
+    suspect = is_suspect_row(row)
+    accept = partial(accept_relocation, row) if suspect else None
+    
+    # Lignes sans rue ni nom : le gazetteer local suffit, aucune API à relancer
+    if GAZETTEER_ENABLED:
+        local_result = geocode_locally(row)
+        if local_result and (accept is None or accept(local_result)):
+            local_result["row_index"] = index
+            local_result["improved"] = is_improvement(local_result, row)
+            return local_result
     
     # Générer toutes les variantes d'adresse
     address_variants = generate_alternative_addresses(row)
@@ -142,126 +459,93 @@ def intelligent_retry_geocode(row, index, target_precision="ROOFTOP"):
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
     
-    # Ordre des APIs à essayer (en fonction de ce qui a déjà été tenté)
-    api_order = []
-    
-    if current_api == "here":
-        api_order = ["google", "osm", "here"]
-    elif current_api == "google":
-        api_order = ["here", "osm", "google"]
-    elif current_api == "osm":
-        api_order = ["here", "google", "osm"]
-    else:
-        api_order = ["here", "google", "osm"]
+    # ========== PLAN D'APPELS : CACHE ET APPELS BON MARCHÉ D'ABORD ==========
     
-    # ========== ESSAYER CHAQUE API AVEC CHAQUE VARIANTE ==========
+    budget = CallBudget(RETRY_MAX_CALLS_PER_ROW, RETRY_MAX_COST_PER_ROW, parent=job_budget)
+    plan = build_retry_plan(row, address_variants, current_api, fresh=suspect)
+    transient_results = []
+    deadline_hit = False
     
-    for api_name in api_order:
-        
-        # Arrêter si on a déjà ROOFTOP
-        if best_result and best_result.get("precision_level") == "ROOFTOP":
+    for group in _plan_groups(plan, fan_out):
+        if reaches_target(best_result, target_precision):
             break
-        
-        if api_name == "here":
-            for variant_type, address in address_variants:
-                result = geocode_with_here(address)
-                if result and result["status"] == "OK":
-                    result["address_variant"] = variant_type
-                    if not best_result or is_better_precision(result, best_result):
-                        best_result = result
-                        if result.get("precision_level") == "ROOFTOP":
-                            break
-        
-        elif api_name == "google":
-            # Stratégie Google : place_id + adresses variantes + composants structurés
-            
-            # 1. Essayer avec place_id si on a un nom
-            if "name" in row and pd.notna(row["name"]):
-                query = str(row["name"])
-                if "city" in row and pd.notna(row["city"]):
-                    query += " " + str(row["city"])
-                elif "country" in row and pd.notna(row["country"]):
-                    query += " " + str(row["country"])
-                
-                place_id = get_place_id_with_google(query)
-                if place_id:
-                    result = geocode_with_google(place_id=place_id)
-                    if result and result["status"] == "OK":
-                        result["address_variant"] = "place_id"
-                        if not best_result or is_better_precision(result, best_result):
-                            best_result = result
-                            if result.get("precision_level") == "ROOFTOP":
-                                continue
-            
-            # 2. Essayer avec chaque variante d'adresse
-            components_dict = {
-                "postal_code": row.get("postal_code"),
-                "city": row.get("city"),
-                "governorate": row.get("governorate")
-            }
-            
-            for variant_type, address in address_variants:
-                result = geocode_with_google(address=address, components_dict=components_dict)
-                if result and result["status"] == "OK":
-                    result["address_variant"] = variant_type
-                    if not best_result or is_better_precision(result, best_result):
-                        best_result = result
-                        if result.get("precision_level") == "ROOFTOP":
-                            break
-        
-        elif api_name == "osm":
-            # Stratégie OSM : adresses variantes + recherche structurée
-            
-            # 1. Essayer avec chaque variante
-            for variant_type, address in address_variants:
-                result = geocode_with_osm(address)
-                if result and result["status"] == "OK":
-                    result["address_variant"] = variant_type
-                    if not best_result or is_better_precision(result, best_result):
-                        best_result = result
-                        if result.get("precision_level") == "ROOFTOP":
-                            break
-            
-            # 2. Essayer avec recherche structurée
-            if not best_result or best_result.get("precision_level") != "ROOFTOP":
-                result = geocode_with_osm_structured(
-                    street=row.get("street"),
-                    city=row.get("city"),
-                    postal_code=row.get("postal_code"),
-                    country=row.get("country")
-                )
-                if result and result["status"] == "OK":
-                    result["address_variant"] = "structured"
-                    if not best_result or is_better_precision(result, best_result):
-                        best_result = result
+        if deadline_expired() and not all(step["cached"] for step in group):
+            deadline_hit = True
+            continue
+        if len(group) > 1:
+            outcomes = fan_out_steps(group, row, budget, target_precision, fan_out_width, accept)
+        else:
+            outcomes = [(group[0], execute_retry_step(group[0], row, budget))]
+        for step, result in outcomes:
+            if result and result.get("status") == DEADLINE_STATUS:
+                deadline_hit = True
+            elif is_transient(result):
+                transient_results.append(result)
+            if result and result["status"] == "OK":
+                if accept is not None and not accept(result):
+                    continue
+                result["address_variant"] = step["variant"]
+                if not best_result or is_better_precision(result, best_result):
+                    best_result = result
     
     # ========== RETOURNER LE MEILLEUR RÉSULTAT ==========
     
+    usage = budget.summary()
+    deadline_hit = deadline_hit or deadline_expired()
     if best_result:
         best_result["row_index"] = index
-        best_result["improved"] = (
-            current_status != "OK" or 
-            is_better_precision(best_result, {"precision_level": current_precision})
-        )
+        best_result["deadline_exceeded"] = deadline_hit
+        best_result["retry_calls"] = usage["calls"]
+        best_result["retry_cost"] = usage["cost"]
+        best_result["retry_calls_skipped"] = usage["skipped"]
+        best_result["improved"] = is_improvement(best_result, row)
         return best_result
+    elif suspect:
+        # Aucun autre emplacement plausible : l'ancien résultat est conservé
+        return {
+            **{col: _previous(row, col) for col in PREVIOUS_COLUMNS},
+            "row_index": index,
+            "error_message": "Aucun autre emplacement plausible trouvé en relance",
+            "improved": False,
+            "deadline_exceeded": deadline_hit,
+            "retry_calls": usage["calls"],
+            "retry_cost": usage["cost"],
+            "retry_calls_skipped": usage["skipped"],
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
     else:
         return {
             "row_index": index,
-            "status": "ERROR",
-            "error_message": "Aucune API n'a retourné de résultat après relance complète",
+            "status": DEADLINE_STATUS if deadline_hit else "ERROR",
+            "error_message": (
+                "Échéance de la ligne dépassée avant tout résultat" if deadline_hit
+                else "Aucune API n'a retourné de résultat après relance complète"
+            ),
             "api_used": "none",
             "latitude": None,
             "longitude": None,
             "formatted_address": None,
             "precision_level": None,
             "improved": False,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "retry_calls": usage["calls"],
+            "retry_cost": usage["cost"],
+            "retry_calls_skipped": usage["skipped"],
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "deadline_exceeded": deadline_hit,
+            # Échec temporaire d'un fournisseur : la ligne peut être replanifiée
+            # (sauf si son échéance est déjà consommée)
+            **({
+                "transient": True,
+                "retry_after": max((r.get("retry_after") or 0 for r in transient_results), default=0) or None,
+            } if transient_results and not deadline_hit else {}),
         }
 
 
 # ========== FONCTION PARALLÈLE DE RELANCE ==========
 
-def retry_geocode_parallel(df, max_workers=10, progress_callback=None, target_precision="ROOFTOP"):
+def retry_geocode_parallel(df, max_workers=10, progress_callback=None, target_precision="ROOFTOP",
+                           max_calls_per_job=RETRY_MAX_CALLS_PER_JOB, max_cost_per_job=RETRY_MAX_COST_PER_JOB,
+                           fan_out=RETRY_FAN_OUT, job_id=None):
     """
     Relance le géocodage en parallèle avec stratégie intelligente.
     
@@ -270,42 +554,51 @@ def retry_geocode_parallel(df, max_workers=10, progress_callback=None, target_pr
         max_workers: Nombre de threads parallèles
         progress_callback: Callback pour mise à jour de la progression
         target_precision: Niveau de précision cible
+        max_calls_per_job: Plafond d'appels API pour tout le job (0 = illimité)
+        max_cost_per_job: Plafond de coût pour tout le job (0 = illimité)
+        fan_out: Interroger en parallèle les variantes d'une même API
+        job_id: Identifiant du job dans l'ordonnanceur partagé
     
     Returns:
-        pd.DataFrame: Résultats de la relance
+        pd.DataFrame: Résultats de la relance ; le rapport de budget (appels,
+                      coût, appels évités) est dans `result_df.attrs["retry_report"]`
     """
     results = []
+    job_budget = CallBudget(max_calls_per_job, max_cost_per_job)
     
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {
-            executor.submit(
-                intelligent_retry_geocode,
-                row,
-                row.name,
-                target_precision
-            ): index for index, row in df.iterrows()
-        }
+    backoff_report = {}
+    with job_executor(job_id, len(df), max_workers) as executor:
+        # Les lignes en échec temporaire sont replanifiées (file différée) :
+        # elles ne comptent dans la progression qu'une fois terminées
+        tasks = (
+            (index, (row, row.name, target_precision, job_budget, fan_out))
+            for index, row in df.iterrows()
+        )
+        QUEUE_DEPTH.inc(len(df), queue="retry")
         
-        for future in as_completed(futures):
+        for index, future, attempts in run_with_backoff(executor, partial(run_row, intelligent_retry_geocode), tasks,
+                                                        report=backoff_report):
             try:
                 geocode_result = future.result()
                 index = geocode_result["row_index"]
                 original_row = df.loc[index].to_dict()
                 
                 # Merger les résultats (en gardant les anciennes colonnes si besoin)
-                merged = {**original_row, **geocode_result}
+                merged = {**original_row, **geocode_result, "attempts": attempts}
                 results.append(merged)
                 
             except Exception as e:
-                index = futures[future]
                 original_row = df.loc[index].to_dict()
-                results.append({
-                    **original_row,
+                geocode_result = {
                     "status": "ERROR",
                     "error_message": str(e),
                     "row_index": index,
                     "improved": False
-                })
+                }
+                results.append({**original_row, **geocode_result, "attempts": attempts})
+            
+            QUEUE_DEPTH.dec(queue="retry")
+            observe_row_result(geocode_result)
             
             if progress_callback:
                 progress_callback()
@@ -314,12 +607,24 @@ def retry_geocode_parallel(df, max_workers=10, progress_callback=None, target_pr
     
     # Réorganiser les colonnes pour mettre les nouvelles colonnes importantes en avant
     important_cols = ["row_index", "status", "improved", "precision_level", "api_used", 
-                      "latitude", "longitude", "formatted_address", "address_variant"]
+                      "latitude", "longitude", "formatted_address", "address_variant",
+                      "retry_calls", "retry_calls_skipped"]
     
     existing_important = [col for col in important_cols if col in result_df.columns]
     other_cols = [col for col in result_df.columns if col not in existing_important]
     
     result_df = result_df[existing_important + other_cols]
+    result_df.attrs["retry_report"] = {
+        **job_budget.summary(),
+        "target_precision": target_precision,
+        "rows": len(result_df),
+        "target_reached": int(sum(reaches_target(r, target_precision) for r in results)),
+        "deadline_rows": int(sum(bool(r.get("deadline_exceeded")) for r in results)),
+        "row_seconds": latency_summary([r.get("row_seconds") for r in results]),
+        **backoff_report,
+    }
+    if ROUTING_ENABLED:
+        update_routing_model()
     
     return result_df
 
@@ -327,7 +632,8 @@ def retry_geocode_parallel(df, max_workers=10, progress_callback=None, target_pr
 # ========== FONCTION SIMPLIFIÉE POUR COMPATIBILITÉ ==========
 
 def retry_geocode_row(df, address_column="full_address", max_workers=10, 
-                      progress_callback=None, api_mode="multi"):
+                      progress_callback=None, api_mode="multi", target_precision="ROOFTOP",
+                      fan_out=RETRY_FAN_OUT, job_id=None):
     """
     Fonction de relance compatible avec l'interface existante.
     
@@ -337,6 +643,9 @@ def retry_geocode_row(df, address_column="full_address", max_workers=10,
         max_workers: Nombre de workers parallèles
         progress_callback: Callback de progression
         api_mode: Mode de l'API (ignoré, utilise toujours la stratégie intelligente)
+        target_precision: Niveau de précision à partir duquel une ligne s'arrête
+        fan_out: Interroger en parallèle les variantes d'une même API
+        job_id: Identifiant du job dans l'ordonnanceur partagé
     
     Returns:
         pd.DataFrame: Résultats enrichis
@@ -345,5 +654,7 @@ def retry_geocode_row(df, address_column="full_address", max_workers=10,
         df, 
         max_workers=max_workers, 
         progress_callback=progress_callback,
-        target_precision="ROOFTOP"
+        target_precision=target_precision,
+        fan_out=fan_out,
+        job_id=job_id
     )
\ No newline at end of file
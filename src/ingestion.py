@@ -1,5 +1,12 @@
 import pandas as pd
 import csv
+import codecs
+import chardet
+
+DEFAULT_CHUNK_SIZE = 50_000
+ENCODING_SAMPLE_SIZE = 64 * 1024
+FULL_ADDRESS_FIELDS = ['street', 'postal_code', 'city', 'governorate', 'country', 'complement']
+
 
 def detect_separator(file, max_lines=5):
     sample = file.read(2048).decode('utf-8', errors='ignore')
@@ -11,14 +18,219 @@ def detect_separator(file, max_lines=5):
     except csv.Error:
         return ","  # fallback
 
-def read_file(uploaded_file, sep=None):
+
+def _is_utf8(sample, is_head):
+    """Vérifie qu'un échantillon est du UTF-8 valide (tolère les caractères coupés aux bords)."""
+    if not is_head:
+        # Ignorer les octets de continuation d'un caractère commencé avant l'échantillon
+        trim = 0
+        while trim < 3 and trim < len(sample) and 0x80 <= sample[trim] <= 0xBF:
+            trim += 1
+        sample = sample[trim:]
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(file, sample_size=ENCODING_SAMPLE_SIZE):
+    """
+    Détecte l'encodage à partir d'échantillons (début, milieu et fin du fichier).
+
+    Évite de relire tout le fichier en ISO-8859-1 quand le décodage UTF-8
+    échoue en cours de lecture.
+
+    Args:
+        file: Fichier binaire positionnable (UploadedFile, BytesIO, open(..., "rb"))
+        sample_size: Taille de chaque échantillon en octets
+
+    Returns:
+        str: Nom de l'encodage à passer à pandas / pyarrow
+    """
+    file.seek(0, 2)
+    size = file.tell()
+    offsets = [0]
+    if size > sample_size:
+        offsets += [size // 2, max(size - sample_size, 0)]
+
+    samples = []
+    for offset in offsets:
+        file.seek(offset)
+        samples.append((offset == 0, file.read(sample_size)))
+    file.seek(0)
+
+    head = samples[0][1]
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+
+    if all(_is_utf8(sample, is_head) for is_head, sample in samples):
+        return "utf-8"
+
+    guess = chardet.detect(b"".join(sample for _, sample in samples))
+    encoding = guess.get("encoding")
+    if not encoding or encoding.lower() in ("ascii", "utf-8") or (guess.get("confidence") or 0) < 0.5:
+        return "ISO-8859-1"
+    return encoding
+
+
+def read_header(file, sep=None, encoding=None):
+    """Retourne la liste des colonnes du fichier sans lire les données."""
+    if sep is None:
+        sep = detect_separator(file)
+    if encoding is None:
+        encoding = detect_encoding(file)
+    columns = pd.read_csv(file, sep=sep, encoding=encoding, nrows=0).columns.tolist()
+    file.seek(0)
+    return columns
+
+
+def read_file(uploaded_file, sep=None, usecols=None, engine=None):
     if sep is None:
         sep = detect_separator(uploaded_file)
-    
+    encoding = detect_encoding(uploaded_file)
+
     try:
-        df = pd.read_csv(uploaded_file, sep=sep, encoding="utf-8")
+        df = pd.read_csv(uploaded_file, sep=sep, encoding=encoding, usecols=usecols, engine=engine)
     except Exception:
+        # Échantillonnage trompeur : dernier recours
         uploaded_file.seek(0)
-        df = pd.read_csv(uploaded_file, sep=sep, encoding="ISO-8859-1")
+        df = pd.read_csv(uploaded_file, sep=sep, encoding="ISO-8859-1", usecols=usecols, engine=engine)
 
     return df
+
+
+def _iter_pandas_chunks(file, sep, encoding, usecols, chunksize):
+    reader = pd.read_csv(
+        file,
+        sep=sep,
+        encoding=encoding,
+        encoding_errors="replace",
+        usecols=usecols,
+        dtype=str,
+        chunksize=chunksize,
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def _iter_pyarrow_chunks(file, sep, encoding, usecols, chunksize):
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError as e:
+        raise ImportError("Le moteur 'pyarrow' nécessite le paquet pyarrow (pip install pyarrow).") from e
+
+    columns = usecols or read_header(file, sep=sep, encoding=encoding)
+    reader = pa_csv.open_csv(
+        file,
+        read_options=pa_csv.ReadOptions(encoding=encoding, block_size=4 * 1024 * 1024),
+        parse_options=pa_csv.ParseOptions(delimiter=sep),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(columns),
+            column_types={col: pa.string() for col in columns},
+        ),
+    )
+
+    start = 0
+    pending = []
+    pending_rows = 0
+
+    def to_frame(table):
+        df = table.to_pandas()
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
+
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield to_frame(table.slice(0, chunksize))
+            start += chunksize
+            rest = table.slice(chunksize)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+
+    if pending_rows:
+        yield to_frame(pa.Table.from_batches(pending))
+
+
+def iter_file_chunks(uploaded_file, sep=None, usecols=None, chunksize=DEFAULT_CHUNK_SIZE,
+                     engine="pandas", encoding=None):
+    """
+    Lit un fichier CSV/TXT en flux, par blocs de taille fixe.
+
+    L'encodage est détecté une seule fois sur un échantillon, seules les
+    colonnes demandées sont lues (en texte), et l'index est continu d'un bloc
+    à l'autre pour que `row_index` reste valable sur tout le fichier.
+
+    Args:
+        uploaded_file: Fichier binaire positionnable
+        sep: Séparateur (détecté si None)
+        usecols: Colonnes à lire (ex: colonnes mappées), toutes si None
+        chunksize: Nombre de lignes par bloc
+        engine: "pandas" ou "pyarrow" (optionnel)
+        encoding: Encodage (détecté si None)
+
+    Yields:
+        pd.DataFrame: Blocs de `chunksize` lignes (le dernier peut être plus court)
+    """
+    if sep is None:
+        sep = detect_separator(uploaded_file)
+    if encoding is None:
+        encoding = detect_encoding(uploaded_file)
+    if usecols is not None:
+        usecols = list(dict.fromkeys(usecols))
+
+    if engine == "pyarrow":
+        yield from _iter_pyarrow_chunks(uploaded_file, sep, encoding, usecols, chunksize)
+    elif engine == "pandas":
+        yield from _iter_pandas_chunks(uploaded_file, sep, encoding, usecols, chunksize)
+    else:
+        raise ValueError(f"Moteur de lecture non supporté : {engine}")
+
+
+def read_file_chunked(uploaded_file, transform=None, sep=None, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Charge le fichier entier en le consommant par blocs (`iter_file_chunks`).
+
+    `transform` (ex: `optimize_input_dtypes`) est appliqué à chaque bloc dès
+    sa lecture : seul le bloc brut courant coexiste avec les blocs déjà
+    transformés, au lieu de la table brute complète plus sa copie.
+
+    Args:
+        uploaded_file: Fichier binaire positionnable
+        transform: Fonction appliquée à chaque bloc (aucune si None)
+        sep: Séparateur (détecté si None)
+        chunksize: Nombre de lignes par bloc
+
+    Returns:
+        tuple: (DataFrame complet, octets occupés par les blocs bruts)
+    """
+    frames, raw_bytes = [], 0
+    for chunk in iter_file_chunks(uploaded_file, sep=sep, chunksize=chunksize):
+        raw_bytes += int(chunk.memory_usage(deep=True, index=False).sum())
+        frames.append(transform(chunk) if transform is not None else chunk)
+    if not frames:
+        return pd.DataFrame(), 0
+    return pd.concat(frames), raw_bytes
+
+
+def build_full_address(df, mapped_fields):
+    """Construit la colonne 'full_address' à partir des colonnes mappées."""
+    full_address_parts = []
+    if "name" in mapped_fields:
+        full_address_parts.append(df[mapped_fields["name"]].astype(str))
+    for key in FULL_ADDRESS_FIELDS:
+        if key in mapped_fields:
+            full_address_parts.append(df[mapped_fields[key]].astype(str))
+
+    if not full_address_parts:
+        return None
+
+    full_address = full_address_parts[0]
+    for part in full_address_parts[1:]:
+        full_address = full_address + ", " + part
+    return full_address
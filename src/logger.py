@@ -1,10 +1,13 @@
 import json
 import os
 from datetime import datetime
+from src.metrics import observe_api_call
 
 LOG_FILE = "logs/geocoding_logs.json"
 
 def log_api_call(api_name, url, status, duration, response=None, error=None):
+    observe_api_call(api_name, status, duration)
+
     os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
 
     log_entry = {
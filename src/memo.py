@@ -0,0 +1,74 @@
+"""
+Cache mémoire des appels d'API.
+
+Équivalent de `functools.lru_cache(maxsize=None)` (mêmes `cache_info` et
+`cache_clear`), avec en plus `cache_contains(*args)` : savoir si un appel
+serait servi par le cache sans l'exécuter, pour planifier les appels
+gratuits en premier.
+"""
+import threading
+from collections import namedtuple
+from functools import wraps
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+_KWARGS_MARK = object()
+
+
+def _make_key(args, kwargs):
+    if not kwargs:
+        return args
+    return args + (_KWARGS_MARK,) + tuple(sorted(kwargs.items()))
+
+
+def _copy(result):
+    return dict(result) if isinstance(result, dict) else result
+
+
+def memoize(func):
+    """
+    Décorateur de cache sans limite de taille, sûr entre threads.
+
+    Comme lru_cache, deux threads peuvent calculer la même clé en même temps ;
+    le dernier résultat écrit est conservé. Les résultats dict sont rendus en
+    copie : l'appelant peut les annoter (row_index…) sans modifier le cache.
+    Les résultats marqués `transient` ne sont pas mis en cache.
+    """
+    cache = {}
+    stats = {"hits": 0, "misses": 0}
+    lock = threading.Lock()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = _make_key(args, kwargs)
+        with lock:
+            if key in cache:
+                stats["hits"] += 1
+                return _copy(cache[key])
+            stats["misses"] += 1
+        result = func(*args, **kwargs)
+        # Échec temporaire (quota, timeout) : ne pas figer la réponse
+        if not (isinstance(result, dict) and result.get("transient")):
+            with lock:
+                cache[key] = result
+        return _copy(result)
+
+    def cache_contains(*args, **kwargs):
+        try:
+            return _make_key(args, kwargs) in cache
+        except TypeError:
+            return False
+
+    def cache_info():
+        with lock:
+            return CacheInfo(stats["hits"], stats["misses"], None, len(cache))
+
+    def cache_clear():
+        with lock:
+            cache.clear()
+            stats["hits"] = stats["misses"] = 0
+
+    wrapper.cache_contains = cache_contains
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    return wrapper
@@ -0,0 +1,338 @@
+"""
+Registre de métriques au format d'exposition texte Prometheus.
+
+Les compteurs, jauges et histogrammes sont mis à jour par les clients
+`src/apis/*` (via `log_api_call`) et par le moteur de géocodage. Le registre
+peut être servi sur un port local (`start_metrics_server`) ou écrit dans un
+fichier pour le textfile collector de node-exporter (`write_textfile`).
+"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.config import METRICS_PORT, METRICS_TEXTFILE
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Normalisation des statuts journalisés par les différents clients
+STATUS_ALIASES = {
+    "success": "OK",
+    "no_results": "ZERO_RESULTS",
+    "error": "ERROR",
+    "timeout": "TIMEOUT",
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels.items()]
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base commune : nom, aide, étiquettes et verrou."""
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Étiquettes attendues pour {self.name}: {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key):
+        return dict(zip(self.labelnames, key))
+
+    def get(self, **labels):
+        """Valeur courante (utile pour les tests)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self._labels(k), v) for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["buckets"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def get(self, **labels):
+        """Nombre d'observations pour ces étiquettes."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state["count"] if state else 0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, state in self._values.items():
+                labels = self._labels(key)
+                for bound, count in zip(self.buckets, state["buckets"]):
+                    out.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, count))
+                out.append((f"{self.name}_sum", labels, state["sum"]))
+                out.append((f"{self.name}_count", labels, state["count"]))
+        return out
+
+
+class MetricsRegistry:
+    """Ensemble de métriques et de collecteurs rendus au format texte."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """
+        Enregistre une fonction appelée à chaque rendu.
+
+        Elle doit retourner une liste de tuples
+        (nom, type, aide, [(étiquettes, valeur), ...]).
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self):
+        """Retourne l'ensemble des métriques au format d'exposition texte."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector in collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# ========== MÉTRIQUES DU MOTEUR ==========
+
+API_CALLS = REGISTRY.counter(
+    "geocoder_api_calls_total",
+    "Nombre d'appels aux APIs de géocodage par API et statut.",
+    ["api", "status"],
+)
+API_LATENCY = REGISTRY.histogram(
+    "geocoder_api_call_duration_seconds",
+    "Durée des appels aux APIs de géocodage.",
+    ["api"],
+)
+ROWS_PROCESSED = REGISTRY.counter(
+    "geocoder_rows_total",
+    "Nombre de lignes géocodées par API retenue, statut et précision.",
+    ["api", "status", "precision"],
+)
+RATE_LIMIT_WAIT = REGISTRY.histogram(
+    "geocoder_rate_limiter_wait_seconds",
+    "Temps passé à attendre le limiteur de débit avant un appel.",
+    ["api"],
+    buckets=(0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "geocoder_queue_depth",
+    "Nombre de lignes soumises et non encore terminées.",
+    ["queue"],
+)
+PROVIDER_TIMEOUT = REGISTRY.gauge(
+    "geocoder_provider_timeout_seconds",
+    "Timeout adaptatif courant des requêtes par API.",
+    ["api"],
+)
+SCHEDULER_WAIT = REGISTRY.histogram(
+    "geocoder_scheduler_wait_seconds",
+    "Temps passé par une ligne dans la file de l'ordonnanceur partagé.",
+    ["lane"],
+    buckets=(0.01, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0, 600.0),
+)
+CASSETTE_REQUESTS = REGISTRY.counter(
+    "geocoder_cassette_requests_total",
+    "Requêtes enregistrées ou rejouées par la cassette HTTP (mode, hit/miss/recorded).",
+    ["mode", "outcome"],
+)
+
+
+def observe_api_call(api_name, status, duration):
+    """Met à jour les compteurs et la latence d'un appel API."""
+    status = STATUS_ALIASES.get(str(status).lower(), status)
+    API_CALLS.inc(api=api_name, status=status)
+    if duration is not None:
+        API_LATENCY.observe(duration, api=api_name)
+
+
+def observe_row_result(result):
+    """Comptabilise le résultat final d'une ligne géocodée."""
+    ROWS_PROCESSED.inc(
+        api=result.get("api_used") or "none",
+        status=result.get("status") or "UNKNOWN",
+        precision=result.get("precision_level") or "NONE",
+    )
+
+
+# ========== EXPOSITION ==========
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, addr="127.0.0.1", registry=REGISTRY):
+    """
+    Démarre (une seule fois par processus) le serveur HTTP des métriques.
+
+    Streamlit ré-exécute les scripts à chaque interaction : les appels
+    suivants retournent le serveur déjà lancé. Si le port est déjà pris
+    (autre worker Streamlit, autre instance), l'échec est signalé une seule
+    fois et l'application continue sans endpoint.
+
+    Returns:
+        ThreadingHTTPServer | None: Serveur lancé, None si le port est indisponible
+    """
+    global _server, _server_failed
+    with _server_lock:
+        if _server is not None or _server_failed:
+            return _server
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        try:
+            _server = ThreadingHTTPServer((addr, int(port)), handler)
+        except OSError as e:
+            _server_failed = True
+            print(f"⚠️ Endpoint /metrics non démarré sur {addr}:{port} : {e}")
+            return None
+        thread = threading.Thread(target=_server.serve_forever, daemon=True)
+        thread.start()
+        return _server
+
+
+def stop_metrics_server():
+    """Arrête le serveur des métriques s'il est lancé."""
+    global _server, _server_failed
+    with _server_lock:
+        _server_failed = False
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
+
+
+def write_textfile(path=METRICS_TEXTFILE, registry=REGISTRY):
+    """Écrit les métriques de façon atomique (textfile collector de node-exporter)."""
+    if not path:
+        return None
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,207 @@
+"""
+Contrôles de plausibilité vectorisés sur un DataFrame enrichi.
+
+Trois contrôles, combinés en un score de suspicion entre 0 et 1 :
+- coordonnées hors de l'emprise de la Tunisie
+- distance au centroïde du code postal ou de la ville déclarés
+  (centroïdes appris, sinon gazetteer)
+- gouvernorat déclaré différent du gouvernorat le plus proche du point
+"""
+import numpy as np
+import pandas as pd
+
+from src.centroids import find_centroid
+from src.gazetteer import governorate_centroids, lookup, normalize_name, normalize_postal_code
+from src.geo import haversine_km
+
+# lat_min, lat_max, lon_min, lon_max
+TUNISIA_BBOX = (30.2, 37.6, 7.5, 11.7)
+
+# Distance au centroïde de référence : 0 en dessous, poids maximal au-delà
+DISTANCE_OK_KM = 10.0
+DISTANCE_MAX_KM = 60.0
+# Tolérance autour du centre du gouvernorat déclaré (points proches d'une limite)
+GOVERNORATE_TOLERANCE_KM = 35.0
+
+# Poids de chaque contrôle dans le score (combinaison « ou » probabiliste)
+WEIGHTS = {
+    "missing_coordinates": 1.0,
+    "outside_tunisia": 1.0,
+    "far_from_reference": 0.8,
+    "governorate_mismatch": 0.5,
+}
+
+SUSPICION_COLUMNS = [
+    "outside_tunisia", "reference_distance_km", "governorate_mismatch",
+    "suspicion_score", "suspicion_reasons",
+]
+
+
+def _map_unique(series, func):
+    """Applique `func` une fois par valeur distincte de la série."""
+    values = series.drop_duplicates()
+    return series.map(pd.Series(values.map(func).to_numpy(), index=values.to_numpy()))
+
+
+def _reference_points(df):
+    """Centroïde de référence par ligne : code postal puis ville (valeurs uniques résolues une fois)."""
+    fields = [f for f in ("postal_code", "city", "governorate") if f in df.columns]
+    if not fields or not {"postal_code", "city"} & set(fields):
+        return np.full(len(df), np.nan), np.full(len(df), np.nan)
+
+    # Clés normalisées (une fois par valeur distincte) : « Tunis » et « TUNIS »
+    # ne donnent lieu qu'à une seule recherche
+    keys = pd.DataFrame({
+        field: _map_unique(df[field], normalize_postal_code if field == "postal_code" else normalize_name)
+        for field in fields
+    })
+    combined = keys[fields[0]]
+    for field in fields[1:]:
+        combined = combined + "\x1f" + keys[field]
+    codes, uniques = pd.factorize(combined)
+    first = np.unique(codes, return_index=True)[1]
+
+    ref_lat = np.full(len(uniques), np.nan)
+    ref_lon = np.full(len(uniques), np.nan)
+    for i, record in enumerate(keys.iloc[first].to_dict("records")):
+        point = find_centroid(record)
+        if point is not None and point["level"] == "governorate":
+            point = None
+        if point is None:
+            point = lookup(record.get("postal_code"), record.get("city"), record.get("governorate"))
+            if point is not None and point["match"] == "governorate":
+                point = None
+        if point is not None:
+            ref_lat[i], ref_lon[i] = point["latitude"], point["longitude"]
+    return ref_lat[codes], ref_lon[codes]
+
+
+def _nearest_governorate(lat, lon, chunk_size=200_000):
+    """Nom normalisé du gouvernorat dont le centre est le plus proche de chaque point."""
+    governorates = governorate_centroids()
+    names = np.full(len(lat), "", dtype=object)
+    if governorates.empty:
+        return names
+    g_lat = governorates["latitude"].to_numpy()[None, :]
+    g_lon = governorates["longitude"].to_numpy()[None, :]
+    g_names = governorates["governorate"].to_numpy(dtype=object)
+    valid = np.flatnonzero(~np.isnan(lat) & ~np.isnan(lon))
+    for start in range(0, len(valid), chunk_size):
+        rows = valid[start:start + chunk_size]
+        distances = haversine_km(lat[rows, None], lon[rows, None], g_lat, g_lon)
+        names[rows] = g_names[np.argmin(distances, axis=1)]
+    return names
+
+
+def _coordinate(df, column):
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def compute_suspicion_scores(df):
+    """
+    Calcule les contrôles de plausibilité et le score de suspicion de chaque ligne.
+
+    Les lignes en échec (status différent de OK) ne sont pas notées : elles
+    sont déjà sélectionnées par leur statut.
+
+    Args:
+        df: DataFrame enrichi (latitude, longitude, status et champs mappés)
+
+    Returns:
+        pd.DataFrame: Même index que df, colonnes SUSPICION_COLUMNS
+    """
+    lat, lon = _coordinate(df, "latitude"), _coordinate(df, "longitude")
+    ok = (df["status"] == "OK").to_numpy(dtype=bool) if "status" in df.columns else np.ones(len(df), dtype=bool)
+
+    has_coords = ~np.isnan(lat) & ~np.isnan(lon)
+    lat_min, lat_max, lon_min, lon_max = TUNISIA_BBOX
+    outside = has_coords & ~((lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max))
+
+    ref_lat, ref_lon = _reference_points(df)
+    with np.errstate(invalid="ignore"):
+        distance = np.asarray(haversine_km(lat, lon, ref_lat, ref_lon), dtype="float64").reshape(len(df))
+    far = np.clip((np.nan_to_num(distance, nan=0.0) - DISTANCE_OK_KM) / (DISTANCE_MAX_KM - DISTANCE_OK_KM), 0, 1)
+
+    mismatch = np.zeros(len(df), dtype=bool)
+    if "governorate" in df.columns:
+        declared = _map_unique(df["governorate"], normalize_name)
+        centers = governorate_centroids().drop_duplicates("governorate").set_index("governorate")
+        declared_lat = declared.map(centers["latitude"]).to_numpy(dtype="float64", na_value=np.nan)
+        declared_lon = declared.map(centers["longitude"]).to_numpy(dtype="float64", na_value=np.nan)
+        known = ~np.isnan(declared_lat) & has_coords
+        if known.any():
+            nearest = _nearest_governorate(lat, lon)
+            with np.errstate(invalid="ignore"):
+                to_declared = np.asarray(haversine_km(lat, lon, declared_lat, declared_lon)).reshape(len(df))
+            mismatch = known & (nearest != declared.to_numpy(dtype=object)) & (to_declared > GOVERNORATE_TOLERANCE_KM)
+
+    components = {
+        "missing_coordinates": (ok & ~has_coords).astype(float),
+        "outside_tunisia": outside.astype(float),
+        "far_from_reference": far,
+        "governorate_mismatch": mismatch.astype(float),
+    }
+    not_suspect = np.ones(len(df))
+    for name, value in components.items():
+        not_suspect *= 1 - WEIGHTS[name] * value
+    score = np.where(ok, 1 - not_suspect, np.nan)
+
+    labels = {
+        "missing_coordinates": "sans coordonnées",
+        "outside_tunisia": "hors Tunisie",
+        "far_from_reference": "loin du code postal / de la ville",
+        "governorate_mismatch": "gouvernorat incohérent",
+    }
+    reasons = np.full(len(df), "", dtype=object)
+    for name, label in labels.items():
+        flagged = ok & (components[name] > 0)
+        reasons[flagged] = np.where(reasons[flagged] == "", label, reasons[flagged] + ", " + label)
+
+    return pd.DataFrame({
+        "outside_tunisia": outside,
+        "reference_distance_km": np.round(distance, 2),
+        "governorate_mismatch": mismatch,
+        "suspicion_score": np.round(score, 3),
+        "suspicion_reasons": reasons,
+    }, index=df.index)
+
+
+def select_suspect_rows(df, threshold, scores=None):
+    """
+    Lignes OK dont le score de suspicion atteint le seuil.
+
+    Args:
+        df: Résultats enrichis
+        threshold: Score minimal (0 à 1)
+        scores: Scores déjà calculés par `compute_suspicion_scores` (recalculés si None)
+
+    Returns:
+        pd.DataFrame: Sous-ensemble de df avec les colonnes de score (remplacées si présentes)
+    """
+    if scores is None:
+        scores = compute_suspicion_scores(df)
+    mask = scores["suspicion_score"].fillna(0) >= threshold
+    suspects = df.loc[mask].drop(columns=["suspicion_score", "suspicion_reasons"], errors="ignore")
+    return suspects.join(scores.loc[mask, ["suspicion_score", "suspicion_reasons"]])
+
+
+def score_candidate(row, result):
+    """
+    Contrôles de plausibilité d'un résultat candidat pour une ligne (relance).
+
+    Args:
+        row: Ligne d'origine (postal_code, city, governorate)
+        result: Résultat d'API (status, latitude, longitude)
+
+    Returns:
+        pd.Series: Colonnes SUSPICION_COLUMNS du candidat
+    """
+    frame = pd.DataFrame([{
+        **{field: row.get(field) for field in ("postal_code", "city", "governorate")},
+        "status": result.get("status"),
+        "latitude": result.get("latitude"),
+        "longitude": result.get("longitude"),
+    }])
+    return compute_suspicion_scores(frame).iloc[0]
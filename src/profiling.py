@@ -0,0 +1,250 @@
+"""
+Profilage d'un job de géocodage ou de relance.
+
+Pendant le job, un échantillonneur relève la pile de chaque thread toutes
+les `PROFILE_INTERVAL_MS` millisecondes : les lignes tournent sur les
+threads partagés de l'ordonnanceur, qu'un profil cProfile (limité au thread
+appelant) ne verrait pas. Les threads au repos (attente de file, serveur en
+écoute) sont ignorés ; un thread bloqué sur le réseau ou sur le limiteur de
+débit est compté. En parallèle, tracemalloc suit les allocations.
+
+Résultats sous `PROFILE_DIR/<job_id>/` :
+- `stacks.txt` : piles agrégées au format « collapsed » (flamegraph.pl, speedscope)
+- `tracemalloc.snapshot` : instantané relu par `tracemalloc.Snapshot.load`
+- `summary.json` : fonctions les plus coûteuses (temps cumulé et propre, en
+  secondes-thread) et principaux sites d'allocation, repris dans
+  l'historique des jobs
+
+Les échantillons couvrent tous les threads du processus : deux jobs profilés
+en même temps se voient l'un l'autre.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+import pandas as pd
+
+from src.config import (
+    JOB_PROFILING,
+    PROFILE_DIR,
+    PROFILE_INTERVAL_MS,
+    PROFILE_TOP_N,
+    PROFILE_TRACEMALLOC_FRAMES,
+)
+
+# Feuilles d'un thread au repos : attente sur une condition, une file ou un socket en écoute
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+# Cadres génériques (démarrage des threads, exécution du script Streamlit) exclus du temps cumulé
+GENERIC_FRAMES = ("threading.py:", "concurrent/futures/thread.py:", "streamlit/runtime/")
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def _short_path(path):
+    """Chemin relatif au projet, ou au dossier site-packages, ou nom du fichier."""
+    if path.startswith(os.getcwd() + os.sep):
+        return os.path.relpath(path)
+    if "site-packages" in path:
+        return path.split("site-packages" + os.sep, 1)[1]
+    return os.path.basename(path)
+
+
+def frame_label(code):
+    """Libellé d'une fonction : chemin:ligne(nom)."""
+    return f"{_short_path(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+
+class SamplingProfiler:
+    """
+    Échantillonneur de piles de tous les threads (hors lui-même).
+
+    Exemple :
+        profiler = SamplingProfiler(interval=0.005)
+        profiler.start()
+        ...
+        profiler.stop()
+        profiler.top_cumulative(10)
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks = Counter()
+        self.ticks = 0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="job-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self._start
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """Relève une fois la pile de chaque thread actif."""
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+        self.ticks += 1
+
+    @property
+    def seconds_per_sample(self):
+        return self.elapsed / self.ticks if self.ticks else self.interval
+
+    def _top(self, counts, top_n):
+        return [
+            {"function": function, "seconds": round(count * self.seconds_per_sample, 3),
+             "share": round(count / self.ticks, 3) if self.ticks else 0.0}
+            for function, count in counts.most_common(top_n)
+        ]
+
+    def top_cumulative(self, top_n=PROFILE_TOP_N):
+        """Fonctions présentes dans le plus d'échantillons (temps cumulé, en secondes-thread)."""
+        counts = Counter()
+        for stack, count in self.stacks.items():
+            for function in set(stack):
+                if not any(generic in function for generic in GENERIC_FRAMES):
+                    counts[function] += count
+        return self._top(counts, top_n)
+
+    def top_self(self, top_n=PROFILE_TOP_N):
+        """Fonctions en haut de pile (temps propre, en secondes-thread)."""
+        counts = Counter()
+        for stack, count in self.stacks.items():
+            counts[stack[-1]] += count
+        return self._top(counts, top_n)
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+def _start_tracemalloc(frames):
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            # Un suivi déjà lancé ailleurs (python -X tracemalloc) n'est pas arrêté à la fin
+            tracemalloc.start(frames)
+            _tracemalloc_owned = True
+        tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+    return snapshot, peak
+
+
+def top_allocations(snapshot, top_n=PROFILE_TOP_N):
+    """Principaux sites d'allocation encore vivants (fichier:ligne)."""
+    return [
+        {"site": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+         "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:top_n]
+    ]
+
+
+@contextmanager
+def profile_job(job_id, enabled=JOB_PROFILING, directory=PROFILE_DIR, top_n=PROFILE_TOP_N):
+    """
+    Profile le bloc (échantillonnage des piles et tracemalloc) et enregistre les résultats.
+
+    Args:
+        job_id: Identifiant du job (nom du dossier de résultats)
+        enabled: False pour exécuter le bloc sans profilage
+        directory: Dossier racine des profils
+        top_n: Nombre de fonctions et de sites d'allocation retenus
+
+    Yields:
+        dict | None: Résumé (rempli à la sortie du bloc), None si désactivé
+    """
+    if not enabled:
+        yield None
+        return
+
+    summary = {"job_id": job_id}
+    profiler = SamplingProfiler()
+    _start_tracemalloc(PROFILE_TRACEMALLOC_FRAMES)
+    profiler.start()
+    try:
+        yield summary
+    finally:
+        profiler.stop()
+        snapshot, peak = _stop_tracemalloc()
+
+        path = os.path.join(directory, job_id)
+        os.makedirs(path, exist_ok=True)
+        profiler.write_collapsed(os.path.join(path, "stacks.txt"))
+        snapshot.dump(os.path.join(path, "tracemalloc.snapshot"))
+
+        top_self = profiler.top_self(top_n)
+        summary.update({
+            "path": path,
+            "seconds": round(profiler.elapsed, 2),
+            "samples": profiler.ticks,
+            "interval_ms": round(profiler.interval * 1000, 1),
+            "hotspot": top_self[0]["function"] if top_self else None,
+            "top_cumulative": profiler.top_cumulative(top_n),
+            "top_self": top_self,
+            "top_allocations": top_allocations(snapshot, top_n),
+            "peak_memory_mb": round(peak / 1024 ** 2, 1),
+        })
+        with open(os.path.join(path, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+
+def summary_frames(summary):
+    """
+    Tableaux d'affichage d'un résumé de profil.
+
+    Returns:
+        tuple: (DataFrame des fonctions par temps cumulé, DataFrame des sites d'allocation)
+    """
+    functions = pd.DataFrame(summary.get("top_cumulative", []), columns=["function", "seconds", "share"])
+    functions = functions.rename(columns={"function": "Fonction", "seconds": "Cumulé (s·thread)",
+                                          "share": "Part des échantillons"})
+    allocations = pd.DataFrame(summary.get("top_allocations", []), columns=["site", "size_kb", "count"])
+    allocations = allocations.rename(columns={"site": "Site", "size_kb": "Taille (Ko)", "count": "Blocs"})
+    return functions, allocations
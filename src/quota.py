@@ -0,0 +1,252 @@
+"""
+Registre de quotas des APIs payantes, partagé entre jobs, sessions et processus.
+
+Chaque appel réel est compté dans une base SQLite par API, clé d'API
+(empreinte, jamais la clé elle-même), jour et mois. Les plafonds
+(`QUOTA_LIMITS`) ont deux seuils :
+- souple (`QUOTA_SOFT_RATIO` du plafond) : les étapes facultatives
+  (place_id Google) ne sont plus lancées
+- dur : l'appel est refusé (statut QUOTA_EXCEEDED) et la ligne se rabat sur
+  les sources locales
+
+Les appels rejoués depuis une cassette HTTP (`src/cassette.py`) ne sont pas
+comptés.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from src.cassette import replaying
+from src.config import (
+    GOOGLE_API_KEY,
+    HERE_API_KEY,
+    OSM_EMAIL,
+    QUOTA_DB,
+    QUOTA_ENABLED,
+    QUOTA_LIMITS,
+    QUOTA_SOFT_RATIO,
+)
+
+PERIODS = ("day", "month")
+QUOTA_OK, QUOTA_SOFT, QUOTA_HARD = "ok", "soft", "hard"
+QUOTA_STATUS = "QUOTA_EXCEEDED"
+# Durée de validité de l'état lu pour les décisions "souples"
+STATE_TTL_SECONDS = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_usage (
+    api TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    period TEXT NOT NULL,
+    period_start TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (api, key_id, period, period_start)
+)
+"""
+
+UPSERT = """
+INSERT INTO quota_usage (api, key_id, period, period_start, calls, updated_at)
+VALUES (?, ?, ?, ?, 1, ?)
+ON CONFLICT(api, key_id, period, period_start) DO UPDATE SET
+    calls = calls + 1,
+    updated_at = excluded.updated_at
+"""
+
+_API_KEYS = {
+    "here": HERE_API_KEY,
+    "google": GOOGLE_API_KEY,
+    "google_places": GOOGLE_API_KEY,
+    "osm": OSM_EMAIL,
+}
+
+_state_cache = {}
+_state_lock = threading.Lock()
+# Connexions SQLite ouvertes par le thread courant, par base
+_local = threading.local()
+
+
+def key_id(api_name):
+    """Empreinte courte de la clé d'API utilisée (les quotas sont par clé)."""
+    key = _API_KEYS.get(api_name)
+    if not key:
+        return "default"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def period_starts(now=None):
+    """Début des périodes courantes {"day": "2025-01-31", "month": "2025-01"}."""
+    now = now or datetime.now()
+    return {"day": now.strftime("%Y-%m-%d"), "month": now.strftime("%Y-%m")}
+
+
+def _connect(db_path):
+    """
+    Connexion du thread courant à la base, ouverte une seule fois.
+
+    Le mode WAL et le schéma sont posés à l'ouverture, pas à chaque appel.
+    Un processus issu d'un fork rouvre ses propres connexions.
+    """
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.connections = {}
+    conn = _local.connections.get(db_path)
+    if conn is None:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(SCHEMA)
+        _local.connections[db_path] = conn
+    return conn
+
+
+def _usage(conn, api_name, starts):
+    usage = {}
+    for period in PERIODS:
+        row = conn.execute(
+            "SELECT calls FROM quota_usage WHERE api = ? AND key_id = ? AND period = ? AND period_start = ?",
+            (api_name, key_id(api_name), period, starts[period]),
+        ).fetchone()
+        usage[period] = row[0] if row else 0
+    return usage
+
+
+def _state(usage, limits, soft_ratio):
+    state = QUOTA_OK
+    for period, limit in limits.items():
+        used = usage.get(period, 0)
+        if used >= limit:
+            return QUOTA_HARD
+        if used >= limit * soft_ratio:
+            state = QUOTA_SOFT
+    return state
+
+
+def reserve_call(api_name, db_path=QUOTA_DB, limits=None, now=None):
+    """
+    Compte un appel s'il tient sous le plafond dur (transaction atomique).
+
+    Returns:
+        bool: False si le plafond dur est atteint (l'appel ne doit pas partir)
+    """
+    if not QUOTA_ENABLED or replaying():
+        return True
+    limits = QUOTA_LIMITS.get(api_name, {}) if limits is None else limits
+    starts = period_starts(now)
+    stamp = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+    conn = _connect(db_path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        usage = _usage(conn, api_name, starts)
+        allowed = not any(usage[period] >= limit for period, limit in limits.items())
+        if allowed:
+            for period in PERIODS:
+                conn.execute(UPSERT, (api_name, key_id(api_name), period, starts[period], stamp))
+            usage = {period: used + 1 for period, used in usage.items()}
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    with _state_lock:
+        _state_cache[(db_path, api_name)] = (time.monotonic(), _state(usage, limits, QUOTA_SOFT_RATIO))
+    return allowed
+
+
+def quota_state(api_name, db_path=QUOTA_DB, limits=None):
+    """
+    État du quota de l'API : "ok", "soft" ou "hard".
+
+    Relu au plus toutes les STATE_TTL_SECONDS (et mis à jour à chaque appel).
+    """
+    if not QUOTA_ENABLED:
+        return QUOTA_OK
+    limits = QUOTA_LIMITS.get(api_name, {}) if limits is None else limits
+    if not limits:
+        return QUOTA_OK
+    with _state_lock:
+        cached = _state_cache.get((db_path, api_name))
+    if cached and time.monotonic() - cached[0] < STATE_TTL_SECONDS:
+        return cached[1]
+    state = QUOTA_OK
+    if os.path.exists(db_path):
+        state = _state(_usage(_connect(db_path), api_name, period_starts()), limits, QUOTA_SOFT_RATIO)
+    with _state_lock:
+        _state_cache[(db_path, api_name)] = (time.monotonic(), state)
+    return state
+
+
+def allow_call(api_name, optional=False):
+    """
+    Vrai si une étape peut appeler `api_name` d'après son quota.
+
+    Args:
+        api_name: API facturée
+        optional: Étape facultative (abandonnée dès le seuil souple)
+    """
+    state = quota_state(api_name)
+    if state == QUOTA_HARD:
+        return False
+    return not (optional and state == QUOTA_SOFT)
+
+
+def quota_exceeded_result(api_name):
+    """Résultat d'un appel refusé faute de quota."""
+    return {
+        "latitude": None,
+        "longitude": None,
+        "formatted_address": None,
+        "status": QUOTA_STATUS,
+        "error_message": f"Quota {api_name} atteint",
+        "api_used": api_name,
+        "precision_level": None,
+        "precision_level_raw": None,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # Temporaire : la réponse n'est pas mise en cache (le plafond peut être relevé)
+        "transient": True,
+        "retry_after": None,
+    }
+
+
+def quota_summary(db_path=QUOTA_DB):
+    """
+    Consommation et reste par API et période pour la clé courante.
+
+    Returns:
+        list[dict]: api, period, used, limit, remaining (None si pas de plafond), state
+    """
+    starts = period_starts()
+    apis = sorted(set(_API_KEYS) | set(QUOTA_LIMITS))
+    usage = {api: {period: 0 for period in PERIODS} for api in apis}
+    if os.path.exists(db_path):
+        conn = _connect(db_path)
+        usage = {api: _usage(conn, api, starts) for api in apis}
+    summary = []
+    for api in apis:
+        limits = QUOTA_LIMITS.get(api, {})
+        for period in PERIODS:
+            limit = limits.get(period)
+            used = usage[api][period]
+            summary.append({
+                "api": api,
+                "period": period,
+                "used": used,
+                "limit": limit,
+                "remaining": None if limit is None else max(limit - used, 0),
+                "state": _state({period: used}, {period: limit} if limit else {}, QUOTA_SOFT_RATIO),
+            })
+    return summary
+
+
+def format_remaining(db_path=QUOTA_DB):
+    """Reste des APIs plafonnées, ex. "here 850/1000 (jour) · google 40/500 (jour)"."""
+    labels = {"day": "jour", "month": "mois"}
+    parts = [
+        f"{item['api']} {item['remaining']:,}/{item['limit']:,} ({labels[item['period']]})"
+        for item in quota_summary(db_path) if item["limit"] is not None
+    ]
+    return " · ".join(parts) or "illimité"
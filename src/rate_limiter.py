@@ -0,0 +1,198 @@
+"""
+Limiteur de débit par API (seau à jetons).
+
+Chaque appel réseau prend un jeton avant de partir ; le seau se remplit à
+`rate` jetons par seconde, jusqu'à `burst` jetons. Le temps d'attente est
+exposé dans la métrique geocoder_rate_limiter_wait_seconds. Sous une
+échéance, l'appelant borne l'attente (`max_wait`) : si le jeton ne serait
+disponible qu'après l'échéance, il est rendu et l'appel ne part pas. En
+rejeu de cassette, aucune requête n'atteint le fournisseur : pas d'attente.
+
+Par défaut (`RATE_LIMIT_SHARED`), le seau est stocké dans une base SQLite
+commune à tous les processus de la machine (plusieurs workers Streamlit) :
+la politique d'1 req/s de Nominatim et les QPS Google sont respectés au
+total, pas seulement par processus.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from src.cassette import replaying
+from src.config import API_RATE_LIMITS, RATE_LIMIT_DB, RATE_LIMIT_SHARED
+from src.metrics import RATE_LIMIT_WAIT
+
+
+class TokenBucket:
+    """
+    Seau à jetons bloquant, sûr entre threads.
+
+    Exemple :
+        bucket = TokenBucket(rate=5, burst=5)
+        waited = bucket.acquire()
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Prend un jeton (le solde peut devenir négatif) et retourne l'attente nécessaire."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def _release(self):
+        """Rend un jeton réservé qui ne sera pas utilisé."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def acquire(self, max_wait=None):
+        """
+        Attend qu'un jeton soit disponible.
+
+        Args:
+            max_wait: Attente maximale acceptée (secondes) ; au-delà, le jeton est rendu sans attendre
+
+        Returns:
+            float | None: Secondes attendues, None si l'attente aurait dépassé `max_wait`
+        """
+        wait = self._reserve()
+        if max_wait is not None and wait > max_wait:
+            self._release()
+            return None
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Seau à jetons partagé entre processus (SQLite, transaction IMMEDIATE).
+
+    Un appel réserve son jeton de façon atomique puis dort hors transaction
+    le temps indiqué : les processus sont servis dans l'ordre de réservation,
+    sans attente active. L'horloge est `time.time()` (commune aux processus).
+
+    Exemple :
+        bucket = SharedTokenBucket("osm", rate=1, db_path="data/cache/rate_limits.sqlite")
+        bucket.acquire()
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS token_buckets (
+        api TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated REAL NOT NULL
+    )
+    """
+
+    def __init__(self, api_name, rate, burst=None, db_path=RATE_LIMIT_DB, clock=time.time, sleep=time.sleep):
+        super().__init__(rate, burst, clock=clock, sleep=sleep)
+        self.api_name = api_name
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Mode WAL et schéma posés une fois, à la création du seau
+        self._connect().execute(self.SCHEMA)
+
+    def _connect(self):
+        """Connexion du thread courant, ouverte une seule fois (rouverte après un fork)."""
+        if getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    def _transaction(self, work):
+        """Exécute `work(conn)` dans une transaction IMMEDIATE et retourne son résultat."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _reserve(self):
+        def take(conn):
+            now = self._clock()
+            row = conn.execute("SELECT tokens, updated FROM token_buckets WHERE api = ?", (self.api_name,)).fetchone()
+            tokens, updated = row if row else (self.burst, now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate) - 1
+            conn.execute(
+                "INSERT OR REPLACE INTO token_buckets (api, tokens, updated) VALUES (?, ?, ?)",
+                (self.api_name, tokens, now),
+            )
+            return tokens
+
+        tokens = self._transaction(take)
+        return 0.0 if tokens >= 0 else -tokens / self.rate
+
+    def _release(self):
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE token_buckets SET tokens = MIN(?, tokens + 1) WHERE api = ?",
+            (self.burst, self.api_name),
+        ))
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+# Attente cumulée du thread, déduite des latences mesurées autour des appels
+_local = threading.local()
+
+
+def thread_wait_total():
+    """Secondes passées par le thread courant à attendre le limiteur."""
+    return getattr(_local, "waited", 0.0)
+
+
+def get_rate_limiter(api_name):
+    """Seau partagé de l'API (None si aucune limite n'est configurée)."""
+    rate = API_RATE_LIMITS.get(api_name, 0)
+    if rate <= 0:
+        return None
+    with _buckets_lock:
+        bucket = _buckets.get(api_name)
+        if bucket is None:
+            if RATE_LIMIT_SHARED:
+                bucket = SharedTokenBucket(api_name, rate)
+            else:
+                bucket = TokenBucket(rate)
+            _buckets[api_name] = bucket
+        return bucket
+
+
+def acquire_rate_limit(api_name, max_wait=None):
+    """
+    Attend le droit d'appeler `api_name` et enregistre l'attente.
+
+    Args:
+        api_name: API appelée
+        max_wait: Attente maximale (temps restant avant l'échéance), None : sans limite
+
+    Returns:
+        float | None: Secondes attendues, None si le jeton n'arrivait pas à temps
+    """
+    bucket = get_rate_limiter(api_name)
+    if bucket is None or replaying():
+        return 0.0
+    waited = bucket.acquire(max_wait)
+    if waited is not None:
+        RATE_LIMIT_WAIT.observe(waited, api=api_name)
+        _local.waited = thread_wait_total() + waited
+    return waited
@@ -0,0 +1,280 @@
+"""
+Routage des fournisseurs par région et forme d'adresse.
+
+Chaque appel réel à HERE, Google ou OSM est enregistré (gouvernorat, ville,
+forme de l'adresse, ROOFTOP atteint ou non, latence). Les tentatives d'un
+job sont ajoutées à une base SQLite à la fin du job (`update_routing_model`).
+
+Pour une ligne, la probabilité d'obtenir ROOFTOP et la latence de chaque
+fournisseur sont estimées de la zone la plus large à la plus fine (lissage
+hiérarchique), puis les fournisseurs sont classés par coût attendu
+`(coût d'appel + poids × latence) / P(ROOFTOP)` : l'ordre qui minimise le coût
+moyen d'une chaîne de replis. Tant qu'un fournisseur n'a pas assez de
+tentatives, l'ordre déclaré est conservé.
+"""
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+from src.backoff import CONTROL_STATUSES
+from src.call_budget import call_cost
+from src.config import (
+    ROUTING_DB,
+    ROUTING_ENABLED,
+    ROUTING_LATENCY_COST,
+    ROUTING_MIN_ATTEMPTS,
+    ROUTING_PRIOR_WEIGHT,
+)
+from src.gazetteer import normalize_name
+from src.rate_limiter import thread_wait_total
+
+PROVIDERS = ("here", "google", "osm")
+# Niveaux de lissage, du plus large au plus fin
+ROUTING_LEVELS = ("all", "governorate", "city")
+PRIOR_ROOFTOP = 0.3
+PRIOR_LATENCY = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS provider_stats (
+    level TEXT NOT NULL,
+    key TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    api TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    rooftop INTEGER NOT NULL,
+    ok INTEGER NOT NULL,
+    latency_sum REAL NOT NULL,
+    latency_count INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (level, key, shape, api)
+)
+"""
+
+UPSERT = """
+INSERT INTO provider_stats (level, key, shape, api, attempts, rooftop, ok, latency_sum, latency_count, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(level, key, shape, api) DO UPDATE SET
+    attempts = attempts + excluded.attempts,
+    rooftop = rooftop + excluded.rooftop,
+    ok = ok + excluded.ok,
+    latency_sum = latency_sum + excluded.latency_sum,
+    latency_count = latency_count + excluded.latency_count,
+    updated_at = excluded.updated_at
+"""
+
+_pending = []
+_pending_lock = threading.Lock()
+
+
+def _has_value(row, field):
+    value = row.get(field)
+    return value is not None and not (not isinstance(value, str) and pd.isna(value)) and str(value).strip() != ""
+
+
+def address_shape(row):
+    """
+    Forme de l'adresse : présence d'un nom et type de rue.
+
+    Returns:
+        str: "street_number", "street" ou "area", préfixé par "name+" si un nom est fourni
+    """
+    if _has_value(row, "street"):
+        shape = "street_number" if re.search(r"\d", str(row.get("street"))) else "street"
+    else:
+        shape = "area"
+    return f"name+{shape}" if _has_value(row, "name") else shape
+
+
+def region_keys(row):
+    """Clés (niveau, clé) de la ligne, du plus large au plus fin."""
+    governorate = normalize_name(row.get("governorate")) if _has_value(row, "governorate") else ""
+    city = normalize_name(row.get("city")) if _has_value(row, "city") else ""
+    keys = [("all", "")]
+    if governorate:
+        keys.append(("governorate", governorate))
+    if city:
+        keys.append(("city", f"{governorate}|{city}"))
+    return keys
+
+
+def record_attempt(row, api, result, elapsed=None):
+    """Mémorise une tentative (ajoutée à la base par `update_routing_model`)."""
+    if result and result.get("status") in CONTROL_STATUSES:
+        # Quota ou échéance : aucune requête n'est partie, rien à apprendre du fournisseur
+        return
+    ok = bool(result) and result.get("status") == "OK"
+    rooftop = ok and result.get("precision_level") == "ROOFTOP"
+    with _pending_lock:
+        _pending.append((region_keys(row), address_shape(row), api, rooftop, ok, elapsed))
+
+
+def tracked_call(api, row, func, *args, **kwargs):
+    """
+    Appelle `func` et enregistre la tentative pour le modèle de routage.
+
+    Les réponses servies par le cache mémoire (`cache_contains`) ne sont pas
+    comptées : elles répètent une tentative déjà enregistrée. L'attente du
+    limiteur de débit est retirée de la durée : seule la latence du
+    fournisseur entre dans le modèle.
+    """
+    cache_contains = getattr(func, "cache_contains", None)
+    if not ROUTING_ENABLED or (cache_contains and cache_contains(*args, **kwargs)):
+        return func(*args, **kwargs)
+    waited = thread_wait_total()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start - (thread_wait_total() - waited)
+    record_attempt(row, api, result, max(0.0, elapsed))
+    return result
+
+
+def _connect(db_path):
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute(SCHEMA)
+    return conn
+
+
+def _write_attempts(attempts, db_path):
+    totals = defaultdict(lambda: [0, 0, 0, 0.0, 0])
+    for keys, shape, api, rooftop, ok, elapsed in attempts:
+        for level, key in keys:
+            stats = totals[(level, key, shape, api)]
+            stats[0] += 1
+            stats[1] += int(rooftop)
+            stats[2] += int(ok)
+            if elapsed is not None and not pd.isna(elapsed):
+                stats[3] += float(elapsed)
+                stats[4] += 1
+    if not totals:
+        return 0
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with _connect(db_path) as conn:
+        conn.executemany(UPSERT, [(*key, *stats, now) for key, stats in totals.items()])
+    conn.close()
+    return len(attempts)
+
+
+def update_routing_model(db_path=ROUTING_DB):
+    """
+    Ajoute à la base les tentatives enregistrées depuis le dernier appel.
+
+    Returns:
+        int: Nombre de tentatives ajoutées
+    """
+    with _pending_lock:
+        attempts = _pending[:]
+        _pending.clear()
+    return _write_attempts(attempts, db_path)
+
+
+def learn_from_results(enriched_df, db_path=ROUTING_DB):
+    """
+    Initialise le modèle depuis des résultats de jobs passés.
+
+    Seul le fournisseur retenu pour chaque ligne est connu : à utiliser pour
+    amorcer le modèle, pas en plus des tentatives enregistrées du même job.
+
+    Returns:
+        int: Nombre de tentatives ajoutées
+    """
+    if enriched_df is None or enriched_df.empty or "api_used" not in enriched_df.columns:
+        return 0
+    rows = enriched_df[enriched_df["api_used"].isin(PROVIDERS)]
+    latency = rows["response_time"] if "response_time" in rows.columns else pd.Series(None, index=rows.index)
+    attempts = [
+        (region_keys(row), address_shape(row), row["api_used"],
+         row.get("status") == "OK" and row.get("precision_level") == "ROOFTOP",
+         row.get("status") == "OK", pd.to_numeric(elapsed, errors="coerce"))
+        for (_, row), elapsed in zip(rows.iterrows(), latency)
+    ]
+    return _write_attempts(attempts, db_path)
+
+
+@lru_cache(maxsize=4)
+def _read_model(db_path, mtime_ns):
+    conn = _connect(db_path)
+    try:
+        records = conn.execute(
+            "SELECT level, key, shape, api, attempts, rooftop, latency_sum, latency_count FROM provider_stats"
+        ).fetchall()
+    finally:
+        conn.close()
+    return {tuple(record[:4]): record[4:] for record in records}
+
+
+def load_routing_model(db_path=ROUTING_DB):
+    """Statistiques {(niveau, clé, forme, api): (tentatives, rooftop, latence_totale, n_latences)}."""
+    if not os.path.exists(db_path):
+        return {}
+    return _read_model(db_path, os.stat(db_path).st_mtime_ns)
+
+
+def estimate(row, api, model=None):
+    """
+    Estime P(ROOFTOP) et la latence d'un fournisseur pour la ligne.
+
+    Chaque niveau (tout, gouvernorat, ville) sert d'a priori au suivant,
+    avec un poids ROUTING_PRIOR_WEIGHT.
+
+    Returns:
+        dict: rooftop_rate, latency, attempts (tentatives au niveau le plus large)
+    """
+    model = load_routing_model() if model is None else model
+    shape = address_shape(row)
+    rate, latency, attempts = PRIOR_ROOFTOP, PRIOR_LATENCY, 0
+    for level, key in region_keys(row):
+        stats = model.get((level, key, shape, api))
+        if not stats:
+            continue
+        count, rooftop, latency_sum, latency_count = stats
+        rate = (rooftop + ROUTING_PRIOR_WEIGHT * rate) / (count + ROUTING_PRIOR_WEIGHT)
+        latency = (latency_sum + ROUTING_PRIOR_WEIGHT * latency) / (latency_count + ROUTING_PRIOR_WEIGHT)
+        attempts = max(attempts, count)
+    return {"rooftop_rate": rate, "latency": latency, "attempts": attempts}
+
+
+def expected_cost(row, api, model=None, cost=None):
+    """Coût attendu pour obtenir ROOFTOP avec `api` : (coût + latence pondérée) / P(ROOFTOP)."""
+    stats = estimate(row, api, model)
+    cost = call_cost(api) if cost is None else cost
+    return (cost + ROUTING_LATENCY_COST * stats["latency"]) / max(stats["rooftop_rate"], 0.01)
+
+
+def has_evidence(row, apis, model=None):
+    """Vrai si chaque fournisseur a au moins ROUTING_MIN_ATTEMPTS tentatives pour cette forme d'adresse."""
+    model = load_routing_model() if model is None else model
+    return all(estimate(row, api, model)["attempts"] >= ROUTING_MIN_ATTEMPTS for api in apis)
+
+
+def route_providers(row, providers, model=None):
+    """
+    Ordonne les fournisseurs de la ligne par coût attendu croissant.
+
+    Returns:
+        list[str]: Fournisseurs réordonnés (ordre d'origine si le modèle manque de données)
+    """
+    model = load_routing_model() if model is None else model
+    providers = list(providers)
+    if not has_evidence(row, providers, model):
+        return providers
+    return sorted(providers, key=lambda api: expected_cost(row, api, model))
+
+
+if __name__ == "__main__":
+    # Amorçage : python -m src.routing data/output/jobs/JOB_1.csv ...
+    total = 0
+    for path in sys.argv[1:]:
+        frame = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+        total += learn_from_results(frame)
+    print(f"{total} tentatives ajoutées à {ROUTING_DB}")
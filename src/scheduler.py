@@ -0,0 +1,289 @@
+"""
+Ordonnanceur partagé des unités de géocodage entre les jobs concurrents.
+
+Tous les jobs d'un processus (toutes les sessions Streamlit) soumettent leurs
+lignes à un même groupe de threads. Le prochain travail est choisi par
+files équitables pondérées (WFQ) : chaque job avance une horloge virtuelle
+de `1 / poids` par ligne lancée et le job le moins avancé passe en premier,
+de sorte qu'un job de 500 000 lignes ne retarde pas un fichier de 200 lignes.
+Les petits jobs et les jobs interactifs passent par une voie prioritaire, et
+chaque job est plafonné à `max_concurrency` lignes en cours.
+
+Exemple :
+    with job_executor("JOB_1", total_rows=200, max_workers=10) as executor:
+        future = executor.submit(geocode, address)
+"""
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.config import (
+    SCHEDULER_ENABLED,
+    SCHEDULER_MAX_PER_JOB,
+    SCHEDULER_SMALL_JOB_ROWS,
+    SCHEDULER_WORKERS,
+)
+from src.metrics import QUEUE_DEPTH, SCHEDULER_WAIT
+
+LANE_PRIORITY, LANE_BULK = "priority", "bulk"
+# Nombre de jobs terminés dont les statistiques restent consultables
+FINISHED_JOBS_KEPT = 50
+
+_job_ids = itertools.count(1)
+
+
+def new_job_id(prefix="JOB"):
+    """
+    Identifiant de job unique : horodatage lisible et suffixe aléatoire.
+
+    Deux sessions lancées dans la même seconde ne partagent ni job de
+    l'ordonnanceur, ni fichier d'export, ni dossier de profil.
+    """
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+class _Job:
+    """État d'un job dans l'ordonnanceur (file, compteurs, horloge virtuelle)."""
+
+    def __init__(self, job_id, lane, weight, max_concurrency, vtime):
+        self.job_id = job_id
+        self.lane = lane
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.vtime = vtime
+        self.queue = deque()
+        self.running = 0
+        self.submitted = 0
+        self.done = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.closed = False
+
+    def report(self):
+        started = self.submitted - len(self.queue)
+        return {
+            "job_id": self.job_id,
+            "lane": self.lane,
+            "weight": self.weight,
+            "max_concurrency": self.max_concurrency,
+            "queued": len(self.queue),
+            "running": self.running,
+            "done": self.done,
+            "wait_avg": self.wait_sum / started if started else 0.0,
+            "wait_max": self.wait_max,
+        }
+
+
+class JobHandle:
+    """Interface de soumission d'un job (compatible `executor.submit`)."""
+
+    def __init__(self, scheduler, job):
+        self._scheduler = scheduler
+        self._job = job
+
+    @property
+    def job_id(self):
+        return self._job.job_id
+
+    def submit(self, func, *args, **kwargs):
+        """Place une unité de travail dans la file du job et retourne son Future."""
+        return self._scheduler._enqueue(self._job, func, args, kwargs)
+
+
+class FairScheduler:
+    """
+    Groupe de threads partagé, servi par files équitables pondérées.
+
+    Args:
+        workers: Nombre de threads partagés par tous les jobs
+        small_job_rows: Taille sous laquelle un job passe par la voie prioritaire
+        max_per_job: Lignes en cours maximales par job (par défaut)
+    """
+
+    def __init__(self, workers=SCHEDULER_WORKERS, small_job_rows=SCHEDULER_SMALL_JOB_ROWS,
+                 max_per_job=SCHEDULER_MAX_PER_JOB, clock=time.monotonic):
+        self.workers = max(1, int(workers))
+        self.small_job_rows = small_job_rows
+        self.max_per_job = max(1, int(max_per_job))
+        self._clock = clock
+        self._jobs = OrderedDict()
+        self._finished = OrderedDict()
+        # Horloge virtuelle par voie : début de la dernière ligne lancée
+        self._vclock = {LANE_PRIORITY: 0.0, LANE_BULK: 0.0}
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"geocoder-scheduler-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def lane_for(self, total_rows, interactive=False):
+        """Voie d'un job : prioritaire s'il est interactif ou petit."""
+        if interactive or (total_rows is not None and total_rows <= self.small_job_rows):
+            return LANE_PRIORITY
+        return LANE_BULK
+
+    def open_job(self, job_id=None, total_rows=None, weight=1.0, max_concurrency=None, interactive=False):
+        """
+        Enregistre un job et retourne son interface de soumission.
+
+        Args:
+            job_id: Identifiant du job (généré si absent)
+            total_rows: Nombre total de lignes du job (choix de la voie)
+            weight: Part relative du job dans sa voie
+            max_concurrency: Plafond de lignes en cours (borné par max_per_job)
+            interactive: Forcer la voie prioritaire
+        """
+        job_id = job_id or f"job-{next(_job_ids)}"
+        cap = min(self.max_per_job, max_concurrency or self.max_per_job)
+        with self._condition:
+            if job_id in self._jobs:
+                raise ValueError(f"Job déjà ouvert dans l'ordonnanceur : {job_id}")
+            # Un nouveau job part de l'horloge courante : pas de crédit accumulé
+            lane = self.lane_for(total_rows, interactive)
+            job = _Job(job_id, lane, max(float(weight), 1e-6), max(1, cap), self._vclock[lane])
+            previous = self._finished.pop(job_id, None)
+            if previous:
+                # Lots successifs d'un même job : statistiques cumulées
+                job.done, job.submitted = previous["done"], previous["done"]
+                job.wait_sum, job.wait_max = previous["wait_avg"] * previous["done"], previous["wait_max"]
+            self._jobs[job_id] = job
+            self._start_workers()
+        return JobHandle(self, job)
+
+    def close_job(self, job_id, wait=True):
+        """
+        Retire un job : les unités encore en file sont annulées.
+
+        Args:
+            wait: Attendre la fin des unités en cours
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.closed = True
+            while job.queue:
+                future = job.queue.popleft()[0]
+                future.cancel()
+                job.submitted -= 1
+                QUEUE_DEPTH.dec(queue="scheduler")
+            while wait and job.running:
+                self._condition.wait()
+            del self._jobs[job_id]
+            self._finished[job_id] = job.report()
+            while len(self._finished) > FINISHED_JOBS_KEPT:
+                self._finished.popitem(last=False)
+
+    @contextmanager
+    def job(self, job_id=None, total_rows=None, weight=1.0, max_concurrency=None, interactive=False):
+        """Ouvre un job pour la durée du bloc `with`."""
+        handle = self.open_job(job_id, total_rows, weight, max_concurrency, interactive)
+        try:
+            yield handle
+        finally:
+            self.close_job(handle.job_id)
+
+    def _enqueue(self, job, func, args, kwargs):
+        future = Future()
+        with self._condition:
+            if job.closed:
+                raise RuntimeError(f"Job fermé : {job.job_id}")
+            job.queue.append((future, func, args, kwargs, self._clock()))
+            job.submitted += 1
+            QUEUE_DEPTH.inc(queue="scheduler")
+            self._condition.notify_all()
+        return future
+
+    def _next_job(self):
+        """Job à servir : voie prioritaire d'abord, puis plus petite horloge virtuelle."""
+        best = None
+        for job in self._jobs.values():
+            if not job.queue or job.running >= job.max_concurrency:
+                continue
+            key = (job.lane != LANE_PRIORITY, job.vtime)
+            if best is None or key < best[0]:
+                best = (key, job)
+        return best[1] if best else None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                future, func, args, kwargs, submitted_at = job.queue.popleft()
+                self._vclock[job.lane] = max(self._vclock[job.lane], job.vtime)
+                job.vtime = self._vclock[job.lane] + 1.0 / job.weight
+                job.running += 1
+                waited = self._clock() - submitted_at
+                job.wait_sum += waited
+                job.wait_max = max(job.wait_max, waited)
+                QUEUE_DEPTH.dec(queue="scheduler")
+            SCHEDULER_WAIT.observe(waited, lane=job.lane)
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except BaseException as exc:
+                    future.set_exception(exc)
+            with self._condition:
+                job.running -= 1
+                job.done += 1
+                self._condition.notify_all()
+
+    def stats(self):
+        """
+        État des jobs en cours (file, lignes en cours, attentes).
+
+        Returns:
+            list[dict]: job_id, lane, weight, max_concurrency, queued, running, done, wait_avg, wait_max
+        """
+        with self._condition:
+            return [job.report() for job in self._jobs.values()]
+
+    def job_report(self, job_id):
+        """Statistiques d'un job, en cours ou récemment terminé (None si inconnu)."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return job.report() if job else self._finished.get(job_id)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Ordonnanceur partagé du processus."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FairScheduler()
+        return _scheduler
+
+
+@contextmanager
+def job_executor(job_id=None, total_rows=None, max_workers=10, interactive=False):
+    """
+    Exécuteur des lignes d'un job : ordonnanceur partagé, ou groupe de threads
+    dédié si `SCHEDULER_ENABLED` est désactivé.
+
+    Args:
+        job_id: Identifiant du job (regroupe ses lots successifs)
+        total_rows: Nombre total de lignes du job
+        max_workers: Plafond de lignes en cours pour ce job
+        interactive: Forcer la voie prioritaire
+    """
+    if not SCHEDULER_ENABLED:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield executor
+        return
+    with get_scheduler().job(job_id, total_rows, max_concurrency=max_workers, interactive=interactive) as handle:
+        yield handle
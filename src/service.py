@@ -0,0 +1,293 @@
+"""
+Service HTTP de géocodage unitaire et par petits lots.
+
+Sert les autres applications sans passer par l'upload Streamlit, avec le
+même moteur : stratégies déclaratives, caches mémoire et locaux, transport
+HTTP à connexions persistantes, limiteur de débit et quotas partagés. Les
+lignes passent par la voie prioritaire de l'ordonnanceur partagé ; chaque
+requête a une échéance (`deadline_ms`), propagée aux appels des fournisseurs :
+à l'échéance, chaque ligne rend son meilleur résultat, ou le statut
+DEADLINE_EXCEEDED si elle n'en a aucun.
+
+Lancement :
+    python -m src.service            # SERVICE_HOST:SERVICE_PORT
+
+Exemples :
+    GET  /geocode?address=Avenue+Habib+Bourguiba,+Tunis&deadline_ms=1500
+    POST /geocode        {"street": "...", "city": "Sfax", "strategy": "here"}
+    POST /geocode/batch  {"rows": [{"address": "..."}, ...], "deadline_ms": 3000}
+"""
+import json
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+from src.centroids import check_against_centroids
+from src.config import (
+    CENTROID_CACHE_ENABLED,
+    ROUTING_ENABLED,
+    SERVICE_DEADLINE_MS,
+    SERVICE_HOST,
+    SERVICE_MAX_BATCH,
+    SERVICE_PORT,
+    SERVICE_STRATEGY,
+)
+from src.deadline import DEADLINE_STATUS, run_row
+from src.geocoding import geocode_row_with_strategy
+from src.metrics import REGISTRY, observe_row_result
+from src.routing import update_routing_model
+from src.scheduler import get_scheduler
+from src.strategies import load_strategies
+
+# Champs d'adresse acceptés (mêmes noms que les champs mappés de l'application)
+ADDRESS_FIELDS = ("name", "street", "postal_code", "city", "governorate", "country")
+# Intervalle d'écriture des tentatives dans le modèle de routage
+ROUTING_FLUSH_SECONDS = 60.0
+# Marge laissée aux lignes pour rendre leur meilleur résultat à l'échéance
+DEADLINE_GRACE_SECONDS = 0.1
+
+SERVICE_LATENCY = REGISTRY.histogram(
+    "geocoder_service_request_duration_seconds",
+    "Durée des requêtes du service HTTP de géocodage.",
+    ["endpoint", "status"],
+)
+
+_routing_flush = {"last": time.monotonic()}
+_routing_flush_lock = threading.Lock()
+
+
+class ServiceError(Exception):
+    """Requête invalide (rendue avec le code HTTP `status`)."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def build_row(payload, index=0):
+    """
+    Ligne du moteur à partir d'une requête.
+
+    `address` est l'adresse complète ; à défaut elle est construite à partir
+    des champs (nom, rue, code postal, ville, gouvernorat), comme à l'import.
+
+    Returns:
+        pd.Series: Ligne avec full_address et les champs d'adresse
+    """
+    if not isinstance(payload, dict):
+        raise ServiceError("Chaque ligne doit être un objet JSON")
+    row = {field: payload.get(field) for field in ADDRESS_FIELDS}
+    address = payload.get("address") or payload.get("full_address")
+    if not address:
+        parts = [str(row[field]) for field in ADDRESS_FIELDS[:5] if row[field] not in (None, "")]
+        address = ", ".join(parts)
+    if not address:
+        raise ServiceError("Adresse vide : fournir `address` ou des champs d'adresse")
+    row["full_address"] = address
+    return pd.Series(row, name=index)
+
+
+def deadline_result(index, deadline_ms):
+    """Résultat d'une ligne non terminée à l'échéance de la requête."""
+    return {
+        "latitude": None,
+        "longitude": None,
+        "formatted_address": None,
+        "status": DEADLINE_STATUS,
+        "error_message": f"Échéance de {deadline_ms} ms dépassée",
+        "api_used": None,
+        "precision_level": None,
+        "precision_level_raw": None,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "row_index": index,
+    }
+
+
+def _json_safe(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if hasattr(value, "item"):
+        return _json_safe(value.item())
+    return value
+
+
+def _geocode_one(row, strategy):
+    result = geocode_row_with_strategy(row["full_address"], row.name, row, {}, strategy=strategy)
+    if CENTROID_CACHE_ENABLED:
+        result = check_against_centroids(result, row.to_dict())
+    return result
+
+
+def _maybe_flush_routing():
+    """Écrit périodiquement les tentatives enregistrées (le service n'a pas de fin de job)."""
+    if not ROUTING_ENABLED:
+        return
+    with _routing_flush_lock:
+        if time.monotonic() - _routing_flush["last"] < ROUTING_FLUSH_SECONDS:
+            return
+        _routing_flush["last"] = time.monotonic()
+    update_routing_model()
+
+
+def geocode_rows(payloads, strategy=SERVICE_STRATEGY, deadline_ms=SERVICE_DEADLINE_MS):
+    """
+    Géocode quelques lignes dans la voie prioritaire, sous une échéance commune.
+
+    Args:
+        payloads: Liste de lignes (dict avec `address` et/ou champs d'adresse)
+        strategy: Nom de la stratégie (voir src/strategies.py)
+        deadline_ms: Échéance de la requête en millisecondes
+
+    Returns:
+        list[dict]: Un résultat par ligne, dans l'ordre des lignes
+    """
+    if strategy not in load_strategies():
+        raise ServiceError(f"Stratégie inconnue : {strategy}")
+    if len(payloads) > SERVICE_MAX_BATCH:
+        raise ServiceError(f"Lot limité à {SERVICE_MAX_BATCH} lignes", status=413)
+    rows = [build_row(payload, index) for index, payload in enumerate(payloads)]
+    deadline = time.monotonic() + deadline_ms / 1000
+    scheduler = get_scheduler()
+    handle = scheduler.open_job(f"api-{uuid.uuid4().hex[:8]}", total_rows=len(rows), interactive=True)
+    results = []
+    try:
+        # L'échéance de la requête est propagée aux appels des fournisseurs de chaque ligne
+        futures = [handle.submit(run_row, _geocode_one, row, strategy, until=deadline) for row in rows]
+        for index, future in enumerate(futures):
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()) + DEADLINE_GRACE_SECONDS)
+            except FutureTimeoutError:
+                future.cancel()
+                result = deadline_result(index, deadline_ms)
+            observe_row_result(result)
+            result = {key: value for key, value in result.items() if key != "row_index"}
+            results.append(_json_safe(result))
+    finally:
+        # Les lignes déjà lancées finissent en arrière-plan (et alimentent le cache)
+        scheduler.close_job(handle.job_id, wait=False)
+    _maybe_flush_routing()
+    return results
+
+
+def _parse_deadline(value):
+    try:
+        deadline_ms = int(value) if value not in (None, "") else SERVICE_DEADLINE_MS
+    except (TypeError, ValueError):
+        raise ServiceError("deadline_ms doit être un entier")
+    if deadline_ms <= 0:
+        raise ServiceError("deadline_ms doit être positif")
+    return deadline_ms
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, payload, content_type="application/json; charset=utf-8"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ServiceError("Corps JSON invalide")
+        if not isinstance(payload, dict):
+            raise ServiceError("Le corps doit être un objet JSON")
+        return payload
+
+    def _handle(self, endpoint, func):
+        start = time.perf_counter()
+        try:
+            status, payload = func()
+        except ServiceError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": str(e)}
+        SERVICE_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, status=str(status))
+        if isinstance(payload, dict):
+            payload["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self._send(status, payload)
+
+    def _single(self, payload):
+        strategy = payload.get("strategy") or SERVICE_STRATEGY
+        deadline_ms = _parse_deadline(payload.get("deadline_ms"))
+        result = geocode_rows([payload], strategy, deadline_ms)[0]
+        return (504 if result["status"] == DEADLINE_STATUS else 200), result
+
+    def _batch(self, payload):
+        rows = payload.get("rows")
+        if not isinstance(rows, list):
+            raise ServiceError("`rows` doit être une liste")
+        strategy = payload.get("strategy") or SERVICE_STRATEGY
+        return 200, {"results": geocode_rows(rows, strategy, _parse_deadline(payload.get("deadline_ms")))}
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self._handle("health", lambda: (200, {"status": "ok"}))
+        elif url.path == "/metrics":
+            self.send_response(200)
+            body = REGISTRY.render().encode("utf-8")
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path == "/geocode":
+            self._handle("geocode", lambda: self._single(dict(parse_qsl(url.query))))
+        else:
+            self._send(404, {"error": "Ressource inconnue"})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == "/geocode":
+            self._handle("geocode", lambda: self._single(self._read_json()))
+        elif path == "/geocode/batch":
+            self._handle("batch", lambda: self._batch(self._read_json()))
+        else:
+            self._send(404, {"error": "Ressource inconnue"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(host=SERVICE_HOST, port=SERVICE_PORT):
+    """Serveur HTTP du service (un thread par connexion)."""
+    server = ThreadingHTTPServer((host, int(port)), _ServiceHandler)
+    server.daemon_threads = True
+    return server
+
+
+def start_service(host=SERVICE_HOST, port=SERVICE_PORT):
+    """Démarre le service dans un thread d'arrière-plan (tests, benchmarks)."""
+    server = create_server(host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    server = create_server()
+    print(f"Service de géocodage sur http://{SERVICE_HOST}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if ROUTING_ENABLED:
+            update_routing_model()
+        server.server_close()
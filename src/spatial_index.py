@@ -0,0 +1,436 @@
+"""
+Index spatial des résultats géocodés (grille régulière en mémoire numpy).
+
+Les points sont triés par cellule de grille (CELL_DEG degrés) ; une requête
+ne parcourt que les cellules couvrant le rayon demandé, puis filtre par
+distance haversine. Toutes les opérations travaillent par lots de
+coordonnées. L'index est persisté en .npz dans `data/cache/`.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from src.centroids import LOCAL_APIS
+from src.config import SPATIAL_INDEX_PATH
+from src.geo import KM_PER_DEGREE, haversine_km
+
+# ~220 m en latitude : un rayon de 200 m couvre 3×5 cellules en Tunisie
+CELL_DEG = 0.002
+LABEL_COLUMNS = ("formatted_address", "precision_level", "api_used")
+# Nombre de requêtes traitées ensemble (borne la mémoire des candidats)
+QUERY_BATCH_SIZE = 100_000
+# Paires (requête, point) évaluées au maximum en une fois
+MAX_CANDIDATES = 2_000_000
+
+
+def _pack_strings(values):
+    """Encode une liste de chaînes en (octets UTF-8 concaténés, offsets)."""
+    encoded = [b"" if v is None or (not isinstance(v, str) and pd.isna(v)) else str(v).encode("utf-8")
+               for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype="uint8")
+    return data, offsets
+
+
+def _take_strings(data, offsets, positions):
+    """Sous-ensemble (dans l'ordre de `positions`) de chaînes encodées par `_pack_strings`."""
+    starts = offsets[:-1][positions]
+    lengths = offsets[1:][positions] - starts
+    new_offsets = np.zeros(len(positions) + 1, dtype="int64")
+    np.cumsum(lengths, out=new_offsets[1:])
+    return data[_expand_ranges(starts, lengths)], new_offsets
+
+
+def _expand_ranges(starts, counts):
+    """Concatène les plages [start, start + count) sans boucle Python."""
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype="int64")
+    shifts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return shifts + np.arange(total, dtype="int64")
+
+
+class SpatialIndex:
+    """
+    Index par grille sur un ensemble de points (lat/lon) et leurs libellés.
+
+    Exemple :
+        index = SpatialIndex.from_frame(enriched_df)
+        matches = index.reverse_geocode(lats, lons, max_distance_m=200)
+    """
+
+    def __init__(self, latitude, longitude, labels=None, cell_deg=CELL_DEG):
+        latitude = np.asarray(latitude, dtype="float64")
+        longitude = np.asarray(longitude, dtype="float64")
+        self.cell_deg = float(cell_deg)
+        self._n_cols = int(np.ceil(360 / self.cell_deg)) + 1
+
+        keys = self._cell_keys(latitude, longitude)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self.latitude = latitude[order]
+        self.longitude = longitude[order]
+        self.cell_keys, starts = np.unique(keys, return_index=True)
+        self.cell_starts = np.append(starts, len(keys)).astype("int64")
+
+        self._labels = {}
+        for col, values in (labels or {}).items():
+            values = np.asarray(values, dtype=object)[order]
+            self._labels[col] = _pack_strings(values)
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def _cell_keys(self, latitude, longitude):
+        rows = np.floor((latitude + 90) / self.cell_deg).astype("int64")
+        cols = np.floor((longitude + 180) / self.cell_deg).astype("int64")
+        return rows * self._n_cols + cols
+
+    @classmethod
+    def from_frame(cls, df, cell_deg=CELL_DEG):
+        """
+        Construit l'index à partir des lignes OK d'un DataFrame enrichi.
+
+        Les résultats servis par une source locale (gazetteer, centroïdes,
+        index flou) ne sont que des copies de points connus : ils sont exclus.
+        """
+        mask = df["latitude"].notna() & df["longitude"].notna()
+        if "status" in df.columns:
+            mask &= df["status"] == "OK"
+        if "api_used" in df.columns:
+            mask &= ~df["api_used"].isin(LOCAL_APIS)
+        points = df.loc[mask]
+        labels = {col: points[col].to_numpy(dtype=object) for col in LABEL_COLUMNS if col in points.columns}
+        return cls(
+            pd.to_numeric(points["latitude"]).to_numpy("float64"),
+            pd.to_numeric(points["longitude"]).to_numpy("float64"),
+            labels=labels,
+            cell_deg=cell_deg,
+        )
+
+    def _packed(self, column):
+        if column in self._labels:
+            return self._labels[column]
+        return np.empty(0, dtype="uint8"), np.zeros(len(self) + 1, dtype="int64")
+
+    def merge(self, other):
+        """
+        Index réunissant les points des deux index.
+
+        Les tableaux déjà triés sont fusionnés tels quels : les libellés restent
+        encodés, sans passer par un DataFrame.
+        """
+        if other.cell_deg != self.cell_deg:
+            raise ValueError("Index de pas de grille différents")
+        latitude = np.concatenate([self.latitude, other.latitude])
+        longitude = np.concatenate([self.longitude, other.longitude])
+        keys = self._cell_keys(latitude, longitude)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+
+        index = SpatialIndex.__new__(SpatialIndex)
+        index.cell_deg = self.cell_deg
+        index._n_cols = self._n_cols
+        index.latitude = latitude[order]
+        index.longitude = longitude[order]
+        index.cell_keys, starts = np.unique(keys, return_index=True)
+        index.cell_starts = np.append(starts, len(keys)).astype("int64")
+        index._labels = {}
+        for col in dict.fromkeys([*self._labels, *other._labels]):
+            (data, offsets), (other_data, other_offsets) = self._packed(col), other._packed(col)
+            data = np.concatenate([data, other_data])
+            offsets = np.concatenate([offsets[:-1], other_offsets + offsets[-1]])
+            index._labels[col] = _take_strings(data, offsets, order)
+        return index
+
+    def subset(self, mask):
+        """Index restreint aux points où `mask` est vrai (ordre conservé)."""
+        positions = np.flatnonzero(mask)
+        index = SpatialIndex.__new__(SpatialIndex)
+        index.cell_deg = self.cell_deg
+        index._n_cols = self._n_cols
+        index.latitude = self.latitude[positions]
+        index.longitude = self.longitude[positions]
+        keys = self._cell_keys(index.latitude, index.longitude)
+        index.cell_keys, starts = np.unique(keys, return_index=True)
+        index.cell_starts = np.append(starts, len(keys)).astype("int64")
+        index._labels = {col: _take_strings(*packed, positions) for col, packed in self._labels.items()}
+        return index
+
+    def label(self, column, point_index):
+        """Décode les libellés d'une colonne pour les points donnés (-1 → None)."""
+        if column not in self._labels:
+            return [None] * len(point_index)
+        data, offsets = self._labels[column]
+        return [
+            None if i < 0 else data[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8")
+            for i in np.asarray(point_index)
+        ]
+
+    def to_frame(self):
+        """Points de l'index (coordonnées et libellés) sous forme de DataFrame."""
+        positions = np.arange(len(self))
+        data = {"latitude": self.latitude, "longitude": self.longitude}
+        for col in self._labels:
+            data[col] = self.label(col, positions)
+        return pd.DataFrame(data)
+
+    # ---------- Requêtes ----------
+
+    def _cell_ranges(self, latitude, longitude, radius_km):
+        """Pour chaque cellule voisine : (requêtes concernées, début, nombre de points)."""
+        rows = np.floor((latitude + 90) / self.cell_deg).astype("int64")
+        cols = np.floor((longitude + 180) / self.cell_deg).astype("int64")
+        k_lat = int(np.ceil(radius_km / (self.cell_deg * KM_PER_DEGREE)))
+        max_abs_lat = min(float(np.abs(latitude).max()) + (k_lat + 1) * self.cell_deg, 89.0)
+        k_lon = int(np.ceil(radius_km / (self.cell_deg * KM_PER_DEGREE * np.cos(np.radians(max_abs_lat)))))
+
+        last_cell = len(self.cell_keys) - 1
+        for d_row in range(-k_lat, k_lat + 1):
+            for d_col in range(-k_lon, k_lon + 1):
+                keys = (rows + d_row) * self._n_cols + (cols + d_col)
+                pos = np.minimum(np.searchsorted(self.cell_keys, keys), last_cell)
+                hit = self.cell_keys[pos] == keys
+                if not hit.any():
+                    continue
+                cells = pos[hit]
+                starts = self.cell_starts[cells]
+                yield np.flatnonzero(hit), starts, self.cell_starts[cells + 1] - starts
+
+    def _candidates(self, latitude, longitude, radius_km):
+        """Paires (requête, point, distance km) à moins de radius_km."""
+        query_parts, point_parts = [], []
+        for queries, starts, counts in self._cell_ranges(latitude, longitude, radius_km):
+            query_parts.append(np.repeat(queries, counts))
+            point_parts.append(_expand_ranges(starts, counts))
+
+        if not query_parts:
+            empty = np.empty(0, dtype="int64")
+            return empty, empty, np.empty(0, dtype="float64")
+        queries = np.concatenate(query_parts)
+        points = np.concatenate(point_parts)
+
+        # Pré-filtre équirectangulaire (sans trigonométrie par paire), marge de 1 %
+        q_lat, p_lat = latitude[queries], self.latitude[points]
+        cos_lat = np.cos(np.radians(latitude))[queries]
+        d_lat = q_lat - p_lat
+        d_lon = (longitude[queries] - self.longitude[points]) * cos_lat
+        limit = (radius_km * 1.01 / KM_PER_DEGREE) ** 2
+        near = d_lat * d_lat + d_lon * d_lon <= limit
+        queries, points = queries[near], points[near]
+
+        distances = np.atleast_1d(haversine_km(
+            latitude[queries], longitude[queries], self.latitude[points], self.longitude[points]
+        ))
+        keep = distances <= radius_km
+        return queries[keep], points[keep], distances[keep]
+
+    def _batched(self, latitude, longitude, radius_km):
+        """
+        Évalue les requêtes par lots, triées par cellule (accès mémoire
+        contigus), en gardant chaque lot sous MAX_CANDIDATES paires candidates
+        (zones denses : lots plus petits). Les indices rendus sont ceux d'origine.
+        """
+        latitude = np.atleast_1d(np.asarray(latitude, dtype="float64"))
+        longitude = np.atleast_1d(np.asarray(longitude, dtype="float64"))
+        if len(self) == 0 or len(latitude) == 0:
+            return
+        order = np.argsort(self._cell_keys(latitude, longitude), kind="stable")
+        latitude, longitude = latitude[order], longitude[order]
+
+        per_query = np.zeros(len(latitude), dtype="int64")
+        for queries, _, counts in self._cell_ranges(latitude, longitude, radius_km):
+            per_query[queries] += counts
+        cumulative = np.cumsum(per_query)
+
+        start = 0
+        while start < len(latitude):
+            budget = (cumulative[start - 1] if start else 0) + MAX_CANDIDATES
+            stop = int(np.searchsorted(cumulative, budget, side="right"))
+            stop = min(max(stop, start + 1), start + QUERY_BATCH_SIZE)
+            queries, points, distances = self._candidates(latitude[start:stop], longitude[start:stop], radius_km)
+            yield order[queries + start], points, distances
+            start = stop
+
+    def query_radius(self, latitude, longitude, radius_m=200):
+        """
+        Points connus à moins de `radius_m` mètres de chaque coordonnée.
+
+        Returns:
+            pd.DataFrame: query_index, point_index, distance_m (trié par requête puis distance)
+        """
+        parts = list(self._batched(latitude, longitude, radius_m / 1000))
+        if not parts:
+            return pd.DataFrame({"query_index": [], "point_index": [], "distance_m": []})
+        queries, points, distances = (np.concatenate(p) for p in zip(*parts))
+        order = np.lexsort((distances, queries))
+        return pd.DataFrame({
+            "query_index": queries[order],
+            "point_index": points[order],
+            "distance_m": distances[order] * 1000,
+        })
+
+    def nearest(self, latitude, longitude, max_distance_m=200):
+        """
+        Point connu le plus proche de chaque coordonnée, dans la limite de `max_distance_m`.
+
+        Returns:
+            tuple: (point_index, distance_m) — -1 et NaN si aucun point
+        """
+        n_queries = len(np.atleast_1d(latitude))
+        point_index = np.full(n_queries, -1, dtype="int64")
+        distance_m = np.full(n_queries, np.nan)
+        best = np.full(n_queries, np.inf)
+        for queries, points, distances in self._batched(latitude, longitude, max_distance_m / 1000):
+            if len(queries) == 0:
+                continue
+            # Plus petite distance par requête sans tri complet des paires
+            np.minimum.at(best, queries, distances)
+            winners = distances == best[queries]
+            point_index[queries[winners]] = points[winners]
+            distance_m[queries[winners]] = distances[winners] * 1000
+        return point_index, distance_m
+
+    def reverse_geocode(self, latitude, longitude, max_distance_m=200):
+        """
+        Géocodage inverse par lot à partir de nos résultats existants.
+
+        Returns:
+            pd.DataFrame: Une ligne par coordonnée, avec le libellé du point le
+                          plus proche (formatted_address, precision_level,
+                          api_used) et distance_m ; vide si aucun point
+        """
+        point_index, distance_m = self.nearest(latitude, longitude, max_distance_m)
+        result = pd.DataFrame({
+            "latitude": np.atleast_1d(latitude),
+            "longitude": np.atleast_1d(longitude),
+            "distance_m": distance_m,
+        })
+        for col in LABEL_COLUMNS:
+            result[col] = self.label(col, point_index)
+        return result
+
+    # ---------- Persistance ----------
+
+    def save(self, path=SPATIAL_INDEX_PATH):
+        """Écrit l'index en .npz (écriture atomique)."""
+        arrays = {
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "cell_keys": self.cell_keys,
+            "cell_starts": self.cell_starts,
+            "cell_deg": np.array(self.cell_deg),
+        }
+        for col, (data, offsets) in self._labels.items():
+            arrays[f"label__{col}__data"] = data
+            arrays[f"label__{col}__offsets"] = offsets
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path=SPATIAL_INDEX_PATH):
+        """Relit un index écrit par `save` (None si le fichier n'existe pas)."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as npz:
+            index = cls.__new__(cls)
+            index.cell_deg = float(npz["cell_deg"])
+            index._n_cols = int(np.ceil(360 / index.cell_deg)) + 1
+            index.latitude = npz["latitude"]
+            index.longitude = npz["longitude"]
+            index.cell_keys = npz["cell_keys"]
+            index.cell_starts = npz["cell_starts"]
+            index._labels = {}
+            for name in npz.files:
+                if name.startswith("label__") and name.endswith("__data"):
+                    col = name[len("label__"):-len("__data")]
+                    index._labels[col] = (npz[name], npz[f"label__{col}__offsets"])
+        return index
+
+
+@contextmanager
+def _file_lock(path):
+    """Verrou exclusif inter-processus sur `<path>.lock` (bloquant)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _known_points(index, new_points):
+    """Masque des points de `new_points` déjà présents dans `index` (mêmes coordonnées et adresse)."""
+    pairs = index.query_radius(new_points.latitude, new_points.longitude, radius_m=0)
+    queries = pairs["query_index"].to_numpy()
+    points = pairs["point_index"].to_numpy()
+    same = (index.latitude[points] == new_points.latitude[queries]) & (
+        index.longitude[points] == new_points.longitude[queries]
+    )
+    queries, points = queries[same], points[same]
+    if len(queries):
+        column = "formatted_address"
+        same = np.array(index.label(column, points), dtype=object) == np.array(
+            new_points.label(column, queries), dtype=object
+        )
+        queries = queries[same]
+    known = np.zeros(len(new_points), dtype=bool)
+    known[queries] = True
+    return known
+
+
+def update_spatial_index(enriched_df, path=SPATIAL_INDEX_PATH):
+    """
+    Ajoute les résultats d'un job à l'index persisté.
+
+    Seuls les nouveaux points sont ajoutés : les points identiques (mêmes
+    coordonnées et adresse) ne sont gardés qu'une fois, et l'index existant
+    est fusionné sans être décodé. La lecture, la fusion et le remplacement
+    atomique du fichier se font sous un verrou inter-processus : deux jobs
+    terminés en même temps ne perdent pas les points de l'autre.
+
+    Returns:
+        int: Nombre de points dans l'index
+    """
+    new_points = SpatialIndex.from_frame(enriched_df.drop_duplicates(
+        subset=["latitude", "longitude", "formatted_address"]
+        if "formatted_address" in enriched_df.columns
+        else ["latitude", "longitude"]
+    ))
+
+    with _file_lock(path):
+        existing = SpatialIndex.load(path)
+        if existing is not None and len(existing):
+            new_points = new_points.subset(~_known_points(existing, new_points))
+            if not len(new_points):
+                return len(existing)
+            new_points = existing.merge(new_points)
+        new_points.save(path)
+    return len(new_points)
@@ -0,0 +1,500 @@
+"""
+Stratégies de géocodage déclaratives.
+
+Une stratégie décrit, sans code, l'ordre des appels d'une ligne : étapes
+(API × variante d'adresse), groupes d'étapes parallèles, conditions sur le
+meilleur résultat courant, précisions d'arrêt et budget d'appels. Elle est
+compilée en plan (`compile_strategy`) puis exécutée par `execute_strategy`
+avec les fonctions d'appel fournies par le moteur (`src/geocoding.py`).
+
+Les stratégies intégrées (`here`, `google`, `osm`, `multi`) reproduisent les
+modes historiques ; un fichier JSON (`STRATEGIES_FILE`) peut en ajouter ou
+les remplacer. Elles couvrent le géocodage initial et le service HTTP ; la
+relance (`src/geocoding_retry.py`) garde son propre plan, ordonné à
+l'exécution selon le cache et le coût des appels.
+
+Format d'une étape : dictionnaire ou chaîne compacte `appel[:variante][@arrêt]`,
+par exemple `"here:reformatted@ROOFTOP"`.
+"""
+import json
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import pandas as pd
+
+from src.backoff import is_transient
+from src.call_budget import CallBudget
+from src.config import STRATEGIES_FILE
+from src.deadline import (
+    DEADLINE_STATUS,
+    bind as bind_deadline,
+    expired as deadline_expired,
+    remaining as deadline_remaining,
+)
+from src.quota import QUOTA_STATUS
+
+PRECISION_LEVELS = ["ROOFTOP", "RANGE_INTERPOLATED", "GEOMETRIC_CENTER", "APPROXIMATE"]
+# Valeur des conditions `if_best_in` / `unless_best_in` : aucun résultat pour l'instant
+NO_RESULT = "NONE"
+STOP_ANY = "ANY"
+
+STEP_CALLS = ("local", "here", "google", "google_place_id", "osm", "osm_structured", "centroids")
+VARIANTS = ("reformatted", "no_name", "original")
+# APIs facturées au budget avant d'exécuter l'étape
+STEP_APIS = {
+    "here": ("here",),
+    "google": ("google",),
+    "google_place_id": ("google_places", "google"),
+    "osm": ("osm",),
+    "osm_structured": ("osm",),
+}
+
+_STEP_PATTERN = re.compile(r"^(?P<call>[a-z_]+)(?::(?P<variant>[a-z_]+))?(?:@(?P<stop>[A-Z_]+))?$")
+
+BUILTIN_STRATEGIES = {
+    "here": {
+        "label": "HERE uniquement",
+        "error_message": "HERE n'a pas retourné de résultat.",
+        "error_api": "here",
+        "on_quota": ["centroids"],
+        "steps": ["local@ANY", "here:reformatted@ANY"],
+    },
+    "google": {
+        "label": "Google uniquement",
+        "error_message": "Aucune réponse de Google.",
+        "error_api": "google",
+        "on_quota": ["centroids"],
+        "steps": [
+            "local@ANY",
+            {"call": "google_place_id", "requires": ["name"], "stop_at": "ROOFTOP", "optional": True},
+            "google:no_name@ROOFTOP",
+            "google:reformatted",
+        ],
+    },
+    "osm": {
+        "label": "OSM uniquement",
+        "error_message": "OSM n'a pas retourné de résultat.",
+        "error_api": "osm",
+        "on_quota": ["centroids"],
+        "steps": [
+            "local@ANY",
+            "osm:reformatted@ROOFTOP",
+            {"call": "osm", "variant": "no_name", "stop_at": "ROOFTOP", "if_best_in": [NO_RESULT]},
+            {"call": "osm_structured", "if_best_in": [NO_RESULT]},
+        ],
+    },
+    "multi": {
+        "label": "Multi-API (HERE → Google → OSM)",
+        "error_message": "Aucune API n'a retourné de résultat (HERE, Google, OSM).",
+        "error_api": "none",
+        "on_quota": ["centroids"],
+        # Groupes HERE / Google / OSM réordonnés par ligne selon le modèle de routage
+        "routed": True,
+        "target_precision": "ROOFTOP",
+        "steps": [
+            "local@ANY",
+            {
+                "provider": "here",
+                "unless_best_in": ["ROOFTOP", "RANGE_INTERPOLATED"],
+                "steps": ["here:reformatted@ROOFTOP"],
+            },
+            {
+                "provider": "google",
+                "unless_best_in": ["ROOFTOP", "RANGE_INTERPOLATED"],
+                "steps": [
+                    {"call": "google_place_id", "requires": ["name"], "stop_at": "ROOFTOP", "optional": True},
+                    "google:no_name@ROOFTOP",
+                    "google:reformatted",
+                ],
+            },
+            # Sans rue, OSM ne ferait que renvoyer un centre de zone : inutile de l'appeler
+            {"call": "centroids", "tag_address": True, "unless_row_has": ["street"],
+             "stop_unless_row_has": "street", "if_best_in": [NO_RESULT, "APPROXIMATE"]},
+            {
+                "provider": "osm",
+                "if_best_in": [NO_RESULT, "APPROXIMATE"],
+                "steps": [
+                    "osm:reformatted@ROOFTOP",
+                    {"call": "osm", "variant": "no_name", "if_best_in": [NO_RESULT, "APPROXIMATE"]},
+                    {"call": "osm_structured", "if_best_in": [NO_RESULT, "APPROXIMATE"]},
+                ],
+            },
+            # Avec une rue, le centroïde n'est qu'un repli après OSM (qui peut trouver ROOFTOP)
+            {"call": "centroids", "tag_address": True, "requires": ["street"],
+             "if_best_in": [NO_RESULT, "APPROXIMATE"]},
+        ],
+    },
+}
+
+
+def _check_precisions(name, values, allowed):
+    for value in values:
+        if value not in allowed:
+            raise ValueError(f"Stratégie '{name}' : précision inconnue '{value}'")
+
+
+def _compile_condition(name, entry):
+    """Conditions `if_best_in` / `unless_best_in` d'une étape ou d'un groupe."""
+    if_best_in = list(entry.get("if_best_in", []))
+    unless_best_in = list(entry.get("unless_best_in", []))
+    _check_precisions(name, if_best_in + unless_best_in, PRECISION_LEVELS + [NO_RESULT])
+    return {"if_best_in": if_best_in, "unless_best_in": unless_best_in}
+
+
+def _compile_step(name, step):
+    """Normalise une étape (chaîne compacte ou dictionnaire)."""
+    if isinstance(step, str):
+        match = _STEP_PATTERN.match(step.strip())
+        if not match:
+            raise ValueError(f"Stratégie '{name}' : étape illisible '{step}'")
+        step = {key: value for key, value in match.groupdict().items() if value}
+
+    call = step.get("call")
+    if call not in STEP_CALLS:
+        raise ValueError(f"Stratégie '{name}' : appel inconnu '{call}'")
+    variant = step.get("variant")
+    if variant is not None and variant not in VARIANTS:
+        raise ValueError(f"Stratégie '{name}' : variante inconnue '{variant}'")
+    if call in ("here", "google", "osm") and variant is None:
+        variant = "reformatted"
+    stop_at = step.get("stop") or step.get("stop_at")
+    if stop_at is not None:
+        _check_precisions(name, [stop_at], PRECISION_LEVELS + [STOP_ANY])
+
+    return {
+        "call": call,
+        "variant": variant,
+        "stop_at": stop_at,
+        **_compile_condition(name, step),
+        "requires": list(step.get("requires", [])),
+        "unless_row_has": list(step.get("unless_row_has", [])),
+        "optional": bool(step.get("optional", False)),
+        "tag_address": bool(step.get("tag_address", variant == "reformatted")),
+        "stop_unless_row_has": step.get("stop_unless_row_has"),
+        "apis": STEP_APIS.get(call, ()),
+    }
+
+
+def compile_strategy(name, definition):
+    """
+    Compile une définition de stratégie en plan exécutable.
+
+    Chaque entrée de `steps` est une étape ou un groupe
+    `{"steps": [...], "parallel": bool, "if_best_in": [...], "unless_best_in": [...]}`
+    dont les conditions sont évaluées une fois à l'entrée du groupe. Si la
+    stratégie est `routed`, les groupes étiquetés `"provider"` peuvent être
+    permutés entre eux pour chaque ligne. Une étape `optional` est abandonnée
+    dès qu'une de ses APIs dépasse son seuil de quota souple ; `on_quota`
+    liste les étapes (sources locales) tentées si des appels ont été refusés
+    faute de quota et qu'aucun résultat n'a été trouvé.
+
+    Args:
+        name: Nom de la stratégie
+        definition: Dictionnaire (steps, routed, target_precision, budget, on_quota,
+                    error_message, error_api, label)
+
+    Returns:
+        dict: Plan normalisé (stages, target_precision, budget, ...)
+
+    Raises:
+        ValueError: Si un appel, une variante ou une précision est inconnu
+    """
+    if not definition.get("steps"):
+        raise ValueError(f"Stratégie '{name}' : aucune étape")
+
+    stages = []
+    for entry in definition["steps"]:
+        if isinstance(entry, dict) and "steps" in entry:
+            stages.append({
+                "parallel": bool(entry.get("parallel", False)),
+                "provider": entry.get("provider"),
+                **_compile_condition(name, entry),
+                "steps": [_compile_step(name, step) for step in entry["steps"]],
+            })
+        else:
+            stages.append({"parallel": False, "provider": None, "if_best_in": [], "unless_best_in": [],
+                           "steps": [_compile_step(name, entry)]})
+
+    providers = [stage["provider"] for stage in stages if stage["provider"]]
+    if len(providers) != len(set(providers)):
+        raise ValueError(f"Stratégie '{name}' : un fournisseur ne peut étiqueter qu'un seul groupe")
+
+    target_precision = definition.get("target_precision")
+    if target_precision is not None:
+        _check_precisions(name, [target_precision], PRECISION_LEVELS)
+    budget = definition.get("budget") or {}
+
+    return {
+        "name": name,
+        "label": definition.get("label", name),
+        "stages": stages,
+        "routed": bool(definition.get("routed", False)),
+        "target_precision": target_precision,
+        "max_calls": budget.get("max_calls"),
+        "max_cost": budget.get("max_cost"),
+        "on_quota": [_compile_step(name, step) for step in definition.get("on_quota", [])],
+        "error_message": definition.get("error_message", f"La stratégie '{name}' n'a retourné aucun résultat."),
+        "error_api": definition.get("error_api", "none"),
+    }
+
+
+_loaded = {"key": None, "strategies": None}
+
+
+def load_strategies(path=STRATEGIES_FILE):
+    """
+    Stratégies disponibles : intégrées, complétées par le fichier JSON.
+
+    Le fichier est relu lorsqu'il change (date de modification).
+
+    Returns:
+        dict: Nom -> plan compilé
+    """
+    mtime = os.path.getmtime(path) if path and os.path.exists(path) else None
+    key = (path, mtime)
+    if _loaded["key"] == key:
+        return _loaded["strategies"]
+
+    definitions = dict(BUILTIN_STRATEGIES)
+    if mtime is not None:
+        with open(path, encoding="utf-8") as f:
+            definitions.update(json.load(f))
+    strategies = {name: compile_strategy(name, definition) for name, definition in definitions.items()}
+    _loaded.update(key=key, strategies=strategies)
+    return strategies
+
+
+def get_strategy(name, path=STRATEGIES_FILE):
+    """Plan compilé de la stratégie `name` (KeyError si inconnue)."""
+    strategies = load_strategies(path)
+    if name not in strategies:
+        raise KeyError(f"Stratégie de géocodage inconnue : {name}")
+    return strategies[name]
+
+
+def _rank(result):
+    """Rang de précision (0 = ROOFTOP), None si aucun résultat ou précision inconnue."""
+    if result is None:
+        return None
+    level = result.get("precision_level")
+    return PRECISION_LEVELS.index(level) if level in PRECISION_LEVELS else None
+
+
+def is_better(result, previous):
+    """Vrai si `result` a une précision strictement meilleure que `previous`."""
+    new_rank, old_rank = _rank(result), _rank(previous)
+    return new_rank is not None and old_rank is not None and new_rank < old_rank
+
+
+def _condition_holds(condition, best):
+    """Évalue `if_best_in` / `unless_best_in` sur le meilleur résultat courant."""
+    current = NO_RESULT if best is None else best.get("precision_level")
+    if condition["if_best_in"] and current not in condition["if_best_in"]:
+        return False
+    return current not in condition["unless_best_in"]
+
+
+def _reaches(result, precision):
+    if precision is None or result is None:
+        return False
+    if precision == STOP_ANY:
+        return True
+    rank = _rank(result)
+    return rank is not None and rank <= PRECISION_LEVELS.index(precision)
+
+
+def _has_value(row, field):
+    return field in row and pd.notna(row[field])
+
+
+class _Run:
+    """État d'exécution d'une stratégie pour une ligne."""
+
+    def __init__(self, strategy, address, index, row, calls, variants, budget, quota):
+        self.strategy = strategy
+        self.address = address
+        self.index = index
+        self.row = row
+        self.calls = calls
+        self.variants = variants
+        self.budget = budget
+        self.quota = quota
+        self.quota_skipped = False
+        self.deadline_hit = False
+        self.best = None
+        self.transient = False
+        self.retry_after = None
+        self._queries = {}
+
+    def query(self, variant):
+        if variant is None:
+            return None
+        if variant not in self._queries:
+            self._queries[variant] = self.variants[variant](self.row, self.address)
+        return self._queries[variant]
+
+    def eligible(self, step):
+        if not _condition_holds(step, self.best):
+            return False
+        if not all(_has_value(self.row, field) for field in step["requires"]):
+            return False
+        if any(_has_value(self.row, field) for field in step["unless_row_has"]):
+            return False
+        # Échéance de la ligne passée : seules les étapes locales restent possibles
+        if step["apis"] and deadline_expired():
+            self.deadline_hit = True
+            return False
+        if self.quota is not None and not all(self.quota(api, step["optional"]) for api in step["apis"]):
+            self.quota_skipped = True
+            return False
+        if self.budget is not None:
+            return all(self.budget.try_spend(api) for api in step["apis"])
+        return True
+
+    def call(self, step):
+        return self.calls[step["call"]](step, self.row, self.query(step["variant"]), self.index)
+
+    def record(self, step, result):
+        """Retient le résultat s'il est meilleur ; retourne True s'il faut s'arrêter."""
+        if result and result.get("status") == DEADLINE_STATUS:
+            self.deadline_hit = True
+        elif result and result.get("status") == QUOTA_STATUS:
+            # Refus du registre de quotas (course avec un autre job) : repli local
+            self.quota_skipped = True
+        elif is_transient(result):
+            self.transient = True
+            self.retry_after = max(self.retry_after or 0, result.get("retry_after") or 0) or None
+        if not result or result.get("status") != "OK":
+            return False
+        if step["tag_address"]:
+            result["address_reformatted"] = self.query("reformatted")
+        adopted = self.best is None or is_better(result, self.best)
+        if adopted:
+            self.best = result
+        if adopted and _reaches(result, step["stop_at"]):
+            return True
+        if step["stop_unless_row_has"] and not _has_value(self.row, step["stop_unless_row_has"]):
+            return True
+        return _reaches(self.best, self.strategy["target_precision"])
+
+    def run_sequential(self, steps):
+        for step in steps:
+            if self.eligible(step) and self.record(step, self.call(step)):
+                return True
+        return False
+
+    def run_parallel(self, steps):
+        eligible = [step for step in steps if self.eligible(step)]
+        if not eligible:
+            return False
+        executor = ThreadPoolExecutor(max_workers=len(eligible))
+        call = bind_deadline(self.call)
+        running = {executor.submit(call, step): step for step in eligible}
+        try:
+            while running:
+                done, _ = wait(running, timeout=deadline_remaining(), return_when=FIRST_COMPLETED)
+                if not done:
+                    # Échéance : les appels encore en vol sont abandonnés
+                    self.deadline_hit = True
+                    return True
+                for future in done:
+                    step = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception:
+                        result = None
+                    if self.record(step, result):
+                        return True
+            return False
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _routed_stages(strategy, row, router):
+    """Permute les groupes étiquetés par fournisseur selon l'ordre donné par `router`."""
+    stages = strategy["stages"]
+    slots = [i for i, stage in enumerate(stages) if stage["provider"]]
+    if not strategy["routed"] or router is None or len(slots) < 2:
+        return stages
+    by_provider = {stages[i]["provider"]: stages[i] for i in slots}
+    routed = list(stages)
+    for slot, provider in zip(slots, router(row, [stages[i]["provider"] for i in slots])):
+        routed[slot] = by_provider[provider]
+    return routed
+
+
+def execute_strategy(strategy, address, index, row, calls, variants, job_budget=None, router=None, quota=None):
+    """
+    Exécute un plan compilé sur une ligne.
+
+    Un résultat n'est retenu que s'il est OK et plus précis que le meilleur
+    courant. L'exécution s'arrête dès qu'une étape retenue atteint son
+    `stop_at`, ou que le meilleur résultat atteint `target_precision`. Une
+    fois l'échéance de la ligne passée (`src/deadline.py`), plus aucun appel
+    d'API ne part : le meilleur résultat obtenu est rendu, marqué
+    `deadline_exceeded`.
+
+    Args:
+        strategy: Plan issu de `compile_strategy`
+        address: Adresse complète de la ligne (variante "original")
+        index: Index de la ligne
+        row: Ligne du DataFrame
+        calls: Appel -> fonction(step, row, query, index) retournant un résultat ou None
+        variants: Variante -> fonction(row, address) retournant la requête
+        job_budget: CallBudget du job (optionnel)
+        router: Fonction(row, fournisseurs) -> fournisseurs ordonnés (stratégies `routed`)
+        quota: Fonction(api, optional) -> bool, False si le quota interdit l'appel
+
+    Returns:
+        dict: Meilleur résultat (avec row_index), ou résultat en erreur
+    """
+    budget = None
+    if job_budget is not None or strategy["max_calls"] or strategy["max_cost"]:
+        budget = CallBudget(strategy["max_calls"], strategy["max_cost"], parent=job_budget)
+    run = _Run(strategy, address, index, row, calls, variants, budget, quota)
+
+    for stage in _routed_stages(strategy, row, router):
+        if not _condition_holds(stage, run.best):
+            continue
+        stop = run.run_parallel(stage["steps"]) if stage["parallel"] else run.run_sequential(stage["steps"])
+        if stop:
+            break
+
+    # Quota atteint ou échéance passée : repli sur les sources locales
+    if run.best is None and (run.quota_skipped or run.deadline_hit):
+        run.run_sequential(strategy["on_quota"])
+
+    if run.best:
+        run.best["row_index"] = index
+        if run.deadline_hit:
+            run.best["deadline_exceeded"] = True
+        return run.best
+    if run.deadline_hit:
+        # Le temps de la ligne est consommé : pas de replanification
+        return {
+            "row_index": index,
+            "status": DEADLINE_STATUS,
+            "error_message": "Échéance de la ligne dépassée avant tout résultat",
+            "api_used": strategy["error_api"],
+            "latitude": None,
+            "longitude": None,
+            "formatted_address": None,
+            "precision_level": None,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "deadline_exceeded": True,
+        }
+    return {
+        "row_index": index,
+        "status": "ERROR",
+        "error_message": strategy["error_message"],
+        "api_used": strategy["error_api"],
+        "latitude": None,
+        "longitude": None,
+        "formatted_address": None,
+        "precision_level": None,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # Un fournisseur a échoué temporairement : la ligne peut être replanifiée
+        **({"transient": True, "retry_after": run.retry_after} if run.transient else {}),
+    }
@@ -0,0 +1,99 @@
+"""
+Timeouts adaptatifs par fournisseur.
+
+La latence des dernières requêtes de chaque API est conservée dans une
+fenêtre glissante (`TIMEOUT_WINDOW` requêtes). Le timeout d'une requête est
+`p99 × TIMEOUT_FACTOR`, borné par `TIMEOUT_FLOOR_SECONDS` et
+`PROVIDER_TIMEOUT_SECONDS` : une connexion bloquée ne retient plus un thread
+10 s quand le fournisseur répond d'habitude en 200 ms. Tant que la fenêtre
+compte moins de `TIMEOUT_MIN_SAMPLES` requêtes, le plafond s'applique. Une
+requête expirée est comptée pour la durée attendue (borne basse) : si le
+fournisseur ralentit, le timeout remonte.
+
+Le timeout courant est exposé dans geocoder_provider_timeout_seconds.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+from src.config import (
+    ADAPTIVE_TIMEOUTS,
+    PROVIDER_TIMEOUT_SECONDS,
+    TIMEOUT_FACTOR,
+    TIMEOUT_FLOOR_SECONDS,
+    TIMEOUT_MIN_SAMPLES,
+    TIMEOUT_WINDOW,
+)
+from src.metrics import PROVIDER_TIMEOUT
+
+# Le p99 est recalculé toutes les N requêtes
+RECOMPUTE_EVERY = 10
+
+
+class AdaptiveTimeouts:
+    """
+    Fenêtres de latence et timeouts par API, sûrs entre threads.
+
+    Exemple :
+        timeouts = AdaptiveTimeouts(factor=3, floor=1, ceiling=10)
+        timeouts.record("here", 0.18)
+        timeouts.timeout("here")
+    """
+
+    def __init__(self, factor=TIMEOUT_FACTOR, floor=TIMEOUT_FLOOR_SECONDS, ceiling=PROVIDER_TIMEOUT_SECONDS,
+                 window=TIMEOUT_WINDOW, min_samples=TIMEOUT_MIN_SAMPLES):
+        self.factor = factor
+        self.floor = floor
+        self.ceiling = ceiling
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._timeouts = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def record(self, api_name, seconds):
+        """Ajoute la durée d'une requête (ou la durée attendue si elle a expiré)."""
+        with self._lock:
+            samples = self._samples.setdefault(api_name, deque(maxlen=self.window))
+            samples.append(float(seconds))
+            self._pending[api_name] = self._pending.get(api_name, 0) + 1
+            if len(samples) < self.min_samples or (
+                api_name in self._timeouts and self._pending[api_name] < RECOMPUTE_EVERY
+            ):
+                return
+            self._pending[api_name] = 0
+            p99 = float(np.percentile(np.fromiter(samples, dtype=float), 99))
+            timeout = min(self.ceiling, max(self.floor, p99 * self.factor))
+            self._timeouts[api_name] = timeout
+        PROVIDER_TIMEOUT.set(timeout, api=api_name)
+
+    def timeout(self, api_name):
+        """Timeout courant de l'API (plafond tant que la fenêtre est trop courte)."""
+        with self._lock:
+            return self._timeouts.get(api_name, self.ceiling)
+
+    def snapshot(self):
+        """{api: {"samples": n, "timeout": s}} pour l'affichage."""
+        with self._lock:
+            return {
+                api: {"samples": len(samples), "timeout": self._timeouts.get(api, self.ceiling)}
+                for api, samples in self._samples.items()
+            }
+
+
+_timeouts = AdaptiveTimeouts()
+
+
+def record_latency(api_name, seconds):
+    """Enregistre la durée d'une requête de `api_name`."""
+    if ADAPTIVE_TIMEOUTS and api_name:
+        _timeouts.record(api_name, seconds)
+
+
+def provider_timeout(api_name):
+    """Timeout à appliquer à la prochaine requête de `api_name` (secondes)."""
+    if not ADAPTIVE_TIMEOUTS or not api_name:
+        return PROVIDER_TIMEOUT_SECONDS
+    return _timeouts.timeout(api_name)
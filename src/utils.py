@@ -3,6 +3,7 @@ import os
 from datetime import datetime
 from fpdf import FPDF
 import pandas as pd
+from src.dtypes import restore_export_dtypes
 
 class PDF(FPDF):
     def header(self):
@@ -106,13 +107,42 @@ def get_precision_stats(enriched_df):
     
     return stats_lines
 
-def export_enriched_results(df, export_format="csv", sep=",", line_delimited_json=False):
+EXPORT_MIME_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "txt": "text/plain",
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+}
+
+# Compression par défaut des formats binaires
+DEFAULT_COMPRESSION = {
+    "parquet": "zstd",
+    "feather": "zstd",
+}
+
+
+def _prepare_arrow_frame(df):
+    """Rend un DataFrame sérialisable par pyarrow (colonnes object de types mélangés)."""
+    df = df.reset_index(drop=True)
+    for col in df.columns:
+        if df[col].dtype == object:
+            inferred = pd.api.types.infer_dtype(df[col], skipna=True)
+            if inferred.startswith("mixed") or inferred == "empty":
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def export_enriched_results(df, export_format="csv", sep=",", line_delimited_json=False, compression=None):
     now = datetime.now().strftime("%Y-%m-%d_%H-%M")
     filename = f"geocodage_result_{now}.{export_format}"
     output_dir = "data/output"
     os.makedirs(output_dir, exist_ok=True)
     filepath = os.path.join(output_dir, filename)
 
+    if export_format in ("csv", "json", "txt"):
+        df = restore_export_dtypes(df)
+
     if export_format == "csv":
         df.to_csv(filepath, index=False, sep=sep)
     elif export_format == "json":
@@ -122,7 +152,16 @@ def export_enriched_results(df, export_format="csv", sep=",", line_delimited_jso
             df.to_json(filepath, orient="records", indent=2, force_ascii=False)
     elif export_format == "txt":
         df.to_csv(filepath, index=False, sep=sep)
+    elif export_format in ("parquet", "feather"):
+        compression = compression or DEFAULT_COMPRESSION[export_format]
+        try:
+            if export_format == "parquet":
+                _prepare_arrow_frame(df).to_parquet(filepath, index=False, compression=compression)
+            else:
+                _prepare_arrow_frame(df).to_feather(filepath, compression=compression)
+        except ImportError as e:
+            raise ImportError(f"L'export {export_format} nécessite le paquet pyarrow (pip install pyarrow).") from e
     else:
         raise ValueError("Format d'export non supporté.")
 
-    return filepath
\ No newline at end of file
+    return filepath
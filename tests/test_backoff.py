@@ -0,0 +1,61 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+from src.backoff import backoff_delay, parse_retry_after, run_with_backoff
+from src.memo import memoize
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+def test_backoff_delay_has_jitter_cap_and_retry_after():
+    assert backoff_delay(3, rng=lambda: 1.0, base=1, cap=60) == 4
+    assert backoff_delay(10, rng=lambda: 1.0, base=1, cap=60) == 60
+    assert backoff_delay(1, rng=lambda: 0.0, base=1, cap=60) == 0
+    assert backoff_delay(1, retry_after=12, rng=lambda: 0.0, base=1, cap=60) == 12
+
+
+def test_requeued_rows_do_not_block_workers():
+    calls = Counter()
+
+    def geocode(key):
+        calls[key] += 1
+        if key == "throttled" and calls[key] < 3:
+            return {"status": "OVER_QUERY_LIMIT", "transient": True, "retry_after": None}
+        return {"status": "OK", "key": key}
+
+    report = {}
+    order = []
+    start = time.perf_counter()
+    # Un seul thread : si le délai dormait dans le thread, "fast" attendrait
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        tasks = [("throttled", ("throttled",)), ("fast", ("fast",))]
+        for key, future, attempts in run_with_backoff(executor, geocode, tasks, max_attempts=4, report=report,
+                                                      delay_func=lambda attempt, retry_after: 0.2):
+            order.append((key, attempts, future.result()["status"]))
+
+    assert order == [("fast", 1, "OK"), ("throttled", 3, "OK")]
+    assert report == {"requeued": 2, "recovered": 1, "gave_up": 0}
+    assert time.perf_counter() - start < 1.0
+
+
+def test_gives_up_after_max_attempts():
+    report = {}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        outcomes = list(run_with_backoff(executor, lambda: {"status": "ERROR", "transient": True}, [(0, ())],
+                                         max_attempts=2, report=report, delay_func=lambda a, r: 0))
+    assert [attempts for _, _, attempts in outcomes] == [2]
+    assert report["gave_up"] == 1
+
+
+def test_transient_results_are_not_memoized():
+    answers = iter([{"status": "ERROR", "transient": True}, {"status": "OK"}, {"status": "ERROR"}])
+    cached = memoize(lambda address: next(answers))
+    assert cached("a")["status"] == "ERROR"
+    assert cached("a")["status"] == "OK"
+    assert cached("a")["status"] == "OK"
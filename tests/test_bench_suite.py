@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.suite import compare, metric, vectorized_reformat
+from src.geocoding import generate_reformatted_address
+
+
+def test_compare_flags_regressions_in_both_directions():
+    baseline = {
+        "metrics": {
+            "merge.seconds": metric(1.0),
+            "geocode.c4.rows_per_s": metric(400, "rows/s", "higher"),
+            "export.csv.seconds": metric(2.0),
+        },
+        "thresholds": {"geocode.c4.rows_per_s": 0.1},
+    }
+    results = {
+        "merge.seconds": metric(1.4),
+        "geocode.c4.rows_per_s": metric(350, "rows/s", "higher"),
+        "export.csv.seconds": metric(1.0),
+        "nouvelle.metrique": metric(5.0),
+    }
+    rows = {row["metric"]: row for row in compare(results, baseline, threshold=0.5)}
+    assert not rows["merge.seconds"]["regression"]
+    assert rows["geocode.c4.rows_per_s"]["regression"]
+    assert not rows["export.csv.seconds"]["regression"]
+    assert "nouvelle.metrique" not in rows
+    assert compare(results, baseline, threshold=0.3)[0]["regression"]
+
+
+def test_vectorized_reformat_matches_per_row():
+    df = pd.DataFrame({
+        "street": ["012 RUE IBN KHALDOUN", "IMM les jasmins", "0 15 av Bourguiba", "12Rue x",
+                   "RES El Amen", "cité olympique", np.nan, "  3  "],
+        "postal_code": ["1000", np.nan, " 2080 ", "1002", "4000", "1000", "1000", np.nan],
+        "city": ["Tunis", "Ariana", np.nan, "Tunis", "Sousse", "Tunis", "Tunis", np.nan],
+        "country": ["Tunisie"] * 7 + [np.nan],
+    })
+    expected = df.apply(generate_reformatted_address, axis=1).tolist()
+    assert vectorized_reformat(df).tolist() == expected
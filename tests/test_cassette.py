@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+import src.logger
+from benchmarks.fake_server import ProviderProfile, start_fake_server
+from src import cassette as cassette_module
+from src import rate_limiter
+from src.apis import here, transport
+from src.cassette import Cassette, CassetteMiss, import_api_logs, request_key
+
+
+@pytest.fixture
+def here_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(src.logger, "LOG_FILE", str(tmp_path / "logs" / "api.json"))
+    monkeypatch.setattr(here, "reserve_call", lambda api_name: True)
+    monkeypatch.setattr(here, "acquire_rate_limit", lambda api_name, max_wait=None: 0.0)
+    server = start_fake_server({"here": ProviderProfile(latency="fixed:0.05")})
+    monkeypatch.setattr(here, "HERE_BASE_URL", server.base_url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def use(monkeypatch, cassette):
+    monkeypatch.setattr(transport, "get_cassette", lambda: cassette)
+
+
+def test_key_ignores_credentials_case_and_spacing():
+    first = request_key("here", "https://x/v1/geocode", {"q": "12 Rue  de Marseille", "apiKey": "A"})
+    second = request_key("here", "https://x/v1/geocode/?apiKey=B", {"q": "12 rue de marseille "})
+    assert first[0] == second[0]
+    assert "apiKey" not in json.dumps(first[2])
+
+
+def test_record_then_replay_without_network(here_client, tmp_path, monkeypatch):
+    path = str(tmp_path / "cassette.sqlite")
+    addresses = [f"{i} avenue Habib Bourguiba, Tunis" for i in range(5)]
+    use(monkeypatch, Cassette(path, "record"))
+    recorded = [here.geocode_with_here(address) for address in addresses]
+    assert here_client.stats[("here", "ok")] == 5
+
+    sleeps = []
+    use(monkeypatch, Cassette(path, "replay", latency="recorded", sleep=sleeps.append))
+    replayed = [here.geocode_with_here(address) for address in addresses]
+    assert here_client.stats[("here", "ok")] == 5
+    fields = ("status", "latitude", "longitude", "precision_level")
+    assert [[r[f] for f in fields] for r in replayed] == [[r[f] for f in fields] for r in recorded]
+    assert len(sleeps) == 5 and all(s >= 0.05 for s in sleeps)
+
+    use(monkeypatch, Cassette(path, "replay", latency="zero"))
+    missing = here.geocode_with_here("adresse jamais enregistrée")
+    assert missing["status"] == "ERROR" and not missing.get("transient")
+    with pytest.raises(CassetteMiss):
+        transport.http_get("https://x/v1/geocode", api_name="here", params={"q": "autre"})
+
+
+def test_import_from_api_logs(tmp_path):
+    log_path = tmp_path / "api.json"
+    entries = [
+        {"api": "here", "url": "https://geocode.search.hereapi.com/v1/geocode?q=Tunis&apiKey=S&in=countryCode%3ATUN",
+         "status": "OK", "duration": 0.2, "result": {"items": [{"position": {"lat": 36.8, "lng": 10.2}}]}},
+        {"api": "here", "url": "https://geocode.search.hereapi.com/v1/geocode?q=x",
+         "status": "ERROR", "duration": 0.1, "result": None, "error": "HTTP 503"},
+        {"api": "osm", "url": "https://nominatim.openstreetmap.org/search", "status": "success",
+         "duration": 1.0, "result": {"status": "OK"}},
+    ]
+    log_path.write_text("\n".join(json.dumps(e) for e in entries) + "\n")
+    cassette = Cassette(str(tmp_path / "cassette.sqlite"), cassette_module.MODE_REPLAY, latency="zero")
+    assert import_api_logs(log_path, cassette) == 1
+
+    response = cassette.replay("here", "https://other-host/v1/geocode",
+                               {"q": "tunis", "apiKey": "K", "in": "countryCode:TUN"})
+    assert response.json()["items"][0]["position"]["lat"] == 36.8
+
+
+def test_replay_bypasses_rate_limiter(monkeypatch):
+    acquired = []
+
+    class Bucket:
+        def acquire(self, max_wait=None):
+            acquired.append(max_wait)
+            return 1.0
+
+    monkeypatch.setattr(rate_limiter, "get_rate_limiter", lambda api_name: Bucket())
+    monkeypatch.setattr(rate_limiter, "replaying", lambda: True)
+    assert rate_limiter.acquire_rate_limit("osm") == 0.0 and acquired == []
+
+    monkeypatch.setattr(rate_limiter, "replaying", lambda: False)
+    assert rate_limiter.acquire_rate_limit("osm") == 1.0 and acquired == [None]
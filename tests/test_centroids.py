@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from src.centroids import check_against_centroids, find_centroid, geocode_from_centroids, update_centroids
+from src.geo import haversine_km
+
+
+def _job_results(n=6):
+    return pd.DataFrame({
+        "postal_code": ["1000"] * n,
+        "city": ["Tunis"] * n,
+        "status": ["OK"] * n,
+        "precision_level": ["ROOFTOP"] * n,
+        "api_used": ["here"] * n,
+        "latitude": [36.80 + i * 0.001 for i in range(n)],
+        "longitude": [10.18 + i * 0.001 for i in range(n)],
+    })
+
+
+def test_haversine_km_scalar_and_vector():
+    assert haversine_km(36.8, 10.18, 36.8, 10.18) == 0.0
+    # Tunis - Sfax : environ 230 km
+    assert haversine_km(36.8065, 10.1815, 34.7406, 10.7603) == pytest.approx(235, abs=10)
+    assert haversine_km([36.8, 34.74], [10.18, 10.76], 36.8, 10.18).shape == (2,)
+
+
+def test_update_is_incremental_and_answers_locally(tmp_path):
+    db_path = str(tmp_path / "centroids.sqlite")
+    assert update_centroids(_job_results(3), db_path=db_path) == 3
+    row = {"postal_code": 1000.0, "city": "Tunis"}
+    assert find_centroid(row, min_count=5, db_path=db_path) is None
+
+    update_centroids(_job_results(3), db_path=db_path)
+    centroid = find_centroid(row, min_count=5, db_path=db_path)
+    assert centroid["level"] == "postal_code"
+    assert centroid["count"] == 6
+
+    result = geocode_from_centroids(row, db_path=db_path)
+    assert result["api_used"] == "centroid_cache"
+    assert result["precision_level"] == "GEOMETRIC_CENTER"
+    assert result["latitude"] == pytest.approx(36.801, abs=1e-3)
+
+
+def test_local_results_are_not_learned(tmp_path):
+    db_path = str(tmp_path / "centroids.sqlite")
+    df = _job_results()
+    df["api_used"] = "gazetteer"
+    assert update_centroids(df, db_path=db_path) == 0
+
+
+def test_check_against_centroids_flags_far_results(tmp_path):
+    db_path = str(tmp_path / "centroids.sqlite")
+    update_centroids(_job_results(), db_path=db_path)
+    row = {"postal_code": "1000"}
+
+    near = check_against_centroids({"status": "OK", "latitude": 36.802, "longitude": 10.182}, row, db_path=db_path)
+    assert near["centroid_check"] == "ok"
+
+    far = check_against_centroids({"status": "OK", "latitude": 34.74, "longitude": 10.76}, row, db_path=db_path)
+    assert far["centroid_check"] == "suspect"
+    assert far["centroid_distance_km"] > 200
+
+
+def test_suspect_results_are_not_learned(tmp_path):
+    db_path = str(tmp_path / "centroids.sqlite")
+    df = _job_results()
+    df["suspicion_score"] = [0.9] + [0.0] * (len(df) - 1)
+    assert update_centroids(df, db_path=db_path) == len(df) - 1
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+
+from src.dtypes import optimize_input_dtypes
+from src.ingestion import detect_encoding, iter_file_chunks, read_file_chunked
+
+
+def _latin1_csv(rows=300):
+    lines = ["nom;rue;ville"]
+    for i in range(rows):
+        city = "Médenine" if i == rows - 1 else "Tunis"
+        lines.append(f"Societe {i};{i} Rue A;{city}")
+    return io.BytesIO(("\n".join(lines) + "\n").encode("ISO-8859-1"))
+
+
+def test_detect_encoding_latin1_at_end():
+    file = _latin1_csv()
+    assert detect_encoding(file, sample_size=256) != "utf-8"
+    assert file.tell() == 0
+
+
+@pytest.mark.parametrize("engine", ["pandas", "pyarrow"])
+def test_iter_file_chunks(engine):
+    chunks = list(iter_file_chunks(_latin1_csv(), usecols=["rue", "ville"], chunksize=128, engine=engine))
+
+    assert [len(c) for c in chunks] == [128, 128, 44]
+    assert list(chunks[0].columns) == ["rue", "ville"]
+    assert chunks[1].index[0] == 128
+    assert chunks[-1]["ville"].iloc[-1] == "Médenine"
+
+
+def test_read_file_chunked_transforms_each_block():
+    df, raw_bytes = read_file_chunked(_latin1_csv(), transform=optimize_input_dtypes, chunksize=128)
+
+    assert len(df) == 300 and list(df.index) == list(range(300))
+    assert df["ville"].iloc[-1] == "Médenine"
+    raw = next(iter_file_chunks(_latin1_csv()))
+    assert raw_bytes == raw.memory_usage(deep=True, index=False).sum()
+    assert df["ville"].dtype == optimize_input_dtypes(raw)["ville"].dtype
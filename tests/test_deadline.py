@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pandas as pd
+
+from src.apis import here
+from src.deadline import (
+    DEADLINE_STATUS,
+    bind,
+    deadline_scope,
+    latency_summary,
+    request_timeout,
+    run_row,
+)
+from src.strategies import compile_strategy, execute_strategy
+
+ROW = pd.Series({"street": "12 Rue de Marseille", "city": "Tunis"})
+VARIANTS = {"reformatted": lambda row, address: "ref", "no_name": lambda row, address: "nn",
+            "original": lambda row, address: address}
+
+
+def _calls(log, delay, precision="APPROXIMATE"):
+    def make(call):
+        def run(step, row, query, index):
+            log.append(call)
+            time.sleep(delay)
+            return {"status": "OK", "precision_level": precision, "api_used": call}
+        return run
+    return {call: make(call) for call in ("local", "here", "google", "google_place_id", "osm", "osm_structured", "centroids")}
+
+
+def test_request_timeout_shrinks_to_remaining_budget():
+    assert request_timeout("here", default=10) == 10
+    with deadline_scope(0.5):
+        assert 0.05 <= request_timeout("here", default=10) <= 0.5
+        # Une échéance imbriquée plus lointaine ne prolonge pas la première
+        with deadline_scope(30):
+            assert request_timeout("here", default=10) <= 0.5
+        seen = []
+        thread = threading.Thread(target=bind(lambda: seen.append(request_timeout("here", default=10))))
+        thread.start()
+        thread.join()
+        assert seen[0] <= 0.5
+    assert request_timeout("here", default=10) == 10
+
+
+def test_strategy_returns_best_so_far_at_deadline():
+    log = []
+    plan = compile_strategy("s", {"steps": ["here:original", "google:original", "osm:original", "centroids"]})
+
+    result = run_row(execute_strategy, plan, "addr", 0, ROW, _calls(log, 0.15), VARIANTS, seconds=0.1)
+
+    # HERE a dépassé l'échéance : Google et OSM ne partent pas, l'étape locale est jouée
+    assert log == ["here", "centroids"]
+    assert result["api_used"] == "here" and result["deadline_exceeded"]
+    assert result["row_seconds"] < 0.5
+
+
+def test_parallel_group_is_abandoned_at_deadline():
+    log = []
+    plan = compile_strategy("s", {"steps": [{"parallel": True, "steps": ["here:original", "google:original"]}]})
+
+    start = time.perf_counter()
+    with deadline_scope(0.1):
+        result = execute_strategy(plan, "addr", 0, ROW, _calls(log, 0.5), VARIANTS)
+
+    assert time.perf_counter() - start < 0.4
+    assert result["status"] == DEADLINE_STATUS and "transient" not in result
+
+
+def test_latency_summary():
+    summary = latency_summary([0.1] * 98 + [5.0, 9.0, None])
+    assert summary["p50"] == 0.1 and summary["max"] == 9.0
+    assert 5.0 <= summary["p99"] <= 9.0
+    assert latency_summary([]) == {}
+
+
+def test_provider_call_dropped_when_rate_limit_outlasts_deadline(monkeypatch):
+    reserved, waits = [], []
+    monkeypatch.setattr(here, "reserve_call", lambda api_name: reserved.append(api_name) or True)
+    monkeypatch.setattr(here, "acquire_rate_limit", lambda api_name, max_wait=None: waits.append(max_wait))
+    monkeypatch.setattr(here, "http_get", lambda *args, **kwargs: None)
+
+    with deadline_scope(5):
+        result = here.geocode_with_here("12 Rue de Marseille, Tunis")
+
+    # Jeton refusé : ni quota réservé ni requête envoyée
+    assert result["status"] == DEADLINE_STATUS
+    assert 0 < waits[0] <= 5 and reserved == []
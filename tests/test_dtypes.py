@@ -0,0 +1,56 @@
+import pandas as pd
+
+from src.dtypes import optimize_input_dtypes, optimize_result_dtypes
+from src.utils import export_enriched_results
+
+
+def _enriched_df():
+    return pd.DataFrame({
+        "street": ["1 Rue A", "2 Rue B", None, "4 Rue D"],
+        "latitude": [36.80649, 35.82561, None, 36.80649],
+        "longitude": [10.18153, 10.63696, None, 10.18153],
+        "status": ["OK", "OK", "ERROR", "OK"],
+        "api_used": ["here", "here", "none", "here"],
+        "precision_level": ["ROOFTOP", "ROOFTOP", None, "ROOFTOP"],
+        "timestamp": ["2025-01-01 10:00:00"] * 4,
+    })
+
+
+def test_result_dtype_plan():
+    df = optimize_result_dtypes(optimize_input_dtypes(_enriched_df()))
+
+    assert isinstance(df["api_used"].dtype, pd.CategoricalDtype)
+    assert df["latitude"].dtype == "float32"
+    assert pd.api.types.is_datetime64_any_dtype(df["timestamp"])
+
+
+def test_float32_only_when_lossless():
+    df = _enriched_df()
+    df.loc[0, "latitude"] = 36.8064948123
+    assert optimize_result_dtypes(df)["latitude"].dtype == "float64"
+
+
+def test_export_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    original = _enriched_df()
+    optimized = optimize_result_dtypes(optimize_input_dtypes(original))
+
+    for fmt in ("csv", "json"):
+        path_original = export_enriched_results(original, export_format=fmt)
+        with open(path_original, "rb") as f:
+            expected = f.read()
+        path_optimized = export_enriched_results(optimized, export_format=fmt)
+        with open(path_optimized, "rb") as f:
+            assert f.read() == expected
+
+
+def test_binary_export_preserves_dtypes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    optimized = optimize_result_dtypes(optimize_input_dtypes(_enriched_df()))
+
+    for fmt, reader in (("parquet", pd.read_parquet), ("feather", pd.read_feather)):
+        reloaded = reader(export_enriched_results(optimized, export_format=fmt))
+        assert isinstance(reloaded["status"].dtype, pd.CategoricalDtype)
+        assert reloaded["latitude"].dtype == "float32"
+        assert pd.api.types.is_datetime64_any_dtype(reloaded["timestamp"])
+        pd.testing.assert_frame_equal(reloaded, optimized, check_dtype=False, check_categorical=False)
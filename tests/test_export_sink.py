@@ -0,0 +1,58 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.export_sink import ExportSink, csv_download
+
+
+BATCHES = [
+    pd.DataFrame({"name": ["A", "B"], "latitude": [None, None], "status": ["ERROR", "ERROR"]}),
+    pd.DataFrame({"name": ["C"], "latitude": [36.8065], "status": ["OK"], "osm_type": ["house"]}),
+]
+
+
+@pytest.mark.parametrize("export_format", ["csv", "ndjson", "parquet"])
+def test_sink_appends_batches(tmp_path, export_format):
+    path = tmp_path / "jobs" / f"job.{export_format}"
+    with ExportSink(str(path), export_format=export_format) as sink:
+        for batch in BATCHES:
+            sink.write_batch(batch)
+
+    assert sink.rows_written == 3
+    if export_format == "csv":
+        df = pd.read_csv(path)
+    elif export_format == "parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.DataFrame([json.loads(line) for line in path.read_text().splitlines()])
+
+    assert df["name"].tolist() == ["A", "B", "C"]
+    assert df["latitude"].iloc[2] == 36.8065
+    # Colonne apparue au deuxième batch : conservée
+    assert df["osm_type"].iloc[2] == "house"
+
+
+@pytest.mark.parametrize("export_format", ["csv", "parquet"])
+def test_sink_extends_schema_for_unknown_column(tmp_path, export_format):
+    path = tmp_path / f"job.{export_format}"
+    with ExportSink(str(path), export_format=export_format) as sink:
+        sink.write_batch(BATCHES[0])
+        sink.write_batch(pd.DataFrame({"name": ["C"], "latitude": [36.8], "status": ["OK"], "region_code": ["TN-11"]}))
+        sink.write_batch(BATCHES[0])
+
+    df = pd.read_csv(path) if export_format == "csv" else pd.read_parquet(path)
+    assert df["name"].tolist() == ["A", "B", "C", "A", "B"]
+    # Colonne inconnue apparue au deuxième batch : ajoutée, vide pour les autres lignes
+    assert df["region_code"].iloc[2] == "TN-11"
+    assert df["region_code"].isna().sum() == 4
+    assert df["latitude"].iloc[2] == 36.8
+
+
+def test_csv_download_writes_a_private_file_per_click():
+    df = pd.DataFrame({"address": ["Rue de Marseille"], "latitude": [36.8]})
+    download = csv_download(df)
+
+    first, second = download(), download()
+    assert first.read() == second.read() == b"address,latitude\nRue de Marseille,36.8\n"
+    assert first.fileno() != second.fileno()
@@ -0,0 +1,67 @@
+import pytest
+
+import src.logger
+from benchmarks.fake_providers import fake_result
+from benchmarks.fake_server import ProviderProfile, start_fake_server
+from src.apis import google, here, osm
+
+
+@pytest.fixture
+def clients(tmp_path, monkeypatch):
+    """Clients réels redirigés vers le serveur factice, sans quota ni limiteur."""
+    monkeypatch.setattr(src.logger, "LOG_FILE", str(tmp_path / "logs" / "api.json"))
+    for module in (here, google, osm):
+        monkeypatch.setattr(module, "reserve_call", lambda api_name: True)
+        monkeypatch.setattr(module, "acquire_rate_limit", lambda api_name, max_wait=None: 0.0)
+
+    def start(profiles=None):
+        server = start_fake_server(profiles)
+        monkeypatch.setattr(here, "HERE_BASE_URL", server.base_url)
+        monkeypatch.setattr(google, "GOOGLE_BASE_URL", server.base_url)
+        monkeypatch.setattr(osm, "OSM_BASE_URL", server.base_url)
+        servers.append(server)
+        return server
+
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _address(api_name, status):
+    """Première adresse dont le résultat simulé a le statut voulu."""
+    return next(f"{i} rue de Marseille, Tunis" for i in range(500)
+                if fake_result(api_name, f"{i} rue de Marseille, Tunis")["status"] == status)
+
+
+def test_clients_parse_fake_responses(clients):
+    clients()
+    address = _address("here", "OK")
+    result = here.geocode_with_here(address)
+    expected = fake_result("here", address)
+    assert result["status"] == "OK"
+    assert result["precision_level"] == expected["precision_level"]
+    assert result["latitude"] == pytest.approx(expected["latitude"])
+
+    assert here.geocode_with_here(_address("here", "ZERO_RESULTS"))["status"] == "ZERO_RESULTS"
+
+    address = _address("google", "OK")
+    result = google.geocode_with_google(address=address)
+    assert result["precision_level"] == fake_result("google", address)["precision_level"]
+
+    address = _address("osm", "OK")
+    result = osm.geocode_with_osm(address)
+    assert result["status"] == "OK"
+    assert result["precision_level"] == fake_result("osm", address)["precision_level"]
+
+
+def test_injected_throttling_is_transient(clients):
+    server = clients({api: ProviderProfile(throttle_rate=1.0, retry_after=3)
+                      for api in ("here", "google", "osm")})
+    result = here.geocode_with_here("12 rue de Marseille, Tunis")
+    assert result["status"] == "ERROR" and result["transient"]
+    assert result["retry_after"] == 3
+    assert google.geocode_with_google(address="12 rue de Marseille, Tunis")["transient"]
+    assert osm.geocode_with_osm("12 rue de Marseille, Tunis")["transient"]
+    assert server.stats[("here", "throttle")] == 1
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from src.fuzzy_index import FuzzyIndex, fuzzy_lookup, normalize_address, update_fuzzy_index
+from benchmarks.eval_fuzzy_index import evaluate, synthetic_sample
+
+
+def test_normalize_address_ignores_street_type_order_and_zeros():
+    assert normalize_address("012 Rue de Marseille") == normalize_address("Marseille 12")
+    assert normalize_address("Avenue Habib Bourguiba") == "bourguiba habib"
+
+
+def test_lookup_requires_same_numbers_and_block():
+    index = FuzzyIndex(threshold=0.7)
+    index.add("cp:1000", normalize_address("12 Rue de Marseille"), {"latitude": 36.8})
+
+    score, result, _ = index.lookup("cp:1000", normalize_address("12 rue de Marseile"))
+    assert score >= 0.7 and result["latitude"] == 36.8
+    assert index.lookup("cp:1000", normalize_address("14 Rue de Marseille")) is None
+    assert index.lookup("cp:2080", normalize_address("12 Rue de Marseille")) is None
+
+
+def test_fuzzy_lookup_reuses_stored_result(tmp_path):
+    db_path = str(tmp_path / "fuzzy.sqlite")
+    enriched = pd.DataFrame([{
+        "street": "12 Rue de Marseille", "postal_code": "1000", "city": "Tunis",
+        "status": "OK", "precision_level": "ROOFTOP", "precision_level_raw": "houseNumber",
+        "api_used": "here", "latitude": 36.8, "longitude": 10.18,
+        "formatted_address": "12 Rue de Marseille, 1000 Tunis",
+    }])
+    assert update_fuzzy_index(enriched, db_path=db_path) == 1
+
+    result = fuzzy_lookup({"street": "12 MARSEILLE", "postal_code": 1000}, db_path=db_path, threshold=0.7)
+    assert result["api_used"] == "fuzzy_cache"
+    assert result["source_api"] == "here"
+    assert result["precision_level"] == "ROOFTOP"
+    assert result["answered_locally"] is True
+
+
+def test_synthetic_evaluation_is_precise():
+    report = evaluate(synthetic_sample(places=300), thresholds=[0.7])
+    assert report.loc[0, "précision"] >= 0.99
+    assert report.loc[0, "rappel"] >= 0.6
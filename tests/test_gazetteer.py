@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from src.gazetteer import build_gazetteer, geocode_locally, lookup, normalize_postal_code
+from src.geocoding import geocode_row_with_fallback
+
+
+def test_normalize_postal_code():
+    assert normalize_postal_code(1000) == "1000"
+    assert normalize_postal_code("2080.0") == "2080"
+    assert normalize_postal_code(None) == ""
+
+
+def test_lookup_from_compiled_index(tmp_path):
+    index_path = build_gazetteer(output_path=str(tmp_path / "gaz.npy"))
+    index = np.load(index_path, mmap_mode="r")
+
+    assert lookup(postal_code="3000", index=index)["match"] == "postal_code"
+    assert lookup(city="Hammamet", index=index)["governorate"] == "Nabeul"
+    assert lookup(city="Inconnue", governorate="Sousse", index=index)["match"] == "governorate"
+    assert lookup(city="Inconnue", index=index) is None
+    # Référentiel incomplet : pas de repli sur le gouvernorat pour une ville inconnue
+    assert lookup(city="Inconnue", governorate="Sousse", index=index, exact=True) is None
+    assert lookup(city="Hammamet", governorate="Nabeul", index=index, exact=True)["match"] == "locality"
+
+
+def test_geocode_locally_requires_coarse_row():
+    coarse = pd.Series({"postal_code": "1000", "city": "Tunis", "country": "Tunisie"})
+    result = geocode_locally(coarse)
+    assert result["answered_locally"] is True
+    assert result["precision_level"] == "GEOMETRIC_CENTER"
+
+    # Une rue exige une précision que le gazetteer ne peut pas fournir
+    assert geocode_locally(pd.Series({"street": "Rue de Marseille", "city": "Tunis"})) is None
+    # Code postal inconnu : pas de repli silencieux sur la ville
+    assert geocode_locally(pd.Series({"postal_code": "9999", "city": "Tunis"})) is None
+    # Ville absente de l'échantillon livré : la ligne part vers les APIs
+    assert geocode_locally(pd.Series({"city": "Inconnue", "governorate": "Sousse"})) is None
+
+
+def test_fallback_skips_network_for_coarse_rows(monkeypatch):
+    def no_network(*args, **kwargs):
+        raise AssertionError("appel API inattendu")
+
+    monkeypatch.setattr("src.geocoding.geocode_with_here_cached", no_network)
+    monkeypatch.setattr("src.geocoding.geocode_with_google", no_network)
+    row = pd.Series({"city": "Sfax", "country": "Tunisie"})
+
+    result = geocode_row_with_fallback(None, 7, row, {})
+    assert result["api_used"] == "gazetteer"
+    assert result["precision_level"] == "APPROXIMATE"
+    assert result["row_index"] == 7
@@ -0,0 +1,86 @@
+import socket
+import urllib.request
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+import src.logger
+from src.apis import here
+from src.geocoding import parallel_geocode_row
+from src.metrics import API_CALLS, ROWS_PROCESSED, start_metrics_server, stop_metrics_server, write_textfile
+
+
+class FakeHereResponse:
+    """Réponse HERE factice : un résultat ROOFTOP pour toute adresse."""
+    status_code = 200
+    url = "https://geocode.search.hereapi.com/v1/geocode"
+
+    def json(self):
+        return {
+            "items": [{
+                "position": {"lat": 36.8065, "lng": 10.1815},
+                "address": {"label": "Tunis, Tunisie"},
+                "resultType": "houseNumber",
+            }]
+        }
+
+
+@pytest.fixture
+def fake_here(monkeypatch, tmp_path):
+    monkeypatch.setattr(src.logger, "LOG_FILE", str(tmp_path / "logs" / "api.json"))
+    monkeypatch.setattr(here, "http_get", lambda *args, **kwargs: FakeHereResponse())
+
+
+def test_metrics_endpoint_scrape(fake_here):
+    calls_before = API_CALLS.get(api="here", status="OK")
+    rows_before = ROWS_PROCESSED.get(api="here", status="OK", precision="ROOFTOP")
+
+    st.session_state.mapping_config = {"fields": {}}
+    df = pd.DataFrame({
+        "full_address": ["1 Rue A, Tunis", "2 Rue B, Tunis"],
+        "street": ["1 Rue A metrics", "2 Rue B metrics"],
+        "city": ["Tunis", "Tunis"],
+    })
+    result_df = parallel_geocode_row(df, max_workers=2, api_mode="here")
+    assert (result_df["status"] == "OK").all()
+
+    server = start_metrics_server(0)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read().decode()
+    finally:
+        stop_metrics_server()
+
+    assert "# TYPE geocoder_api_calls_total counter" in body
+    assert f'geocoder_api_calls_total{{api="here",status="OK"}} {calls_before + 2}' in body
+    assert (
+        f'geocoder_rows_total{{api="here",status="OK",precision="ROOFTOP"}} {rows_before + 2}' in body
+    )
+    assert 'geocoder_api_call_duration_seconds_bucket{api="here",le="+Inf"}' in body
+    assert 'geocoder_cache_misses_total{api="here"}' in body
+    assert 'geocoder_queue_depth{queue="geocoding"} 0' in body
+
+
+def test_metrics_textfile(fake_here, tmp_path):
+    here.geocode_with_here("3 Rue C, Tunis")
+
+    path = write_textfile(str(tmp_path / "textfile" / "geocoder.prom"))
+
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    assert 'geocoder_api_calls_total{api="here",status="OK"}' in content
+
+
+def test_metrics_server_port_in_use_is_reported_once(capsys):
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+        try:
+            assert start_metrics_server(port) is None
+            # Rerun Streamlit : pas de nouvelle tentative ni de nouveau message
+            assert start_metrics_server(port) is None
+        finally:
+            stop_metrics_server()
+    assert capsys.readouterr().out.count("/metrics non démarré") == 1
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from src.plausibility import compute_suspicion_scores, select_suspect_rows
+
+
+def _enriched():
+    return pd.DataFrame({
+        "status": ["OK", "OK", "OK", "OK", "ERROR"],
+        "precision_level": ["APPROXIMATE", "ROOFTOP", "ROOFTOP", "ROOFTOP", None],
+        "postal_code": ["1000", "3000", None, "1000", None],
+        "city": ["Tunis", "Sfax", "Sousse", "Tunis", None],
+        "governorate": ["Tunis", "Sfax", "Sousse", "Sfax", None],
+        "latitude": [36.80, 36.80, 48.85, 36.81, None],
+        "longitude": [10.18, 10.18, 2.35, 10.17, None],
+    })
+
+
+def test_suspicion_checks():
+    scores = compute_suspicion_scores(_enriched())
+
+    # APPROXIMATE mais au bon endroit : pas suspect
+    assert scores.loc[0, "suspicion_score"] == 0
+    # Sfax déclaré, point à Tunis
+    assert scores.loc[1, "reference_distance_km"] > 200
+    assert bool(scores.loc[1, "governorate_mismatch"])
+    # Paris
+    assert bool(scores.loc[2, "outside_tunisia"])
+    assert scores.loc[2, "suspicion_score"] == 1
+    assert "hors Tunisie" in scores.loc[2, "suspicion_reasons"]
+    # Échec : non noté
+    assert np.isnan(scores.loc[4, "suspicion_score"])
+
+
+def test_select_suspect_rows():
+    selected = select_suspect_rows(_enriched(), threshold=0.8)
+    assert list(selected.index) == [1, 2]
+
+    # Scores déjà joints au DataFrame (page de relance) : colonnes remplacées, pas dupliquées
+    df = _enriched()
+    scores = compute_suspicion_scores(df)
+    df = df.join(scores[["suspicion_score", "suspicion_reasons"]])
+    selected = select_suspect_rows(df, threshold=0.8, scores=scores)
+    assert list(selected.index) == [1, 2]
+    assert list(selected.columns) == list(df.columns)
+
+
+def test_reference_resolved_once_per_normalized_key(monkeypatch):
+    import src.plausibility as plausibility
+
+    calls = []
+    monkeypatch.setattr(plausibility, "find_centroid", lambda record: calls.append(record))
+    df = pd.DataFrame({
+        "status": ["OK"] * 4,
+        "postal_code": [3000, "3000", "3000.0", None],
+        "city": ["Sfax", "SFAX", " sfax", None],
+        "latitude": [36.80, 34.74, 34.74, 34.74],
+        "longitude": [10.18, 10.76, 10.76, 10.76],
+    })
+
+    scores = compute_suspicion_scores(df)
+    assert len(calls) == 2
+    assert scores["reference_distance_km"].iloc[0] > 100
+    assert scores["reference_distance_km"].iloc[1] == scores["reference_distance_km"].iloc[2] < 5
+    assert np.isnan(scores["reference_distance_km"].iloc[3])
@@ -0,0 +1,46 @@
+import json
+import re
+import threading
+import time
+import tracemalloc
+
+from src.profiling import profile_job, summary_frames
+
+
+def busy_reformat(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        re.sub(r"\b(IMM?|ILL)\b", "Immeuble", "12 IMM les jasmins")
+
+
+def test_profile_covers_worker_threads_and_allocations(tmp_path):
+    kept = []
+    with profile_job("JOB_TEST", enabled=True, directory=str(tmp_path)) as summary:
+        worker = threading.Thread(target=busy_reformat, args=(0.3,))
+        worker.start()
+        kept.append(bytearray(2 * 1024 * 1024))
+        worker.join()
+
+    assert summary["samples"] > 10
+    functions = [row["function"] for row in summary["top_cumulative"]]
+    assert any("busy_reformat" in function for function in functions)
+    assert not any(function.startswith("threading.py") for function in functions)
+    assert summary["top_allocations"][0]["size_kb"] >= 2048
+    assert "test_profiling.py" in summary["top_allocations"][0]["site"]
+    assert not tracemalloc.is_tracing()
+
+    path = tmp_path / "JOB_TEST"
+    assert json.loads((path / "summary.json").read_text())["hotspot"] == summary["hotspot"]
+    assert "busy_reformat" in (path / "stacks.txt").read_text()
+    assert tracemalloc.Snapshot.load(str(path / "tracemalloc.snapshot")).traces
+
+    functions_df, allocations_df = summary_frames(summary)
+    assert len(functions_df) == len(summary["top_cumulative"])
+    assert "Site" in allocations_df.columns
+
+
+def test_disabled_profile_is_a_no_op(tmp_path):
+    with profile_job("JOB_OFF", enabled=False, directory=str(tmp_path)) as summary:
+        pass
+    assert summary is None
+    assert not (tmp_path / "JOB_OFF").exists()
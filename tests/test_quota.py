@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pandas as pd
+
+import src.logger
+from src import quota
+from src.apis import here
+from src.backoff import is_transient
+from src.geocoding import geocode_with_here_cached
+from src.quota import QUOTA_HARD, QUOTA_OK, QUOTA_SOFT, QUOTA_STATUS, quota_state, reserve_call
+from src.strategies import compile_strategy, execute_strategy
+
+
+def test_ledger_enforces_hard_limit_and_reports_soft(tmp_path):
+    db_path = str(tmp_path / "quota.sqlite")
+    limits = {"day": 10}
+
+    assert all(reserve_call("here", db_path, limits) for _ in range(7))
+    assert quota_state("here", db_path, limits) == QUOTA_OK
+    assert reserve_call("here", db_path, limits)
+    assert quota_state("here", db_path, limits) == QUOTA_SOFT
+    assert reserve_call("here", db_path, limits) and reserve_call("here", db_path, limits)
+    assert not reserve_call("here", db_path, limits)
+    assert quota_state("here", db_path, limits) == QUOTA_HARD
+
+    # Nouveau jour : compteur journalier remis à zéro, compteur mensuel conservé
+    tomorrow = datetime(2099, 1, 2)
+    assert reserve_call("here", db_path, limits, now=tomorrow)
+    assert not reserve_call("here", db_path, {"month": 1}, now=tomorrow)
+
+
+def test_strategy_degrades_with_quota():
+    strategy = compile_strategy("s", {
+        "on_quota": ["centroids"],
+        "steps": [{"call": "google_place_id", "optional": True}, "google"],
+    })
+    log = []
+    calls = {call: (lambda call: lambda step, row, query, index: log.append(call) or (
+        {"status": "OK", "precision_level": "APPROXIMATE"} if call == "centroids" else None))(call)
+        for call in ("google_place_id", "google", "centroids")}
+    variants = {"reformatted": lambda row, address: address}
+    row = pd.Series({"name": "Societe X"})
+
+    soft = {"google": quota.QUOTA_SOFT, "google_places": quota.QUOTA_SOFT}
+    execute_strategy(strategy, "a", 0, row, calls, variants,
+                     quota=lambda api, optional: not (optional and soft[api] == quota.QUOTA_SOFT))
+    assert log == ["google", "centroids"]
+
+    log.clear()
+    result = execute_strategy(strategy, "a", 0, row, calls, variants, quota=lambda api, optional: False)
+    assert log == ["centroids"] and result["status"] == "OK"
+
+
+class FakeHereResponse:
+    status_code = 200
+    url = "https://geocode.search.hereapi.com/v1/geocode"
+
+    def json(self):
+        return {"items": [{"position": {"lat": 36.8, "lng": 10.18}, "address": {"label": "Tunis"},
+                           "resultType": "houseNumber"}]}
+
+
+def test_quota_refusal_not_cached_nor_rescheduled(monkeypatch, tmp_path):
+    monkeypatch.setattr(src.logger, "LOG_FILE", str(tmp_path / "logs" / "api.json"))
+    requests_sent = []
+    monkeypatch.setattr(here, "http_get", lambda *args, **kwargs: requests_sent.append(args) or FakeHereResponse())
+    allowed = [False]
+    monkeypatch.setattr(here, "reserve_call", lambda api_name: allowed[0])
+
+    address = "7 Rue du Quota, Tunis"
+    result = geocode_with_here_cached(address)
+    assert result["status"] == QUOTA_STATUS and not requests_sent
+    assert not is_transient(result)
+
+    # Plafond relevé : la ligne est à nouveau géocodée, sans réponse QUOTA_EXCEEDED en cache
+    allowed[0] = True
+    assert geocode_with_here_cached(address)["status"] == "OK"
+    assert len(requests_sent) == 1
@@ -0,0 +1,119 @@
+import multiprocessing
+import threading
+import time
+
+from src import geocoding_retry, quota
+from src.call_budget import CallBudget
+from src.rate_limiter import SharedTokenBucket, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_spaces_calls_after_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] > 0
+    # 4 appels à 2/s avec 2 jetons d'avance : 1 seconde au total
+    assert abs(clock.now - 1.0) < 1e-9
+
+
+def test_token_bucket_gives_back_token_beyond_max_wait(tmp_path):
+    for bucket_class, kwargs in ((TokenBucket, {}), (SharedTokenBucket, {"api_name": "osm", "db_path": str(tmp_path / "rl.sqlite")})):
+        clock = FakeClock()
+        bucket = bucket_class(rate=1, burst=1, clock=clock, sleep=clock.sleep, **kwargs)
+
+        assert bucket.acquire() == 0.0
+        # Jeton disponible dans 1 s, échéance dans 0,5 s : refus immédiat, jeton rendu
+        assert bucket.acquire(max_wait=0.5) is None
+        assert clock.now == 0.0
+        assert bucket.acquire(max_wait=2) == 1.0
+
+
+def test_fan_out_stops_at_first_rooftop_with_bounded_overhead():
+    calls = []
+    lock = threading.Lock()
+
+    def call(step, row):
+        with lock:
+            calls.append(step["address"])
+        time.sleep(0.05 if step["address"] == "a" else 0.2)
+        precision = "ROOFTOP" if step["address"] == "a" else "APPROXIMATE"
+        return {"status": "OK", "precision_level": precision}
+
+    steps = [{"kind": "here", "api": "here", "address": a, "cached": False} for a in "abcdef"]
+    original = geocoding_retry._call_variant
+    geocoding_retry._call_variant = call
+    try:
+        budget = CallBudget(max_calls=10)
+        results = geocoding_retry.fan_out_steps(steps, None, budget, "ROOFTOP", width=3)
+    finally:
+        geocoding_retry._call_variant = original
+
+    assert [step["address"] for step, _ in results] == ["a"]
+    # Séquentiel : 1 appel ; en parallèle, au plus width - 1 appels en plus
+    assert len(calls) <= 3 and budget.summary()["calls"] <= 3
+
+
+def _acquire_shared(db_path, rate, count, stamps):
+    bucket = SharedTokenBucket("osm", rate=rate, burst=1, db_path=db_path)
+    for _ in range(count):
+        bucket.acquire()
+        stamps.append(time.time())
+
+
+def test_shared_bucket_limits_combined_rate_across_processes(tmp_path):
+    db_path = str(tmp_path / "rate_limits.sqlite")
+    rate, workers, per_worker = 20, 4, 8
+    context = multiprocessing.get_context("fork")
+    with context.Manager() as manager:
+        stamps = manager.list()
+        processes = [
+            context.Process(target=_acquire_shared, args=(db_path, rate, per_worker, stamps))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        stamps = sorted(stamps)
+
+    assert len(stamps) == workers * per_worker
+    # Sur toute fenêtre, au plus burst + rate × durée appels (petite marge d'horloge)
+    for i, start in enumerate(stamps):
+        for j in range(i + 1, len(stamps)):
+            assert j - i <= 1 + rate * (stamps[j] - start) + 0.5
+
+
+def _reserve_quota(db_path, count, allowed):
+    for _ in range(count):
+        allowed.append(quota.reserve_call("google", db_path=db_path, limits={"day": 50}))
+
+
+def test_quota_ledger_is_exact_across_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(quota, "QUOTA_ENABLED", True)
+    db_path = str(tmp_path / "quota.sqlite")
+    context = multiprocessing.get_context("fork")
+    with context.Manager() as manager:
+        allowed = manager.list()
+        processes = [context.Process(target=_reserve_quota, args=(db_path, 20, allowed)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        allowed = list(allowed)
+
+    assert len(allowed) == 80
+    assert sum(allowed) == 50
@@ -0,0 +1,106 @@
+import pandas as pd
+
+from src import geocoding_retry
+from src.call_budget import CallBudget
+from src.geocoding_retry import build_retry_plan, generate_alternative_addresses, intelligent_retry_geocode
+
+
+def _row():
+    return pd.Series({
+        "name": "Societe X", "street": "12 Rue de Marseille", "postal_code": "1000",
+        "city": "Tunis", "country": "Tunisie", "full_address": "Societe X, 12 Rue de Marseille, Tunis",
+        "status": "OK", "precision_level": "APPROXIMATE", "api_used": "here",
+    })
+
+
+def _ok(api, precision):
+    return {"status": "OK", "api_used": api, "precision_level": precision, "latitude": 36.8, "longitude": 10.18}
+
+
+def _fake_providers(monkeypatch, calls, here_precision="GEOMETRIC_CENTER", google_precision="ROOFTOP"):
+    def here(address):
+        calls.append("here")
+        return _ok("here", here_precision)
+
+    def google(address, *components):
+        calls.append("google")
+        return _ok("google", google_precision)
+
+    def osm(address):
+        calls.append("osm")
+        return {"status": "ERROR"}
+
+    for name, fake in [("geocode_with_here_cached", here), ("geocode_with_google_cached", google),
+                       ("geocode_with_osm_cached", osm)]:
+        fake.cache_contains = lambda *args: False
+        monkeypatch.setattr(geocoding_retry, name, fake)
+    monkeypatch.setattr(geocoding_retry, "get_place_id_with_google", lambda q: calls.append("places"))
+    monkeypatch.setattr(geocoding_retry, "geocode_with_osm_structured", lambda **kw: calls.append("osm") or None)
+
+
+def test_plan_puts_cached_then_cheap_calls_first(monkeypatch):
+    _fake_providers(monkeypatch, [])
+    geocoding_retry.geocode_with_google_cached.cache_contains = lambda address, *c: address.startswith("12")
+    row = _row()
+    plan = build_retry_plan(row, generate_alternative_addresses(row), current_api="here")
+
+    kinds = [step["kind"] for step in plan]
+    # Appels en cache (gratuits), puis coût croissant ; HERE a déjà donné le
+    # résultat actuel : relégué en fin de plan
+    assert [step["cached"] for step in plan[:2]] == [True, False]
+    assert kinds == ["google", "osm", "osm", "osm_structured",
+                     "google", "google_place_id", "here", "here"]
+
+
+def test_stops_at_target_precision(monkeypatch):
+    calls = []
+    _fake_providers(monkeypatch, calls, here_precision="GEOMETRIC_CENTER")
+    row = _row().drop(["api_used", "name"])
+
+    result = intelligent_retry_geocode(row, 0, target_precision="GEOMETRIC_CENTER")
+    assert calls == ["here"]
+    assert result["retry_calls"] == 1
+
+
+def test_row_and_job_budgets_are_enforced(monkeypatch):
+    calls = []
+    _fake_providers(monkeypatch, calls, here_precision="APPROXIMATE", google_precision="APPROXIMATE")
+    monkeypatch.setattr(geocoding_retry, "RETRY_MAX_CALLS_PER_ROW", 2)
+    job_budget = CallBudget(max_calls=3)
+
+    first = intelligent_retry_geocode(_row(), 0, job_budget=job_budget)
+    second = intelligent_retry_geocode(_row(), 1, job_budget=job_budget)
+
+    assert len(calls) == 3
+    assert first["retry_calls"] == 2 and second["retry_calls"] == 1
+    assert first["retry_calls_skipped"] > 0
+    assert job_budget.summary()["skipped"] == first["retry_calls_skipped"] + second["retry_calls_skipped"]
+
+
+def test_suspect_row_is_relocated_not_served_from_cache(monkeypatch):
+    calls = []
+    _fake_providers(monkeypatch, calls, here_precision="ROOFTOP", google_precision="ROOFTOP")
+    paris = {"status": "OK", "api_used": "here", "precision_level": "ROOFTOP", "latitude": 48.85, "longitude": 2.35}
+    # Le cache mémoire de HERE rendrait le point suspect ; l'appel direct aussi
+    geocoding_retry.geocode_with_here_cached.cache_contains = lambda *args: True
+    geocoding_retry.geocode_with_here_cached.__wrapped__ = lambda address: calls.append("here:fresh") or dict(paris)
+    monkeypatch.setattr(geocoding_retry, "GAZETTEER_ENABLED", False)
+    row = _row().drop("name")
+    row["previous_status"], row["previous_precision_level"], row["previous_api_used"] = "OK", "ROOFTOP", "here"
+    row["previous_latitude"], row["previous_longitude"], row["previous_suspicion_score"] = 48.85, 2.35, 1.0
+
+    plan = build_retry_plan(row, generate_alternative_addresses(row), current_api="here", fresh=True)
+    assert all(step["fresh"] and not step["cached"] for step in plan if step["api"] == "here")
+
+    result = intelligent_retry_geocode(row, 0)
+    assert result["api_used"] == "google" and result["improved"]
+    assert result["suspicion_score"] < 1.0
+
+    # Aucun autre point plausible : l'ancien résultat est conservé, non amélioré
+    calls.clear()
+    monkeypatch.setattr(geocoding_retry, "geocode_with_google_cached",
+                        lambda address, *components: calls.append("google") or dict(paris, api_used="google"))
+    geocoding_retry.geocode_with_google_cached.cache_contains = lambda *args: False
+    result = intelligent_retry_geocode(row, 0)
+    assert "here:fresh" in calls and "here" not in calls
+    assert result["status"] == "OK" and result["latitude"] == 48.85 and not result["improved"]
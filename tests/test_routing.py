@@ -0,0 +1,92 @@
+import time
+
+import pandas as pd
+
+from src import rate_limiter, routing
+from src.deadline import deadline_exceeded_result
+from src.quota import quota_exceeded_result
+from src.routing import (
+    address_shape,
+    load_routing_model,
+    record_attempt,
+    route_providers,
+    tracked_call,
+    update_routing_model,
+)
+from src.strategies import compile_strategy, execute_strategy
+
+
+def _row(governorate, city="Centre", street="12 Rue de Marseille"):
+    return pd.Series({"name": None, "street": street, "city": city, "governorate": governorate})
+
+
+def test_address_shape():
+    assert address_shape(_row("Tunis")) == "street_number"
+    assert address_shape(_row("Tunis", street="Rue de Marseille")) == "street"
+    assert address_shape(pd.Series({"name": "Societe X", "city": "Tunis"})) == "name+area"
+
+
+def test_providers_routed_per_governorate(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "routing.sqlite")
+    # Tentatives enregistrées par d'autres tests
+    update_routing_model(str(tmp_path / "other.sqlite"))
+    monkeypatch.setattr(routing, "ROUTING_MIN_ATTEMPTS", 20)
+    providers = ["here", "google", "osm"]
+    assert route_providers(_row("Sfax"), providers, model={}) == providers
+
+    rooftop = {"status": "OK", "precision_level": "ROOFTOP"}
+    approx = {"status": "OK", "precision_level": "APPROXIMATE"}
+    for i in range(40):
+        for governorate, strong in [("Sfax", "google"), ("Tunis", "here")]:
+            row = _row(governorate)
+            for api in providers:
+                record_attempt(row, api, rooftop if api == strong and i % 10 else approx, 0.2)
+    assert update_routing_model(db_path) == 240
+
+    model = load_routing_model(db_path)
+    assert route_providers(_row("Sfax"), providers, model)[0] == "google"
+    assert route_providers(_row("Tunis"), providers, model)[0] == "here"
+    # Nouvelle ville : les statistiques du gouvernorat s'appliquent
+    assert route_providers(_row("Sfax", city="Agareb"), providers, model)[0] == "google"
+
+
+def test_routed_strategy_reorders_provider_groups():
+    strategy = compile_strategy("s", {"routed": True, "steps": [
+        "local@ANY",
+        {"provider": "here", "steps": ["here@ROOFTOP"]},
+        "centroids",
+        {"provider": "osm", "steps": ["osm@ROOFTOP"]},
+    ]})
+    log = []
+    calls = {call: (lambda call: lambda step, row, query, index: log.append(call))(call)
+             for call in ("local", "here", "osm", "centroids")}
+    variants = {"reformatted": lambda row, address: address}
+    execute_strategy(strategy, "a", 0, _row("Tunis"), calls, variants,
+                     router=lambda row, providers: list(reversed(providers)))
+    assert log == ["local", "osm", "centroids", "here"]
+
+
+def test_control_statuses_not_recorded(tmp_path):
+    update_routing_model(str(tmp_path / "other.sqlite"))
+    record_attempt(_row("Sfax"), "here", quota_exceeded_result("here"), 0.0)
+    record_attempt(_row("Sfax"), "google", deadline_exceeded_result("google"), 0.0)
+    assert update_routing_model(str(tmp_path / "routing.sqlite")) == 0
+
+
+def test_tracked_latency_excludes_rate_limiter_wait(monkeypatch):
+    class SlowBucket:
+        def acquire(self, max_wait=None):
+            time.sleep(0.2)
+            return 0.2
+
+    def call(address):
+        rate_limiter.acquire_rate_limit("here")
+        time.sleep(0.05)
+        return {"status": "OK", "precision_level": "ROOFTOP"}
+
+    monkeypatch.setattr(rate_limiter, "get_rate_limiter", lambda api_name: SlowBucket())
+    monkeypatch.setattr(routing, "ROUTING_ENABLED", True)
+    tracked_call("here", _row("Tunis"), call, "12 Rue de Marseille")
+
+    elapsed = routing._pending[-1][-1]
+    assert 0.04 <= elapsed < 0.15
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from src.scheduler import LANE_BULK, LANE_PRIORITY, FairScheduler, new_job_id
+
+
+def _gate(scheduler):
+    """Occupe l'unique thread le temps de remplir les files."""
+    release = threading.Event()
+    handle = scheduler.open_job("gate", total_rows=10_000)
+    handle.submit(release.wait, 5)
+    return release
+
+
+def test_weighted_fair_queuing_shares_workers_by_weight():
+    scheduler = FairScheduler(workers=1, small_job_rows=0, max_per_job=1)
+    release = _gate(scheduler)
+    order = []
+    heavy = scheduler.open_job("heavy", total_rows=10_000, weight=2)
+    light = scheduler.open_job("light", total_rows=10_000, weight=1)
+    futures = [heavy.submit(order.append, "heavy") for _ in range(30)]
+    futures += [light.submit(order.append, "light") for _ in range(30)]
+
+    assert scheduler.job_report("heavy")["queued"] == 30
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert 18 <= order[:30].count("heavy") <= 22
+    scheduler.close_job("gate")
+
+
+def test_small_job_is_not_starved_by_bulk_job():
+    scheduler = FairScheduler(workers=2, small_job_rows=50, max_per_job=2)
+    bulk_done = []
+    small_finished_at = []
+    with scheduler.job("bulk", total_rows=100_000) as bulk, scheduler.job("urgent", total_rows=20) as urgent:
+        bulk_futures = [bulk.submit(lambda: (time.sleep(0.005), bulk_done.append(1))) for _ in range(200)]
+        time.sleep(0.02)
+        small_futures = [urgent.submit(lambda: small_finished_at.append(len(bulk_done))) for _ in range(20)]
+        for future in small_futures:
+            future.result(timeout=5)
+        report = scheduler.job_report("urgent")
+        for future in bulk_futures:
+            future.result(timeout=10)
+
+    assert report["lane"] == LANE_PRIORITY and scheduler.job_report("bulk")["lane"] == LANE_BULK
+    # Les 20 lignes urgentes passent avant la fin de la file du gros job
+    assert max(small_finished_at) < 100
+
+
+def test_per_job_concurrency_cap():
+    scheduler = FairScheduler(workers=8, max_per_job=10)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def unit():
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.01)
+        with lock:
+            state["running"] -= 1
+
+    with scheduler.job("capped", total_rows=40, max_concurrency=2) as handle:
+        for future in [handle.submit(unit) for _ in range(20)]:
+            future.result(timeout=5)
+
+    assert state["peak"] == 2
+    assert scheduler.job_report("capped")["done"] == 20
+
+
+def test_job_ids_are_unique_within_the_same_second():
+    ids = {new_job_id("JOB") for _ in range(100)}
+    assert len(ids) == 100 and all(job_id.startswith("JOB_") for job_id in ids)
@@ -0,0 +1,66 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src import service
+
+
+@pytest.fixture
+def base_url(monkeypatch):
+    def fake_strategy(address, index, row, mapped_fields, strategy="multi"):
+        if "lente" in address:
+            time.sleep(1.0)
+        return {"status": "OK", "api_used": strategy, "precision_level": "ROOFTOP",
+                "latitude": 36.8, "longitude": 10.18, "formatted_address": address, "row_index": index}
+
+    monkeypatch.setattr(service, "geocode_row_with_strategy", fake_strategy)
+    monkeypatch.setattr(service, "CENTROID_CACHE_ENABLED", False)
+    monkeypatch.setattr(service, "ROUTING_ENABLED", False)
+    server = service.start_service(port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _request(url, payload=None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_single_address_from_fields(base_url):
+    status, body = _request(f"{base_url}/geocode?street=5+Rue+de+Rome&city=Tunis&strategy=here")
+
+    assert status == 200
+    assert body["status"] == "OK" and body["api_used"] == "here"
+    assert body["formatted_address"] == "5 Rue de Rome, Tunis"
+    assert "row_index" not in body and body["elapsed_ms"] >= 0
+
+
+def test_batch_deadline_returns_finished_rows(base_url):
+    start = time.perf_counter()
+    status, body = _request(f"{base_url}/geocode/batch", {
+        "rows": [{"address": "Rue rapide, Sfax"}, {"address": "Rue lente, Sousse"}],
+        "deadline_ms": 200,
+    })
+
+    assert status == 200
+    assert [r["status"] for r in body["results"]] == ["OK", "DEADLINE_EXCEEDED"]
+    assert time.perf_counter() - start < 0.9
+
+
+def test_invalid_requests(base_url, monkeypatch):
+    monkeypatch.setattr(service, "SERVICE_MAX_BATCH", 2)
+
+    assert _request(f"{base_url}/geocode", {"address": "x", "strategy": "inconnue"})[0] == 400
+    assert _request(f"{base_url}/geocode", {"city": ""})[0] == 400
+    assert _request(f"{base_url}/geocode", ["12 Rue de Marseille"])[0] == 400
+    assert _request(f"{base_url}/geocode/batch", [{"address": "x"}])[0] == 400
+    assert _request(f"{base_url}/geocode/batch", {"rows": [{"address": "x"}] * 3})[0] == 413
+    assert _request(f"{base_url}/geocode", {"address": "Rue lente", "deadline_ms": 100})[0] == 504
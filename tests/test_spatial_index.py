@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.geo import haversine_km
+from src.spatial_index import SpatialIndex, update_spatial_index
+
+
+def _results():
+    return pd.DataFrame({
+        "latitude": [36.8000, 36.8010, 36.8500, 34.7400, None],
+        "longitude": [10.1800, 10.1800, 10.1800, 10.7600, None],
+        "formatted_address": ["A", "B", "C", "Sfax", None],
+        "precision_level": ["ROOFTOP"] * 5,
+        "api_used": ["here"] * 5,
+        "status": ["OK", "OK", "OK", "OK", "ERROR"],
+    })
+
+
+def test_query_radius_matches_brute_force():
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(36.7, 36.9, 2000)
+    lon = rng.uniform(10.1, 10.3, 2000)
+    index = SpatialIndex(lat, lon)
+    q_lat, q_lon = rng.uniform(36.7, 36.9, 50), rng.uniform(10.1, 10.3, 50)
+
+    pairs = index.query_radius(q_lat, q_lon, radius_m=500)
+    found = {(q, round(index.latitude[p], 9), round(index.longitude[p], 9))
+             for q, p in zip(pairs["query_index"], pairs["point_index"])}
+    expected = {
+        (q, round(lat[i], 9), round(lon[i], 9))
+        for q in range(50)
+        for i in np.flatnonzero(haversine_km(q_lat[q], q_lon[q], lat, lon) <= 0.5)
+    }
+    assert found == expected
+
+
+def test_reverse_geocode_batch():
+    index = SpatialIndex.from_frame(_results())
+    assert len(index) == 4
+
+    result = index.reverse_geocode([36.8009, 35.0], [10.1801, 10.0], max_distance_m=200)
+    assert result.loc[0, "formatted_address"] == "B"
+    assert result.loc[0, "distance_m"] == pytest.approx(14, abs=2)
+    assert pd.isna(result.loc[1, "formatted_address"])
+    assert np.isnan(result.loc[1, "distance_m"])
+
+
+def test_persisted_index_is_updated_without_duplicates(tmp_path):
+    path = str(tmp_path / "spatial_index.npz")
+    assert update_spatial_index(_results(), path=path) == 4
+    assert update_spatial_index(_results(), path=path) == 4
+
+    index = SpatialIndex.load(path)
+    nearest, _ = index.nearest([34.7401], [10.7601])
+    assert index.label("formatted_address", nearest) == ["Sfax"]
+
+
+def test_update_appends_new_points_and_skips_local_sources(tmp_path):
+    path = str(tmp_path / "spatial_index.npz")
+    update_spatial_index(_results(), path=path)
+
+    later = pd.DataFrame({
+        "latitude": [36.8000, 35.8300, 36.4000],
+        "longitude": [10.1800, 10.6400, 10.6000],
+        "formatted_address": ["A", "Sousse", "Nabeul"],
+        "precision_level": ["ROOFTOP", "ROOFTOP", "APPROXIMATE"],
+        "api_used": ["here", "google", "gazetteer"],
+        "status": ["OK", "OK", "OK"],
+    })
+    assert update_spatial_index(later, path=path) == 5
+
+    index = SpatialIndex.load(path)
+    nearest, _ = index.nearest([35.8301, 36.8010, 36.4000], [10.6401, 10.1800, 10.6000])
+    assert index.label("formatted_address", nearest) == ["Sousse", "B", None]
+    assert index.label("api_used", nearest[:2]) == ["google", "here"]
+
+
+def test_concurrent_updates_keep_every_point(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = str(tmp_path / "spatial_index.npz")
+    frames = [
+        pd.DataFrame({
+            "latitude": [36.0 + i * 0.01], "longitude": [10.0], "formatted_address": [f"P{i}"],
+            "api_used": ["here"], "status": ["OK"],
+        })
+        for i in range(8)
+    ]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda df: update_spatial_index(df, path=path), frames))
+
+    assert len(SpatialIndex.load(path)) == 8
@@ -0,0 +1,112 @@
+import json
+import time
+
+import pandas as pd
+import pytest
+
+from src.call_budget import CallBudget
+from src.strategies import compile_strategy, execute_strategy, load_strategies
+
+
+def _ok(precision):
+    return {"status": "OK", "precision_level": precision}
+
+
+def _calls(log, answers, delays=None):
+    """Appels factices : la réponse dépend de l'appel et de la requête."""
+    def make(call):
+        def run(step, row, query, index):
+            log.append(f"{call}:{query}")
+            time.sleep((delays or {}).get(call, 0))
+            answer = answers.get(f"{call}:{query}", answers.get(call))
+            return _ok(answer) if answer else None
+        return run
+    return {call: make(call) for call in ("local", "here", "google", "google_place_id", "osm", "osm_structured", "centroids")}
+
+
+VARIANTS = {
+    "reformatted": lambda row, address: "ref",
+    "no_name": lambda row, address: "nn",
+    "original": lambda row, address: address,
+}
+ROW = pd.Series({"name": "Societe X", "street": "12 Rue de Marseille", "city": "Tunis"})
+
+
+def test_compact_steps_and_validation():
+    plan = compile_strategy("s", {"steps": ["here:no_name@ROOFTOP", "osm"]})
+    first, second = (stage["steps"][0] for stage in plan["stages"])
+    assert (first["call"], first["variant"], first["stop_at"]) == ("here", "no_name", "ROOFTOP")
+    assert second["variant"] == "reformatted" and second["tag_address"]
+
+    with pytest.raises(ValueError):
+        compile_strategy("s", {"steps": ["bing"]})
+    with pytest.raises(ValueError):
+        compile_strategy("s", {"steps": ["here@PERFECT"]})
+
+
+def test_group_condition_and_early_exit():
+    strategy = compile_strategy("s", {"steps": [
+        "here@ROOFTOP",
+        {"unless_best_in": ["ROOFTOP", "RANGE_INTERPOLATED"], "steps": ["google:no_name@ROOFTOP", "osm"]},
+    ]})
+    log = []
+    result = execute_strategy(strategy, "a", 3, ROW, _calls(log, {"here": "APPROXIMATE", "google": "ROOFTOP"}), VARIANTS)
+    assert log == ["here:ref", "google:nn"]
+    assert result["precision_level"] == "ROOFTOP" and result["row_index"] == 3
+
+    log = []
+    execute_strategy(strategy, "a", 3, ROW, _calls(log, {"here": "RANGE_INTERPOLATED"}), VARIANTS)
+    assert log == ["here:ref"]
+
+
+def test_parallel_group_stops_on_first_target():
+    strategy = compile_strategy("s", {"target_precision": "ROOFTOP", "steps": [
+        {"parallel": True, "steps": ["here", "google", "osm"]},
+        "osm_structured",
+    ]})
+    log = []
+    answers = {"here": "APPROXIMATE", "google": "ROOFTOP", "osm": "GEOMETRIC_CENTER"}
+    result = execute_strategy(strategy, "a", 0, ROW, _calls(log, answers, {"here": 0.05, "osm": 0.2}), VARIANTS)
+    assert result["precision_level"] == "ROOFTOP"
+    assert "osm_structured:None" not in log
+
+
+def test_budget_skips_steps_and_error_result():
+    strategy = compile_strategy("s", {"budget": {"max_calls": 1}, "error_api": "x",
+                                      "steps": ["here", "google"]})
+    log = []
+    job_budget = CallBudget()
+    result = execute_strategy(strategy, "a", 5, ROW, _calls(log, {}), VARIANTS, job_budget=job_budget)
+    assert log == ["here:ref"]
+    assert result["status"] == "ERROR" and result["api_used"] == "x" and result["row_index"] == 5
+    assert job_budget.summary()["skipped"] == 1
+
+
+def test_strategies_file_adds_and_overrides(tmp_path):
+    path = tmp_path / "strategies.json"
+    path.write_text(json.dumps({"cheap": {"label": "Économique", "steps": ["osm", "here"]}}), encoding="utf-8")
+    strategies = load_strategies(str(path))
+    assert list(strategies)[:4] == ["here", "google", "osm", "multi"]
+    assert strategies["cheap"]["label"] == "Économique"
+
+
+def test_multi_tries_osm_before_centroid_for_rows_with_street():
+    plan = load_strategies()["multi"]
+    answers = {"here": "APPROXIMATE", "centroids": "GEOMETRIC_CENTER", "osm:ref": "ROOFTOP"}
+
+    log = []
+    result = execute_strategy(plan, "a", 0, ROW, _calls(log, answers), VARIANTS)
+    assert result["precision_level"] == "ROOFTOP"
+    assert "centroids:None" not in log
+
+    # Sans rue : le centroïde répond et OSM n'est pas appelé
+    log = []
+    row = pd.Series({"name": "Societe X", "city": "Tunis"})
+    result = execute_strategy(plan, "a", 0, row, _calls(log, answers), VARIANTS)
+    assert result["precision_level"] == "GEOMETRIC_CENTER"
+    assert not any(call.startswith("osm") for call in log)
+
+    # Avec rue, OSM sans résultat : le centroïde sert de repli
+    log = []
+    result = execute_strategy(plan, "a", 0, ROW, _calls(log, {"here": "APPROXIMATE", "centroids": "GEOMETRIC_CENTER"}), VARIANTS)
+    assert result["precision_level"] == "GEOMETRIC_CENTER" and log[-1] == "centroids:None"
@@ -0,0 +1,66 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src import timeouts
+from src.apis.transport import http_get
+from src.deadline import request_timeout
+from src.metrics import PROVIDER_TIMEOUT
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Répond en 20 ms, sauf /slow (2 s) : une connexion bloquée."""
+
+    def do_GET(self):
+        time.sleep(2.0 if self.path.startswith("/slow") else 0.02)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_timeout_follows_p99_within_bounds():
+    adaptive = timeouts.AdaptiveTimeouts(factor=3, floor=0.5, ceiling=10, window=100, min_samples=20)
+    for _ in range(19):
+        adaptive.record("here", 0.2)
+    assert adaptive.timeout("here") == 10
+
+    adaptive.record("here", 0.2)
+    assert adaptive.timeout("here") == pytest.approx(0.6)
+    assert PROVIDER_TIMEOUT.get(api="here") == pytest.approx(0.6)
+
+    for _ in range(100):
+        adaptive.record("here", 0.05)
+    assert adaptive.timeout("here") == 0.5
+    for _ in range(100):
+        adaptive.record("here", 8)
+    assert adaptive.timeout("here") == 10
+
+
+def test_stuck_connection_released_at_adaptive_timeout(slow_server, monkeypatch):
+    monkeypatch.setattr(timeouts, "_timeouts", timeouts.AdaptiveTimeouts(factor=3, floor=0.2, ceiling=10,
+                                                                        window=100, min_samples=20))
+    for _ in range(30):
+        http_get(f"{slow_server}/geocode", api_name="fake", timeout=request_timeout("fake"))
+    assert request_timeout("fake") == pytest.approx(0.2, abs=0.1)
+
+    start = time.perf_counter()
+    with pytest.raises(requests.exceptions.Timeout):
+        http_get(f"{slow_server}/slow", api_name="fake", timeout=request_timeout("fake"))
+    assert time.perf_counter() - start < 1.0